@@ -0,0 +1,13 @@
+file(REMOVE_RECURSE
+  "CMakeFiles/allocate_module_test.dir/allocate_module.c.o"
+  "CMakeFiles/allocate_module_test.dir/allocate_module.c.o.d"
+  "CMakeFiles/allocate_module_test.dir/allocate_module_test.c.o"
+  "CMakeFiles/allocate_module_test.dir/allocate_module_test.c.o.d"
+  "allocate_module_test"
+  "allocate_module_test.pdb"
+)
+
+# Per-language clean rules from dependency scanning.
+foreach(lang C)
+  include(CMakeFiles/allocate_module_test.dir/cmake_clean_${lang}.cmake OPTIONAL)
+endforeach()
@@ -0,0 +1,13 @@
+file(REMOVE_RECURSE
+  "CMakeFiles/assert_macro_test.dir/assert_macro.c.o"
+  "CMakeFiles/assert_macro_test.dir/assert_macro.c.o.d"
+  "CMakeFiles/assert_macro_test.dir/assert_macro_test.c.o"
+  "CMakeFiles/assert_macro_test.dir/assert_macro_test.c.o.d"
+  "assert_macro_test"
+  "assert_macro_test.pdb"
+)
+
+# Per-language clean rules from dependency scanning.
+foreach(lang C)
+  include(CMakeFiles/assert_macro_test.dir/cmake_clean_${lang}.cmake OPTIONAL)
+endforeach()
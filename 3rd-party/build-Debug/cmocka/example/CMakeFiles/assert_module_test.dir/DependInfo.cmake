@@ -0,0 +1,21 @@
+
+# Consider dependencies only in project.
+set(CMAKE_DEPENDS_IN_PROJECT_ONLY OFF)
+
+# The set of languages for which implicit dependencies are needed:
+set(CMAKE_DEPENDS_LANGUAGES
+  )
+
+# The set of dependency files which are needed:
+set(CMAKE_DEPENDS_DEPENDENCY_FILES
+  "/root/package/3rd-party/cmocka/example/assert_module.c" "example/CMakeFiles/assert_module_test.dir/assert_module.c.o" "gcc" "example/CMakeFiles/assert_module_test.dir/assert_module.c.o.d"
+  "/root/package/3rd-party/cmocka/example/assert_module_test.c" "example/CMakeFiles/assert_module_test.dir/assert_module_test.c.o" "gcc" "example/CMakeFiles/assert_module_test.dir/assert_module_test.c.o.d"
+  )
+
+# Targets to which this target links.
+set(CMAKE_TARGET_LINKED_INFO_FILES
+  "/root/package/3rd-party/build-Debug/cmocka/src/CMakeFiles/cmocka_shared.dir/DependInfo.cmake"
+  )
+
+# Fortran module output directory.
+set(CMAKE_Fortran_TARGET_MODULE_DIR "")
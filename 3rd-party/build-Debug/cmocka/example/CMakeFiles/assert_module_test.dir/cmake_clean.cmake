@@ -0,0 +1,13 @@
+file(REMOVE_RECURSE
+  "CMakeFiles/assert_module_test.dir/assert_module.c.o"
+  "CMakeFiles/assert_module_test.dir/assert_module.c.o.d"
+  "CMakeFiles/assert_module_test.dir/assert_module_test.c.o"
+  "CMakeFiles/assert_module_test.dir/assert_module_test.c.o.d"
+  "assert_module_test"
+  "assert_module_test.pdb"
+)
+
+# Per-language clean rules from dependency scanning.
+foreach(lang C)
+  include(CMakeFiles/assert_module_test.dir/cmake_clean_${lang}.cmake OPTIONAL)
+endforeach()
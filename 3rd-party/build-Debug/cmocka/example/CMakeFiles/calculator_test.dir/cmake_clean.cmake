@@ -0,0 +1,13 @@
+file(REMOVE_RECURSE
+  "CMakeFiles/calculator_test.dir/calculator.c.o"
+  "CMakeFiles/calculator_test.dir/calculator.c.o.d"
+  "CMakeFiles/calculator_test.dir/calculator_test.c.o"
+  "CMakeFiles/calculator_test.dir/calculator_test.c.o.d"
+  "calculator_test"
+  "calculator_test.pdb"
+)
+
+# Per-language clean rules from dependency scanning.
+foreach(lang C)
+  include(CMakeFiles/calculator_test.dir/cmake_clean_${lang}.cmake OPTIONAL)
+endforeach()
@@ -0,0 +1,13 @@
+file(REMOVE_RECURSE
+  "CMakeFiles/customer_database_test.dir/customer_database.c.o"
+  "CMakeFiles/customer_database_test.dir/customer_database.c.o.d"
+  "CMakeFiles/customer_database_test.dir/customer_database_test.c.o"
+  "CMakeFiles/customer_database_test.dir/customer_database_test.c.o.d"
+  "customer_database_test"
+  "customer_database_test.pdb"
+)
+
+# Per-language clean rules from dependency scanning.
+foreach(lang C)
+  include(CMakeFiles/customer_database_test.dir/cmake_clean_${lang}.cmake OPTIONAL)
+endforeach()
@@ -0,0 +1,13 @@
+file(REMOVE_RECURSE
+  "CMakeFiles/key_value_test.dir/key_value.c.o"
+  "CMakeFiles/key_value_test.dir/key_value.c.o.d"
+  "CMakeFiles/key_value_test.dir/key_value_test.c.o"
+  "CMakeFiles/key_value_test.dir/key_value_test.c.o.d"
+  "key_value_test"
+  "key_value_test.pdb"
+)
+
+# Per-language clean rules from dependency scanning.
+foreach(lang C)
+  include(CMakeFiles/key_value_test.dir/cmake_clean_${lang}.cmake OPTIONAL)
+endforeach()
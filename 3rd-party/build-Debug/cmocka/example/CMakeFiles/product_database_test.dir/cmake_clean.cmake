@@ -0,0 +1,13 @@
+file(REMOVE_RECURSE
+  "CMakeFiles/product_database_test.dir/product_database.c.o"
+  "CMakeFiles/product_database_test.dir/product_database.c.o.d"
+  "CMakeFiles/product_database_test.dir/product_database_test.c.o"
+  "CMakeFiles/product_database_test.dir/product_database_test.c.o.d"
+  "product_database_test"
+  "product_database_test.pdb"
+)
+
+# Per-language clean rules from dependency scanning.
+foreach(lang C)
+  include(CMakeFiles/product_database_test.dir/cmake_clean_${lang}.cmake OPTIONAL)
+endforeach()
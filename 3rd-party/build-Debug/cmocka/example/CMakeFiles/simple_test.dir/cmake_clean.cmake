@@ -0,0 +1,11 @@
+file(REMOVE_RECURSE
+  "CMakeFiles/simple_test.dir/simple_test.c.o"
+  "CMakeFiles/simple_test.dir/simple_test.c.o.d"
+  "simple_test"
+  "simple_test.pdb"
+)
+
+# Per-language clean rules from dependency scanning.
+foreach(lang C)
+  include(CMakeFiles/simple_test.dir/cmake_clean_${lang}.cmake OPTIONAL)
+endforeach()
@@ -0,0 +1,13 @@
+file(REMOVE_RECURSE
+  "CMakeFiles/waiter_test_wrap.dir/chef.c.o"
+  "CMakeFiles/waiter_test_wrap.dir/chef.c.o.d"
+  "CMakeFiles/waiter_test_wrap.dir/waiter_test_wrap.c.o"
+  "CMakeFiles/waiter_test_wrap.dir/waiter_test_wrap.c.o.d"
+  "waiter_test_wrap"
+  "waiter_test_wrap.pdb"
+)
+
+# Per-language clean rules from dependency scanning.
+foreach(lang C)
+  include(CMakeFiles/waiter_test_wrap.dir/cmake_clean_${lang}.cmake OPTIONAL)
+endforeach()
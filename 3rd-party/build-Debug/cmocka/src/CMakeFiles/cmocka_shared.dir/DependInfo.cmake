@@ -0,0 +1,26 @@
+
+# Consider dependencies only in project.
+set(CMAKE_DEPENDS_IN_PROJECT_ONLY OFF)
+
+# The set of languages for which implicit dependencies are needed:
+set(CMAKE_DEPENDS_LANGUAGES
+  )
+
+# The set of dependency files which are needed:
+set(CMAKE_DEPENDS_DEPENDENCY_FILES
+  "/root/package/3rd-party/cmocka/src/cmocka.c" "src/CMakeFiles/cmocka_shared.dir/cmocka.c.o" "gcc" "src/CMakeFiles/cmocka_shared.dir/cmocka.c.o.d"
+  )
+
+# Pairs of files generated by the same build rule.
+set(CMAKE_MULTIPLE_OUTPUT_PAIRS
+  "/root/package/3rd-party/build-Debug/cmocka/src/libcmocka.so" "/root/package/3rd-party/build-Debug/cmocka/src/libcmocka.so.0.4.0"
+  "/root/package/3rd-party/build-Debug/cmocka/src/libcmocka.so.0" "/root/package/3rd-party/build-Debug/cmocka/src/libcmocka.so.0.4.0"
+  )
+
+
+# Targets to which this target links.
+set(CMAKE_TARGET_LINKED_INFO_FILES
+  )
+
+# Fortran module output directory.
+set(CMAKE_Fortran_TARGET_MODULE_DIR "")
@@ -0,0 +1,13 @@
+file(REMOVE_RECURSE
+  "CMakeFiles/cmocka_shared.dir/cmocka.c.o"
+  "CMakeFiles/cmocka_shared.dir/cmocka.c.o.d"
+  "libcmocka.pdb"
+  "libcmocka.so"
+  "libcmocka.so.0"
+  "libcmocka.so.0.4.0"
+)
+
+# Per-language clean rules from dependency scanning.
+foreach(lang C)
+  include(CMakeFiles/cmocka_shared.dir/cmake_clean_${lang}.cmake OPTIONAL)
+endforeach()
@@ -0,0 +1,11 @@
+file(REMOVE_RECURSE
+  "CMakeFiles/cmocka_static.dir/cmocka.c.o"
+  "CMakeFiles/cmocka_static.dir/cmocka.c.o.d"
+  "libcmocka.a"
+  "libcmocka.pdb"
+)
+
+# Per-language clean rules from dependency scanning.
+foreach(lang C)
+  include(CMakeFiles/cmocka_static.dir/cmake_clean_${lang}.cmake OPTIONAL)
+endforeach()
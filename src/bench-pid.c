@@ -0,0 +1,349 @@
+// -*- mode: c; c-default-style: "k&r"; c-basic-offset: 4; indent-tabs-mode: nil; tab-width: 4 -*-
+
+//
+// Copyright (c) 2016 Benjamin J. Andre
+//
+// This Source Code Form is subject to the terms of the Mozilla Public
+// License, v.  2.0. If a copy of the MPL was not distributed with this
+// file, You can obtain one at http://mozilla.org/MPL/2.0/.
+//
+
+// Host benchmarks of the pid controller implementations. Results are
+// written as csv to stdout.
+//
+//   pid.bench throughput [calls]
+//
+// mean cost per call of the floating point, pid_real, and fixed point
+// controllers, and of the floating point controller with a gain
+// schedule. Rows of the floating point controller are labeled float,
+// or double for a library built with PID_USE_DOUBLE.
+//
+//   pid.bench fixed_rate [calls]
+//
+// mean cost per call and bytes per controller of the window
+// controller and the fixed rate controller, through pid_control and
+// pid_control_fixed_rate, for a sweep of history lengths.
+//
+//   pid.bench latency [calls] [histogram.csv]
+//
+// distribution of the latency of individual pid_control calls for a
+// sweep of history lengths, with warm caches (one controller called
+// repeatedly) and cold caches (calls spread over enough controllers,
+// visited in a random order so the hardware prefetchers can not hide
+// the misses, that each call misses the caches). Each call is timed
+// with the monotonic clock and the calibrated timer overhead is
+// subtracted. Reports min/p50/p99/p99.9/max, and optionally the full
+// histogram with 1 ns bins.
+#define _POSIX_C_SOURCE 199309L
+
+#include <inttypes.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+
+#include "pid.h"
+#include "pid_fixed.h"
+
+#define NUM_VALUES 1024
+
+// gain schedule points of the scheduled throughput benchmark
+#define SCHEDULE_POINTS 32
+
+// latency histogram with 1 ns bins, slower calls go in the last bin
+// but the true maximum is tracked separately.
+#define NUM_BINS 100000
+
+// memory spanned by the controllers of a cold cache run, larger than
+// the last level cache of the host.
+#define COLD_FOOTPRINT (64u * 1024u * 1024u)
+
+static uint8_t const history_lengths[] = {1, 2, 5, 16, 64, 255};
+
+#ifdef PID_USE_DOUBLE
+#define REAL_NAME "double"
+#else
+#define REAL_NAME "float"
+#endif
+
+static uint64_t now_ns(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return (uint64_t)ts.tv_sec * 1000000000u + (uint64_t)ts.tv_nsec;
+}
+
+static void report(char const *const name, uint8_t const history_length,
+                   uint64_t const calls, uint64_t const elapsed) {
+    printf("%s,%u,%" PRIu64 ",%.6f,%.3f\n", name, history_length, calls,
+           1.0e-9 * (double)elapsed, (double)elapsed / (double)calls);
+}
+
+// volatile sinks so the compiler can not remove the calls
+static volatile pid_real sink_real;
+static volatile q15_t sink_q15;
+static volatile q31_t sink_q31;
+
+static void throughput(uint64_t const calls, uint8_t const history_length) {
+    pid_real values[NUM_VALUES];
+    q15_t values_q15[NUM_VALUES];
+    q31_t values_q31[NUM_VALUES];
+    srand(770405);
+    for (int i = 0; i < NUM_VALUES; i++) {
+        values[i] = 0.75f + 0.5f * (pid_real)rand() / (pid_real)RAND_MAX;
+        values_q15[i] = float_to_q15(values[i] / 2.0f);
+        values_q31[i] = float_to_q31(values[i] / 2.0f);
+    }
+
+    pid_data* pid = pid_init(history_length, 1.0f, 1.5f, 0.1f, 0.5f);
+    uint64_t start = now_ns();
+    for (uint64_t i = 0; i < calls; i++) {
+        sink_real = pid_control(pid, values[i % NUM_VALUES], 2.0f);
+    }
+    report(REAL_NAME, history_length, calls, now_ns() - start);
+    pid_free(&pid);
+
+    pid_real gains[3 * SCHEDULE_POINTS];
+    for (int i = 0; i < SCHEDULE_POINTS; i++) {
+        gains[3 * i] = 1.5f + 0.1f * (pid_real)i;
+        gains[3 * i + 1] = 0.1f;
+        gains[3 * i + 2] = 0.5f;
+    }
+    pid = pid_init(history_length, 1.0f, 1.5f, 0.1f, 0.5f);
+    pid_schedule_set(pid, SCHEDULE_POINTS, 0.5f, 1.5f, gains);
+    start = now_ns();
+    for (uint64_t i = 0; i < calls; i++) {
+        sink_real = pid_control(pid, values[i % NUM_VALUES], 2.0f);
+    }
+    report(REAL_NAME "_scheduled", history_length, calls, now_ns() - start);
+    pid_free(&pid);
+
+    pid_q15_data* pid_q15 = pid_q15_init(
+        history_length, float_to_q15(0.5f), float_to_q15(0.375f),
+        float_to_q15(0.4f), float_to_q15(0.0078125f), 2);
+    q15_t delta_time_q15 = float_to_q15(0.125f);
+    start = now_ns();
+    for (uint64_t i = 0; i < calls; i++) {
+        sink_q15 = pid_q15_control(pid_q15, values_q15[i % NUM_VALUES],
+                                   delta_time_q15);
+    }
+    report("q15", history_length, calls, now_ns() - start);
+    pid_q15_free(&pid_q15);
+
+    pid_q31_data* pid_q31 = pid_q31_init(
+        history_length, float_to_q31(0.5f), float_to_q31(0.375f),
+        float_to_q31(0.4f), float_to_q31(0.0078125f), 2);
+    q31_t delta_time_q31 = float_to_q31(0.125f);
+    start = now_ns();
+    for (uint64_t i = 0; i < calls; i++) {
+        sink_q31 = pid_q31_control(pid_q31, values_q31[i % NUM_VALUES],
+                                   delta_time_q31);
+    }
+    report("q31", history_length, calls, now_ns() - start);
+    pid_q31_free(&pid_q31);
+}
+
+static void fixed_rate(uint64_t const calls, uint8_t const history_length) {
+    pid_real values[NUM_VALUES];
+    srand(770405);
+    for (int i = 0; i < NUM_VALUES; i++) {
+        values[i] = 0.75f + 0.5f * (pid_real)rand() / (pid_real)RAND_MAX;
+    }
+
+    pid_data* pid = pid_init(history_length, 1.0f, 1.5f, 0.1f, 0.5f);
+    uint64_t start = now_ns();
+    for (uint64_t i = 0; i < calls; i++) {
+        sink_real = pid_control(pid, values[i % NUM_VALUES], 2.0f);
+    }
+    uint64_t elapsed = now_ns() - start;
+    printf("window,%u,%" PRIu64 ",%.6f,%.3f,%zu\n", history_length, calls,
+           1.0e-9 * (double)elapsed, (double)elapsed / (double)calls,
+           pid_memory_size(pid));
+    pid_free(&pid);
+
+    pid = pid_init_fixed_rate(history_length, 1.0f, 1.5f, 0.1f, 0.5f, 2.0f);
+    start = now_ns();
+    for (uint64_t i = 0; i < calls; i++) {
+        sink_real = pid_control(pid, values[i % NUM_VALUES], 2.0f);
+    }
+    elapsed = now_ns() - start;
+    printf("fixed_rate,%u,%" PRIu64 ",%.6f,%.3f,%zu\n", history_length,
+           calls, 1.0e-9 * (double)elapsed, (double)elapsed / (double)calls,
+           pid_memory_size(pid));
+
+    start = now_ns();
+    for (uint64_t i = 0; i < calls; i++) {
+        sink_real = pid_control_fixed_rate(pid, values[i % NUM_VALUES]);
+    }
+    elapsed = now_ns() - start;
+    printf("fixed_rate_fast,%u,%" PRIu64 ",%.6f,%.3f,%zu\n", history_length,
+           calls, 1.0e-9 * (double)elapsed, (double)elapsed / (double)calls,
+           pid_memory_size(pid));
+    fflush(stdout);
+    pid_free(&pid);
+}
+
+static uint64_t timer_overhead(void) {
+    // smallest difference between back to back clock reads
+    uint64_t overhead = UINT64_MAX;
+    for (int i = 0; i < 100000; i++) {
+        uint64_t start = now_ns();
+        uint64_t elapsed = now_ns() - start;
+        overhead = (elapsed < overhead) ? elapsed : overhead;
+    }
+    return overhead;
+}
+
+static uint64_t percentile(uint64_t const *const histogram,
+                           uint64_t const count, double const fraction) {
+    uint64_t rank = (uint64_t)(fraction * (double)(count - 1));
+    uint64_t total = 0;
+    for (uint64_t bin = 0; bin < NUM_BINS; bin++) {
+        total += histogram[bin];
+        if (total > rank) {
+            return bin;
+        }
+    }
+    return NUM_BINS - 1;
+}
+
+// xorshift64 generator for the cold cache visiting order, rand() may
+// have as few as 15 bits.
+static uint64_t next_random(uint64_t *const state) {
+    uint64_t x = *state;
+    x ^= x << 13;
+    x ^= x >> 7;
+    x ^= x << 17;
+    *state = x;
+    return x;
+}
+
+static void latency(uint64_t const calls, uint8_t const history_length,
+                    bool const cold, uint64_t const overhead,
+                    FILE *const histogram_file) {
+    pid_real values[NUM_VALUES];
+    srand(770405);
+    for (int i = 0; i < NUM_VALUES; i++) {
+        values[i] = 0.75f + 0.5f * (pid_real)rand() / (pid_real)RAND_MAX;
+    }
+
+    size_t num_pids = 1;
+    if (cold) {
+        pid_data* probe = pid_init(history_length, 1.0f, 1.5f, 0.1f, 0.5f);
+        num_pids = COLD_FOOTPRINT / pid_memory_size(probe);
+        pid_free(&probe);
+    }
+    pid_data **pids = malloc(num_pids * sizeof(pid_data*));
+    for (size_t p = 0; p < num_pids; p++) {
+        pids[p] = pid_init(history_length, 1.0f, 1.5f, 0.1f, 0.5f);
+    }
+    // shuffle, consecutive calls go to controllers at unrelated
+    // addresses instead of walking the allocations in order.
+    uint64_t state = 770405;
+    for (size_t p = num_pids - 1; p > 0; p--) {
+        size_t q = (size_t)(next_random(&state) % (p + 1));
+        pid_data *swap = pids[p];
+        pids[p] = pids[q];
+        pids[q] = swap;
+    }
+
+    uint64_t *histogram = calloc(NUM_BINS, sizeof(uint64_t));
+    uint64_t min = UINT64_MAX;
+    uint64_t max = 0;
+    uint64_t sum = 0;
+    size_t p = 0;
+    for (uint64_t i = 0; i < calls; i++) {
+        pid_data *pid = pids[p];
+        pid_real value = values[i % NUM_VALUES];
+        uint64_t start = now_ns();
+        sink_real = pid_control(pid, value, 2.0f);
+        uint64_t elapsed = now_ns() - start;
+        elapsed = (elapsed > overhead) ? elapsed - overhead : 0;
+
+        min = (elapsed < min) ? elapsed : min;
+        max = (elapsed > max) ? elapsed : max;
+        sum += elapsed;
+        histogram[(elapsed < NUM_BINS) ? elapsed : NUM_BINS - 1]++;
+        p++;
+        p = (p == num_pids) ? 0 : p;
+    }
+
+    char const *const cache = cold ? "cold" : "warm";
+    printf("%s,%u,%s,%" PRIu64 ",%" PRIu64 ",%" PRIu64 ",%" PRIu64
+           ",%" PRIu64 ",%" PRIu64 ",%.3f\n",
+           REAL_NAME, history_length, cache, calls, min,
+           percentile(histogram, calls, 0.5),
+           percentile(histogram, calls, 0.99),
+           percentile(histogram, calls, 0.999),
+           max, (double)sum / (double)calls);
+    fflush(stdout);
+
+    if (histogram_file != NULL) {
+        for (uint64_t bin = 0; bin < NUM_BINS; bin++) {
+            if (histogram[bin] > 0) {
+                fprintf(histogram_file, "%s,%u,%s,%" PRIu64 ",%" PRIu64 "\n",
+                        REAL_NAME, history_length, cache, bin, histogram[bin]);
+            }
+        }
+    }
+
+    free(histogram);
+    for (size_t q = 0; q < num_pids; q++) {
+        pid_free(&pids[q]);
+    }
+    free(pids);
+}
+
+static void usage(char const *const name) {
+    fprintf(stderr, "usage: %s throughput [calls]\n", name);
+    fprintf(stderr, "       %s fixed_rate [calls]\n", name);
+    fprintf(stderr, "       %s latency [calls] [histogram.csv]\n", name);
+}
+
+int main(int argc, char** argv) {
+    if (argc < 2) {
+        usage(argv[0]);
+        return 1;
+    }
+
+    uint64_t calls = 10000000;
+    if (argc > 2) {
+        calls = strtoull(argv[2], NULL, 10);
+    }
+
+    if (strcmp(argv[1], "throughput") == 0) {
+        printf("implementation,history_length,calls,seconds,ns_per_call\n");
+        throughput(calls, 5);
+    } else if (strcmp(argv[1], "fixed_rate") == 0) {
+        printf("implementation,history_length,calls,seconds,ns_per_call,"
+               "memory_bytes\n");
+        for (size_t h = 0; h < sizeof(history_lengths); h++) {
+            fixed_rate(calls, history_lengths[h]);
+        }
+    } else if (strcmp(argv[1], "latency") == 0) {
+        FILE *histogram_file = NULL;
+        if (argc > 3) {
+            histogram_file = fopen(argv[3], "w");
+            if (histogram_file == NULL) {
+                fprintf(stderr, "could not open %s\n", argv[3]);
+                return 1;
+            }
+            fprintf(histogram_file,
+                    "implementation,history_length,cache,latency_ns,count\n");
+        }
+        uint64_t overhead = timer_overhead();
+        fprintf(stderr, "timer overhead = %" PRIu64 " ns\n", overhead);
+        printf("implementation,history_length,cache,calls,"
+               "min_ns,p50_ns,p99_ns,p999_ns,max_ns,mean_ns\n");
+        for (size_t h = 0; h < sizeof(history_lengths); h++) {
+            latency(calls, history_lengths[h], false, overhead, histogram_file);
+            latency(calls, history_lengths[h], true, overhead, histogram_file);
+        }
+        if (histogram_file != NULL) {
+            fclose(histogram_file);
+        }
+    } else {
+        usage(argv[0]);
+        return 1;
+    }
+    return 0;
+}
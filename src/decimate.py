@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Min/max preserving downsampling of trajectories for plotting.
+
+A trajectory is split into bins of consecutive points and only the
+minimum and maximum of each bin are kept, in time order. Peaks and
+the envelope of fast oscillations are preserved at roughly screen
+resolution. Inputs are read in chunks, so memory mapped trajectories
+are never loaded in full.
+
+Copyright (c) 2016 Benjamin J. Andre
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v.  2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+#
+# built-in modules
+#
+import math
+import sys
+import traceback
+
+#
+# installed dependencies
+#
+import numpy as np
+
+#
+# other modules in this package
+#
+
+if sys.hexversion < 0x03050000:
+    print(70 * "*")
+    print("ERROR: {0} requires python >= 3.5.x. ".format(sys.argv[0]))
+    print("It appears that you are running python {0}".format(
+        ".".join(str(x) for x in sys.version_info[0:3])))
+    print(70 * "*")
+    sys.exit(1)
+
+# bins per plot, about the horizontal resolution of a screen
+DEFAULT_PLOT_BINS = 2000
+
+# bins read per chunk of the input
+_CHUNK_BINS = 4096
+
+
+def minmax_indices(values, num_bins=DEFAULT_PLOT_BINS):
+    """Return the sorted indices of the minimum and maximum of each bin.
+
+    Positional arguments:
+    values -- trajectory, may be a memory mapped array. [np.ndarray]
+
+    Keyword arguments:
+    num_bins -- number of bins, at most 2 * num_bins indices are
+    returned. [int]
+
+    Returns:
+    indices -- all indices if the trajectory already has at most
+    2 * num_bins points. [np.ndarray]
+    """
+    num_values = len(values)
+    if num_values <= 2 * num_bins:
+        return np.arange(num_values)
+
+    bin_size = int(math.ceil(num_values / num_bins))
+    chunk = _CHUNK_BINS * bin_size
+    indices = []
+    for start in range(0, num_values, chunk):
+        block = np.asarray(values[start:start + chunk])
+        num_full = len(block) // bin_size
+        bins = block[:num_full * bin_size].reshape(num_full, bin_size)
+        first = bins.argmin(axis=1)
+        second = bins.argmax(axis=1)
+        offsets = start + bin_size * np.arange(num_full)
+        indices.append(np.stack([offsets + np.minimum(first, second),
+                                 offsets + np.maximum(first, second)],
+                                axis=1).ravel())
+        if num_full * bin_size < len(block):
+            # partial last bin
+            tail = block[num_full * bin_size:]
+            offset = start + num_full * bin_size
+            indices.append(offset + np.array(
+                sorted([tail.argmin(), tail.argmax()])))
+    return np.concatenate(indices)
+
+
+def minmax_decimate(x, y, num_bins=DEFAULT_PLOT_BINS):
+    """Downsample y(x) keeping the minimum and maximum of y in each bin.
+
+    Returns:
+    x, y -- decimated arrays. [np.ndarray, np.ndarray]
+    """
+    indices = minmax_indices(y, num_bins)
+    return np.asarray(x[indices]), np.asarray(y[indices])
+
+
+if __name__ == "__main__":
+    try:
+        print("Module has no main functionality. Please run pid-driver.py")
+        sys.exit(0)
+    except Exception as error:
+        print(str(error))
+        traceback.print_exc()
+        sys.exit(1)
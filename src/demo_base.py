@@ -14,6 +14,8 @@ file, You can obtain one at http://mozilla.org/MPL/2.0/.
 #
 import abc
 import configparser
+import contextlib
+import io
 import os
 import sys
 import traceback
@@ -27,7 +29,14 @@ import matplotlib.pyplot as plt
 #
 # other modules in this package
 #
+from decimate import DEFAULT_PLOT_BINS, minmax_decimate
+import event_trigger
+import linear_screen
 from pid import PID
+from profiling import null_phase
+import realtime
+import sensitivity
+import termination
 
 if sys.hexversion < 0x03050000:
     print(70 * "*")
@@ -37,6 +46,9 @@ if sys.hexversion < 0x03050000:
     print(70 * "*")
     sys.exit(1)
 
+# [process] precision, dtype of the simulation arrays
+PRECISIONS = ('float64', 'float32', )
+
 
 def read_config_file(filename):
     """Read the configuration file and process
@@ -63,10 +75,28 @@ class PIDDemoBase(object):
     """
     """
 
-    def __init__(self):
+    # seed for the random forcing, part of the result cache key.
+    _forcing_seed = 770405
+
+    # process_sensitivity is implemented
+    _supports_sensitivity = False
+
+    # the simulate functions support a warm start from the steady
+    # state at the set point
+    _supports_warm_start = False
+
+    # simulate_with_control supports event triggered control
+    _supports_event_trigger = False
+
+    def __init__(self, profile=None):
         """
+        Keyword arguments:
+
+        profile -- optional profiling.RunProfile to record phase
+        timing and call counts. [RunProfile]
         """
 
+        self._profile = profile
         self._units = None
 
         # simulation time
@@ -83,16 +113,43 @@ class PIDDemoBase(object):
         self._forcing_standard_deviation = None
         self._forcing = None
 
+        # plotting
+        self._plot_bins = DEFAULT_PLOT_BINS
+
         # state
         self._control = None
         self._state_control = None
         self._state_no_control = None
 
+        # dtype of the state, forcing and control arrays
+        self._dtype = np.dtype(np.float64)
+
         # controller
         self._set_point = None
         self._control_bias = None
+        self._history_length = None
+        self._integral_mode = 'window'
+        self._leak = None
+        self._gains = None
         self._pid = None
 
+        # gain schedule, (process values, gains) of the table
+        self._schedule = None
+
+        # warm start, control at the start of the controlled
+        # simulation, the control bias if None
+        self._warm_start = False
+        self._initial_control = None
+
+        # event triggered control, number of controller calls of the
+        # controlled simulation
+        self._event_trigger = None
+        self._controller_calls = None
+
+        # early termination of the controlled simulation
+        self._termination = None
+        self._termination_reason = termination.COMPLETED
+
     def __str__(self):
         """
         """
@@ -100,6 +157,14 @@ class PIDDemoBase(object):
         message += "control_delta = {0} s".format(self._control_delta)
         return message
 
+    def _phase(self, name):
+        """Return a context manager timing phase 'name' if profiling is
+        enabled, otherwise a no-op.
+        """
+        if self._profile:
+            return self._profile.phase(name)
+        return null_phase()
+
     def _initialize_units(self, units):
         """Assign user supplied units to various variables.
         """
@@ -113,6 +178,21 @@ class PIDDemoBase(object):
                 units[var] = default
         self._units = units
 
+    def _initialize_precision(self, config):
+        """Read the optional [process] precision, the dtype of the
+        state, forcing and control arrays, float64 by default. float32
+        halves the memory traffic of large ensembles, and a single
+        precision controller reads the process values without a
+        conversion.
+        """
+        precision = config.get("process", "precision", fallback="float64")
+        if precision not in PRECISIONS:
+            raise RuntimeError("Unknown precision '{0}', expected one of: "
+                               "{1}".format(precision, ", ".join(PRECISIONS)))
+        self._dtype = np.dtype(precision)
+        if self._dtype != np.float64:
+            print("Simulation precision = {0}".format(precision))
+
     def _initialize_simulation_time(self, delta_time, max_time):
         """Initialize the time stepping for the process simeanlation
         """
@@ -132,11 +212,238 @@ class PIDDemoBase(object):
         print("Control interval = {0} [time steps]".format(
             self._control_interval))
 
+    def gain_schedule(self, process_values):
+        """Gains at each operating point from the steady state
+        relations of the process: the configured gains, which apply at
+        the set point, scaled by |dCV/dPV| at the operating point over
+        |dCV/dPV| at the set point, for the mean forcing.
+
+        Positional arguments:
+        process_values -- operating points. [np.ndarray]
+
+        Returns:
+        gains -- (Kp, Ki, Kd) at each point, shape (num_points, 3), or
+        (num_controllers, num_points, 3) for per controller gains.
+        [np.ndarray]
+        """
+        # _calculate_dCVdPV reports every point
+        with contextlib.redirect_stdout(io.StringIO()):
+            reference = np.abs(self._calculate_dCVdPV(self._forcing_mean,
+                                                      self._set_point))
+            scale = np.array([
+                np.abs(self._calculate_dCVdPV(self._forcing_mean, value))
+                for value in process_values]) / reference
+        gains = np.stack(np.broadcast_arrays(*[
+            np.asarray(gain, dtype=np.float64)[..., np.newaxis] *
+            scale for gain in self._gains]), axis=-1)
+        return gains
+
+    def _initialize_schedule(self, config):
+        """Schedule the gains on the process value if the config has
+        a [schedule] section:
+
+          [schedule]
+          process_min = 0.5
+          process_max = 3.0
+          num_points = 16
+
+        The table is computed by gain_schedule and interpolated by the
+        native controller at each control tick.
+        """
+        if not config.has_section("schedule"):
+            return
+        process_min = config.getfloat("schedule", "process_min")
+        process_max = config.getfloat("schedule", "process_max")
+        num_points = config.getint("schedule", "num_points", fallback=16)
+        process_values = np.linspace(process_min, process_max, num_points)
+        gains = self.gain_schedule(process_values)
+        self._pid.set_schedule(process_min, process_max, gains)
+        self._schedule = (process_values, gains)
+        print("Gain schedule: {0} points for process values in [{1}, "
+              "{2}]".format(num_points, process_min, process_max))
+
+    def _initialize_warm_start(self, config):
+        """Start from the steady state instead of the initial
+        condition if the config has a [warm_start] section:
+
+          [warm_start]
+          # optional, simulate this long under control first [s]
+          burn_in = 100.0
+          # optional, file with the burned in state, reused if it exists
+          snapshot = tank-warm-start.npz
+
+        The process starts at the set point with the calculated control
+        bias as its control, the closed loop equilibrium, and the
+        controller is primed as if the process had been there for its
+        whole window, so every integral mode starts with zero error and
+        output. Requires control_bias = calculate, with another bias
+        the windowed and leaky integrals have no equilibrium at the set
+        point. The burn in continues from there with its own forcing,
+        its final process value, control and controller state are the
+        initial state of the simulations.
+
+        A snapshot records the parameters it was burned in with, see
+        _warm_start_parameters, and loading it with any other
+        parameters raises RuntimeError. Use one snapshot file per set
+        of parameters, e.g. in a sweep, and delete it after changing
+        the process model.
+        """
+        if not config.has_section("warm_start"):
+            return
+        if not self._supports_warm_start:
+            raise RuntimeError("{0} does not support warm starts".format(
+                type(self).__name__))
+        if config["control"]["control_bias"] != "calculate":
+            raise RuntimeError(
+                "Warm start requires control_bias = calculate, received "
+                "'{0}'".format(config["control"]["control_bias"]))
+        self._warm_start = True
+        snapshot = config.get("warm_start", "snapshot", fallback=None)
+        burn_in = config.getfloat("warm_start", "burn_in", fallback=0.0)
+        if snapshot and os.path.isfile(snapshot):
+            self._load_warm_start(snapshot, burn_in)
+            return
+
+        steady_state = self._set_point
+        self._initial_condition = steady_state
+        self._initial_control = self._control_bias
+        self._pid.prime(steady_state, self._delta_time)
+        print("Warm start from the steady state {0:1.6e} [{1}]".format(
+            steady_state, self._units['process']))
+
+        if burn_in > 0.0:
+            with self._phase('burn_in'):
+                self._burn_in(burn_in)
+        if snapshot:
+            self._save_warm_start(snapshot, burn_in)
+
+    def _burn_in(self, duration):
+        """Simulate under control for duration, rounded up to whole
+        control intervals so the control ticks of the simulation keep
+        their phase, with forcing independent of the simulation's.
+        """
+        intervals = int(np.ceil(duration / self._control_delta))
+        num_steps = max(1, intervals) * self._control_interval
+        random_state = np.random.RandomState(self._forcing_seed + 1)
+        if self._forcing_standard_deviation:
+            forcing = random_state.normal(self._forcing_mean,
+                                          self._forcing_standard_deviation,
+                                          num_steps + 1)
+        else:
+            forcing = self._forcing_mean * np.ones(num_steps + 1)
+        process_value = self._initial_condition
+        control = self._control_bias
+        for t in range(1, num_steps + 1):
+            process_value = self.process(forcing[t], self._delta_time,
+                                         process_value, control)
+            if t % self._control_interval == 0:
+                control = self._control_bias - self._pid.control(
+                    process_value, self._delta_time)
+        self._initial_condition = process_value
+        self._initial_control = control
+        print("Burn in: {0} [{1}], process value = {2:1.6e} [{3}]".format(
+            num_steps * self._delta_time, self._units['time'],
+            process_value, self._units['process']))
+
+    def _warm_start_parameters(self, burn_in):
+        """Return a dict of the parameters the burned in state depends
+        on, besides the process model and the controller integral mode
+        and history length.
+        """
+        parameters = {
+            'set_point': self._set_point,
+            'Kp': self._gains[0],
+            'Ki': self._gains[1],
+            'Kd': self._gains[2],
+            'forcing_mean': self._forcing_mean,
+            'forcing_standard_deviation':
+                self._forcing_standard_deviation or 0.0,
+            'control_bias': self._control_bias,
+            'delta_time': self._delta_time,
+            'control_delta': self._control_delta,
+            'burn_in': burn_in,
+        }
+        if self._integral_mode == 'leaky':
+            parameters['leak'] = self._leak
+        return parameters
+
+    def _save_warm_start(self, filename, burn_in):
+        """Save the initial process value, control and controller
+        state, with the parameters they were computed for.
+        """
+        control = self._control_bias
+        if self._initial_control is not None:
+            control = self._initial_control
+        print("Writing warm start snapshot to {0}".format(filename))
+        np.savez(filename, process_value=self._initial_condition,
+                 control=control, pid_state=self._pid.state(),
+                 integral_mode=np.array(self._integral_mode),
+                 history_length=self._history_length,
+                 **self._warm_start_parameters(burn_in))
+
+    def _load_warm_start(self, filename, burn_in):
+        """Restore the initial state saved by _save_warm_start, after
+        checking it was burned in with the same parameters.
+        """
+        with np.load(filename, allow_pickle=False) as snapshot:
+            if (str(snapshot['integral_mode']) != self._integral_mode or
+                    int(snapshot['history_length']) !=
+                    self._history_length):
+                raise RuntimeError(
+                    "Warm start snapshot {0} is for a {1} controller with "
+                    "history length {2}".format(
+                        filename, snapshot['integral_mode'],
+                        snapshot['history_length']))
+            for name, value in sorted(
+                    self._warm_start_parameters(burn_in).items()):
+                if name not in snapshot.files:
+                    raise RuntimeError(
+                        "Warm start snapshot {0} does not record {1}, "
+                        "delete it to burn in again".format(filename, name))
+                if not np.array_equal(snapshot[name], value):
+                    raise RuntimeError(
+                        "Warm start snapshot {0} was burned in with {1} = "
+                        "{2}, the configuration has {3}".format(
+                            filename, name, snapshot[name], value))
+            self._initial_condition = float(snapshot['process_value'])
+            self._initial_control = float(snapshot['control'])
+            self._pid.set_state(snapshot['pid_state'])
+        print("Warm start from snapshot {0}, process value = {1:1.6e} "
+              "[{2}]".format(filename, self._initial_condition,
+                             self._units['process']))
+
+    def _initialize_event_trigger(self, config):
+        """Read the optional [event_trigger] section, see
+        event_trigger.EventTrigger.
+        """
+        self._event_trigger = event_trigger.EventTrigger.from_config(
+            config, self._set_point, self._control_delta)
+        if not self._event_trigger:
+            return
+        if not self._supports_event_trigger:
+            raise RuntimeError("{0} does not support event triggered "
+                               "control".format(type(self).__name__))
+        if self._integral_mode == 'fixed_rate':
+            raise RuntimeError("Event triggered control requires the "
+                               "intervals between calls, fixed rate "
+                               "controllers assume a constant interval.")
+        print("Event triggered control enabled")
+
+    def _initialize_termination(self, config):
+        """Read the stop criteria of the optional [termination]
+        section, see termination.Termination.
+        """
+        self._termination = termination.Termination.from_config(
+            config, self._set_point, self._delta_time)
+        if self._termination:
+            print("Early termination enabled")
+
     def _initialize_constant_forcing(self, forcing_mean):
         """Use a constant forcing.
         """
         self._forcing_mean = forcing_mean
-        self._forcing = self._forcing_mean * np.ones(len(self._time))
+        self._forcing = self._forcing_mean * np.ones(len(self._time),
+                                                     dtype=self._dtype)
 
     def _initialize_normal_forcing(self,
                                    forcing_mean, forcing_standard_deviation):
@@ -146,28 +453,103 @@ class PIDDemoBase(object):
         """
         self._forcing_mean = forcing_mean
         self._forcing_standard_deviation = forcing_standard_deviation
-        np.random.seed(770405)
+        np.random.seed(self._forcing_seed)
         self._forcing = np.random.normal(
             self._forcing_mean, self._forcing_standard_deviation,
-            len(self._time))
+            len(self._time)).astype(self._dtype)
+
+    @staticmethod
+    def _integral_mode_config(config):
+        """Return the optional integral mode and leak factor from the
+        control section.
+        """
+        integral_mode = config.get("control", "integral_mode",
+                                   fallback="window")
+        leak = config.getfloat("control", "leak", fallback=None)
+        return integral_mode, leak
 
     def _initialize_pid(self, history_length, set_point,
-                        Kp, Ki, Kd, control_bias):
+                        Kp, Ki, Kd, control_bias,
+                        integral_mode='window', leak=None):
         """
         """
         print("Initializing PID controller:")
+        print("  integral mode = {0}".format(integral_mode))
+        if integral_mode == 'leaky':
+            print("  leak = {0}".format(leak))
+        if integral_mode == 'fixed_rate':
+            print("  delta time = {0}".format(self._delta_time))
         print("  history length = {0}".format(history_length))
         print("  set_point = {0}".format(set_point))
         print("  Kp = {0}".format(Kp))
         print("  Ki = {0}".format(Ki))
         print("  Kd = {0}".format(Kd))
-        self._pid = PID(history_length, set_point, Kp, Ki, Kd)
+        # NOTE: a fixed rate controller uses the delta time passed by
+        # simulate_with_control.
+        self._pid = PID(history_length, set_point, Kp, Ki, Kd,
+                        integral_mode, leak, self._delta_time)
         self._control_bias = control_bias
+        self._history_length = history_length
+        self._integral_mode = integral_mode
+        self._leak = leak
+        self._gains = (Kp, Ki, Kd)
+
+    def screen_gains(self, Kp=None, Ki=None, Kd=None, min_damping=0.2,
+                     min_gain_margin=None, min_phase_margin=None):
+        """Screen gain sets with the process linearized around the set
+        point and the discrete controller, see linear_screen.
+
+        Gains may be scalars or arrays, they are broadcast against each
+        other. Unspecified gains default to the configured controller.
+
+        Returns a dict of arrays, see linear_screen.screen.
+        """
+        if self._integral_mode not in ['window', 'fixed_rate', ]:
+            raise RuntimeError(
+                "Linear screening only supports the window integral modes, "
+                "received '{0}'".format(self._integral_mode))
+        if Kp is None:
+            Kp = self._gains[0]
+        if Ki is None:
+            Ki = self._gains[1]
+        if Kd is None:
+            Kd = self._gains[2]
+        a, b = self._linearize()
+        phi, gamma = linear_screen.discretize(a, b, self._delta_time,
+                                              self._control_interval)
+        # NOTE: simulate_with_control passes the process time step to
+        # the controller, not the control delta, so the integral and
+        # derivative are scaled by delta_time.
+        sample_period = self._control_interval * self._delta_time
+        result = linear_screen.screen(
+            phi, gamma, Kp, Ki, Kd, self._history_length, self._delta_time,
+            sample_period, min_damping, min_gain_margin, min_phase_margin)
+        return result
+
+    def enable_trace(self, capacity=None):
+        """Record the P, I and D contributions of each controller call.
+
+        Keyword arguments:
+
+        capacity -- number of controller calls kept, defaults to all
+        the calls made during simulate_with_control. [int]
+        """
+        if capacity is None:
+            capacity = max(1, len(self._time) // self._control_interval)
+        self._pid.enable_trace(capacity)
+
+    def save_trace(self, filename):
+        """Save the chronologically ordered controller trace as .npy
+        """
+        trace = self._pid.trace_ordered()
+        print("Writing {0} controller trace records to {1}".format(
+            len(trace), filename))
+        np.save(filename, trace)
 
     def simulate_no_control(self):
         """
         """
-        self._state_no_control = np.zeros(len(self._time))
+        self._state_no_control = np.zeros(len(self._time), dtype=self._dtype)
         self._state_no_control[0] = self._initial_condition
         for t in range(1, len(self._time)):
             previous_state = self._state_no_control[t-1]
@@ -178,23 +560,190 @@ class PIDDemoBase(object):
     def simulate_with_control(self):
         """
         """
-        self._state_control = np.zeros(len(self._time))
-        self._control = np.zeros(len(self._time))
+        self._state_control = np.zeros(len(self._time), dtype=self._dtype)
+        self._control = np.zeros(len(self._time), dtype=self._dtype)
         self._state_control[0] = self._initial_condition
         self._control[0] = self._control_bias
+        if self._initial_control is not None:
+            self._control[0] = self._initial_control
         control = self._control[0]
+        self._termination_reason = termination.COMPLETED
+        if self._termination:
+            self._termination.reset()
+        if self._event_trigger:
+            self._event_trigger.reset(self._initial_condition)
         for t in range(1, len(self._time)):
             previous_state = self._state_control[t-1]
             process_value = self.process(self._forcing[t], self._delta_time,
                                          previous_state, control)
             self._state_control[t] = process_value
             if t % self._control_interval == 0:
-                control_delta = self._pid.control(process_value,
-                                                  self._delta_time)
-                control = self._control_bias - control_delta
+                ticks = 1
+                if self._event_trigger:
+                    ticks = self._event_trigger.check(process_value)
+                if ticks:
+                    # NOTE: the controller receives delta_time per
+                    # control tick since its last call, an event
+                    # triggered controller called at every tick matches
+                    # the periodic one.
+                    control_delta = self._pid.control(
+                        process_value, ticks * self._delta_time)
+                    control = self._control_bias - control_delta
+                if self._termination and self._check_termination(
+                        t, process_value, control):
+                    self._control[t] = control
+                    self._state_control = self._state_control[:t + 1]
+                    self._control = self._control[:t + 1]
+                    break
             # NOTE(bja, 2016-11) for plotting. Want control at all
             # time points, not just when it is being changed!
             self._control[t] = control
+        if self._event_trigger:
+            self._controller_calls = self._event_trigger.calls
+
+    def _saturated(self, process_value, control):
+        """Whether the process or control is at a limit, for the
+        saturation dwell criterion of early termination.
+        """
+        return False
+
+    def _check_termination(self, step, process_value, control):
+        """Check the stop criteria at a control tick, record the
+        reason and return True to stop the simulation.
+        """
+        reason = self._termination.check(
+            step, process_value, self._saturated(process_value, control))
+        if reason is None:
+            return False
+        self._termination_reason = reason
+        return True
+
+    def cost_and_gradient(self, gains=None, cost='ise'):
+        """Closed loop cost and its gradient with respect to the gains
+        from a single forward sensitivity simulation.
+
+        Same loop as simulate_with_control, with the double precision
+        controller replica sensitivity.PIDSensitivity and
+        process_sensitivity, so the cost agrees with the native
+        simulation to single precision. The signature suits gradient
+        based optimizers, e.g. scipy.optimize.minimize(..., jac=True)
+        with non-negative bounds.
+
+        Keyword arguments:
+
+        gains -- (Kp, Ki, Kd), defaults to the configured gains. [array]
+
+        cost -- 'ise' or 'iae', integral of the squared or absolute
+        error over the controlled simulation, see metrics. [str]
+
+        Returns:
+        cost, gradient -- cost and d(cost)/d(Kp, Ki, Kd). [float, np.ndarray]
+        """
+        if not self._supports_sensitivity:
+            raise RuntimeError("{0} does not support sensitivities".format(
+                type(self).__name__))
+        if self._schedule is not None:
+            raise RuntimeError("Sensitivities do not support gain "
+                               "schedules.")
+        if self._warm_start:
+            raise RuntimeError("Sensitivities do not support warm starts.")
+        if self._event_trigger:
+            raise RuntimeError("Sensitivities do not support event "
+                               "triggered control.")
+        if gains is None:
+            gains = self._gains
+        Kp, Ki, Kd = [float(gain) for gain in gains]
+        if cost not in ['ise', 'iae', ]:
+            raise RuntimeError(
+                "Unknown cost '{0}', expected ise or iae".format(cost))
+
+        pid = sensitivity.PIDSensitivity(
+            self._history_length, self._set_point, Kp, Ki, Kd,
+            self._integral_mode, self._leak)
+        state = self._initial_condition
+        d_state = np.zeros(sensitivity.NUM_GAINS)
+        control = self._control_bias
+        d_control = np.zeros(sensitivity.NUM_GAINS)
+
+        error = state - self._set_point
+        total = error**2 if cost == 'ise' else abs(error)
+        gradient = np.zeros(sensitivity.NUM_GAINS)
+        for t in range(1, len(self._time)):
+            state, d_state = self.process_sensitivity(
+                self._forcing[t], self._delta_time, state, control,
+                d_state, d_control)
+            if t % self._control_interval == 0:
+                output, d_output = pid.control(state, d_state,
+                                               self._delta_time)
+                control = self._control_bias - output
+                d_control = -d_output
+            error = state - self._set_point
+            if cost == 'ise':
+                total += error**2
+                gradient += 2.0 * error * d_state
+            else:
+                total += abs(error)
+                gradient += np.sign(error) * d_state
+        return total * self._delta_time, gradient * self._delta_time
+
+    def process_sensitivity(self, forcing, delta_time, previous_state,
+                            control_bias, d_previous_state, d_control_bias):
+        """Advance the process one time step, like process, and
+        propagate the derivatives of the state and control with
+        respect to the gains. Returns (state, d_state).
+        """
+        return None
+
+    def control_period(self):
+        """Simulated time between controller calls, the control delta
+        rounded to whole time steps. [s]
+        """
+        return self._control_interval * self._delta_time
+
+    def control_interval(self):
+        """Time steps between controller calls.
+        """
+        return self._control_interval
+
+    def control_from_output(self, output):
+        """Control applied for a controller output, control = bias -
+        output, as in simulate_with_control. output may be an array.
+        """
+        return self._control_bias - output
+
+    def simulate_realtime(self, speedup=1.0, cpu=None):
+        """Run simulate_with_control on a dedicated thread with the
+        controller paced to wall clock time, one call every control
+        delta / speedup seconds. See realtime.PacedController.
+
+        Keyword arguments:
+
+        speedup -- ratio of simulated to wall clock time. [float]
+
+        cpu -- optional cpu to pin the thread to. [int]
+
+        Returns:
+        statistics -- per tick timing, see
+        realtime.PacedController.statistics. [dict]
+        """
+        pid = self._pid
+        self._pid = realtime.PacedController(
+            pid, self.control_period() / speedup)
+        try:
+            realtime.run_on_thread(self.simulate_with_control, cpu)
+            statistics = self._pid.statistics()
+        finally:
+            self._pid = pid
+        return statistics
+
+    def _plot_series(self, values, **kwargs):
+        """Plot a trajectory against time, min/max decimated to about
+        screen resolution.
+        """
+        # a terminated simulation is shorter than the time axis
+        plt.plot(*minmax_decimate(self._time[:len(values)], values,
+                                  self._plot_bins),
+                 **kwargs)
 
     def plot(self):
         """
@@ -203,30 +752,173 @@ class PIDDemoBase(object):
         ncols = 1
         plt.figure(1)
         plt.subplot(nrows, ncols, 1)
-        plt.plot(self._time, self._state_control, label='controled')
-        plt.plot(self._time, self._state_no_control, label='no control')
-        set_point = self._set_point * np.ones(len(self._time))
-        plt.plot(self._time, set_point, label='set point')
+        self._plot_series(self._state_control, label='controled')
+        self._plot_series(self._state_no_control, label='no control')
+        plt.axhline(self._set_point, label='set point', color='k')
         plt.legend(loc='best', ncol=2)
         plt.ylabel("Process variable [{0}]".format(self._units['process']))
 
         plt.subplot(nrows, ncols, 2)
-        plt.plot(self._time, self._control, label='control variable')
-        control_bias = self._control_bias * np.ones(len(self._time))
-        plt.plot(self._time, control_bias, label='control_bias')
+        self._plot_series(self._control, label='control variable')
+        plt.axhline(self._control_bias, label='control_bias', color='k')
         plt.legend(loc='best', ncol=2)
         plt.ylabel("control variable [{0}]".format(self._units['control']))
 
         plt.subplot(nrows, ncols, 3)
-        plt.plot(self._time, self._forcing, label='forcing')
-        forcing_mean = self._forcing_mean * np.ones(len(self._time))
-        plt.plot(self._time, forcing_mean, label='forcing mean')
+        self._plot_series(self._forcing, label='forcing')
+        plt.axhline(self._forcing_mean, label='forcing mean', color='k')
 
         plt.legend(loc='best', ncol=2)
         plt.ylabel("Forcing [{0}]".format(self._units['forcing']))
         plt.xlabel("time [{0}]".format(self._units['time']))
         plt.show()
 
+    @classmethod
+    def forcing_seed(cls):
+        """Seed used for random forcing.
+        """
+        return cls._forcing_seed
+
+    def parameters(self):
+        """Controller and forcing parameters of the run.
+
+        Returns a json serializable dict with Kp, Ki, Kd,
+        history_length, integral_mode, forcing_mean and
+        forcing_standard_deviation. Per controller gains are averaged.
+        """
+        Kp, Ki, Kd = [float(np.mean(gain)) for gain in self._gains]
+        standard_deviation = self._forcing_standard_deviation or 0.0
+        parameters = {
+            'Kp': Kp,
+            'Ki': Ki,
+            'Kd': Kd,
+            'history_length': int(self._history_length),
+            'integral_mode': self._integral_mode,
+            'forcing_mean': float(self._forcing_mean),
+            'forcing_standard_deviation': float(standard_deviation),
+        }
+        return parameters
+
+    def metrics(self):
+        """Performance metrics of the controlled simulation.
+
+        Returns a json serializable dict:
+
+        final_process_value, final_error -- process value and pv - sp
+        at the end of the simulation.
+
+        iae, ise -- integral of the absolute and squared error.
+
+        max_abs_error -- largest |pv - sp|.
+
+        final_control, final_control_delta -- control value and
+        control - bias at the end of the simulation.
+
+        termination, termination_time -- reason the controlled
+        simulation ended, see termination.REASONS, and the simulated
+        time at the end. The other metrics cover the simulated time.
+
+        final_process_value_no_control -- process value at the end of
+        the simulation without control.
+        """
+        error = self._state_control - self._set_point
+        metrics = {
+            'final_process_value': float(self._state_control[-1]),
+            'final_error': float(error[-1]),
+            'iae': float(np.sum(np.abs(error)) * self._delta_time),
+            'ise': float(np.sum(error**2) * self._delta_time),
+            'max_abs_error': float(np.max(np.abs(error))),
+            'final_control': float(self._control[-1]),
+            'final_control_delta': float(self._control[-1] -
+                                         self._control_bias),
+            'final_process_value_no_control':
+            float(self._state_no_control[-1]),
+        }
+        metrics.update(self._termination_metrics())
+        metrics.update(self._event_trigger_metrics())
+        return metrics
+
+    def _termination_metrics(self):
+        """Termination reason and time of the controlled simulation.
+        """
+        return {
+            'termination': self._termination_reason,
+            'termination_time': float(self._time[len(self._state_control) -
+                                                 1]),
+        }
+
+    def _event_trigger_metrics(self):
+        """Controller calls of an event triggered simulation against
+        the control ticks, the calls of the periodic controller. Empty
+        without an event trigger.
+        """
+        if not self._event_trigger:
+            return {}
+        ticks = (len(self._state_control) - 1) // self._control_interval
+        calls = int(self._controller_calls)
+        return {
+            'controller_calls': calls,
+            'control_ticks': ticks,
+            'calls_saved': 1.0 - calls / ticks if ticks else 0.0,
+        }
+
+    def trajectories(self):
+        """Simulated trajectories as a dict of arrays. The termination
+        reason is a 0-d string array.
+        """
+        trajectories = {
+            'state_no_control': self._state_no_control,
+            'state_control': self._state_control,
+            'control': self._control,
+            'termination': np.array(self._termination_reason),
+        }
+        if self._event_trigger:
+            trajectories['controller_calls'] = np.array(
+                self._controller_calls)
+        return trajectories
+
+    def restore_trajectories(self, trajectories):
+        """Restore previously simulated trajectories, e.g. from a cache.
+        """
+        self._state_no_control = trajectories['state_no_control']
+        self._state_control = trajectories['state_control']
+        self._control = trajectories['control']
+        # results saved before early termination ran to completion
+        self._termination_reason = str(trajectories.get(
+            'termination', termination.COMPLETED))
+        if 'controller_calls' in trajectories:
+            self._controller_calls = int(trajectories['controller_calls'])
+
+    def save_trajectories(self, directory):
+        """Save time, forcing and the simulated trajectories as one .npy
+        file per variable in directory, so they can be memory mapped
+        by load_trajectories.
+        """
+        os.makedirs(directory, exist_ok=True)
+        arrays = self.trajectories()
+        arrays['time'] = self._time
+        if self._forcing is not None:
+            arrays['forcing'] = self._forcing
+        print("Writing trajectories to {0}".format(directory))
+        for name, values in sorted(arrays.items()):
+            np.save(os.path.join(directory, "{0}.npy".format(name)), values)
+
+    def load_trajectories(self, directory):
+        """Memory map trajectories written by save_trajectories instead
+        of simulating. The configuration must match the saved run.
+        """
+        def load(name):
+            return np.load(os.path.join(directory, "{0}.npy".format(name)),
+                           mmap_mode='r')
+
+        self._time = load('time')
+        if os.path.isfile(os.path.join(directory, 'forcing.npy')):
+            self._forcing = load('forcing')
+        names = [name for name in self.trajectories()
+                 if name != 'termination' or
+                 os.path.isfile(os.path.join(directory, 'termination.npy'))]
+        self.restore_trajectories({name: load(name) for name in names})
+
     def summary(self):
         """summar of the final system state
         """
@@ -239,6 +931,17 @@ class PIDDemoBase(object):
             value - self._set_point, self._units['process']))
 
         print("  With control:")
+        if self._termination_reason != termination.COMPLETED:
+            print("    Terminated early: {0} at {1:1.6e} [{2}]".format(
+                self._termination_reason,
+                self._termination_metrics()['termination_time'],
+                self._units['time']))
+        if self._event_trigger:
+            calls = self._event_trigger_metrics()
+            print("    Controller calls = {0} of {1} control ticks, {2:.1%} "
+                  "saved".format(calls['controller_calls'],
+                                 calls['control_ticks'],
+                                 calls['calls_saved']))
         value = self._state_no_control[-1]
         print("    Final process value = {0:1.6e} [{1}]".format(
             value, self._units['process']))
@@ -250,13 +953,54 @@ class PIDDemoBase(object):
         print("    control - bias = {0:1.6e} [{1}]".format(
             value - self._control_bias, self._units['control']))
 
-    def run(self):
-        """
+    def run(self, cache=None, cache_key=None, trajectory_directory=None):
+        """Simulate without and with control, summarize and plot.
+
+        Keyword arguments:
+
+        cache -- optional result_cache.ResultCache. On a hit for
+        cache_key the simulations are skipped. [ResultCache]
+
+        cache_key -- key of this configuration in the cache. [str]
+
+        trajectory_directory -- if not None, save the trajectories
+        here before plotting, see save_trajectories. [str]
         """
-        self.simulate_no_control()
-        self.simulate_with_control()
-        self.summary()
-        self.plot()
+        if self._profile:
+            self._profile.count_calls(self, 'process')
+            self._profile.count_calls(self._pid, 'control', 'PID.control')
+            self._pid.reset_counters()
+
+        cached = None
+        if cache:
+            with self._phase('cache_load'):
+                cached = cache.load(cache_key)
+        if cached:
+            print("Using cached results: {0}".format(cache_key))
+            trajectories, _ = cached
+            self.restore_trajectories(trajectories)
+        else:
+            with self._phase('simulate_no_control'):
+                self.simulate_no_control()
+            with self._phase('simulate_with_control'):
+                self.simulate_with_control()
+            if cache:
+                with self._phase('cache_store'):
+                    cache.store(cache_key, self.trajectories(),
+                                self.metrics())
+
+        if trajectory_directory:
+            with self._phase('save_trajectories'):
+                self.save_trajectories(trajectory_directory)
+
+        with self._phase('summary'):
+            self.summary()
+        with self._phase('plot'):
+            self.plot()
+
+        if self._profile:
+            self._profile.record_native_counters('pid_control',
+                                                 self._pid.counters())
 
     @abc.abstractmethod
     def process(self, forcing, delta_time, previous_state, control_bias):
@@ -282,6 +1026,13 @@ class PIDDemoBase(object):
         """
         return None
 
+    @abc.abstractmethod
+    def _linearize(self):
+        """Linearize the process around the set point and control bias,
+        d(dPV)/dt = a * dPV + b * dCV. Returns (a, b).
+        """
+        return None
+
     @abc.abstractmethod
     def _calculate_time_scales(self, q_in, h_sp, a_out, h):
         """Estimate the time scales of the problem:
@@ -0,0 +1,302 @@
+#!/usr/bin/env python
+"""Demo for any process model in the process_models registry.
+
+An ensemble of num_processes independent copies of the model, each
+with its own random forcing and pid controller, is advanced with
+array operations. The controllers are driven through a PIDBank in one
+native call per control step. The recorded trajectories are the
+ensemble means, a single process by default.
+
+Configuration, in addition to the model parameters:
+
+  [process]
+  type = fopdt | second_order | heater | tank
+  num_processes = 1
+  precision = float64 | float32
+
+Copyright (c) 2016 Benjamin J. Andre
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v.  2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+#
+# built-in modules
+#
+import sys
+import traceback
+
+#
+# installed dependencies
+#
+import numpy as np
+
+#
+# other modules in this package
+#
+import demo_base
+from demo_tank import DrainingTankDemo
+from demo_tank_network import TankNetworkDemo
+from pid import PIDBank
+import process_models
+import termination
+
+if sys.hexversion < 0x03050000:
+    print(70 * "*")
+    print("ERROR: {0} requires python >= 3.5.x. ".format(sys.argv[0]))
+    print("It appears that you are running python {0}".format(
+        ".".join(str(x) for x in sys.version_info[0:3])))
+    print(70 * "*")
+    sys.exit(1)
+
+# process types with a dedicated demo, other types are looked up in
+# the process model registry. Set [process] batched = true to run a
+# tank with ModelDemo instead.
+DEMOS = {
+    'tank': DrainingTankDemo,
+    'tank_network': TankNetworkDemo,
+}
+
+
+def demo_class(config):
+    """Return the demo class for [process] type.
+    """
+    process_type = config["process"]["type"]
+    batched = config.getboolean("process", "batched", fallback=False)
+    if process_type in DEMOS and not batched:
+        return DEMOS[process_type]
+    if process_type in process_models.MODELS:
+        return ModelDemo
+    raise RuntimeError("Unknown process type '{0}', expected one of: "
+                       "{1}".format(process_type, ", ".join(
+                           sorted(set(DEMOS) | set(process_models.MODELS)))))
+
+
+def create_demo(config, profile=None):
+    """Create the demo for [process] type.
+    """
+    return demo_class(config)(config, profile)
+
+
+class ModelDemo(demo_base.PIDDemoBase):
+    """
+    state(t+1) = model.step(state(t), control(t), forcing(t), dt)
+
+    control = bias + action * pid output
+    """
+
+    def __init__(self, config, profile=None):
+        """
+        """
+        super().__init__(profile)
+        self._model = process_models.create_model(config)
+        self._initialize_units(dict(self._model.units))
+        self._initialize_precision(config)
+
+        self._num_processes = config.getint("process", "num_processes",
+                                            fallback=1)
+        print("Process model: {0}, {1} processes".format(
+            config["process"]["type"], self._num_processes))
+
+        self._initial_condition = config.getfloat("process",
+                                                  "initial_condition")
+        self._set_point = config.getfloat("process", "set_point")
+
+        self._initialize_simulation_time(
+            config.getfloat("time", "delta"), config.getfloat("time", "max"))
+
+        # forcing is generated one step at a time for the whole
+        # ensemble, the ensemble mean is recorded for plotting.
+        with self._phase('forcing'):
+            self._forcing_type = config["forcing"]["type"]
+            self._forcing_mean = config.getfloat("forcing", "mean")
+            self._forcing_standard_deviation = 0.0
+            if self._forcing_type == "normal":
+                self._forcing_standard_deviation = config.getfloat(
+                    "forcing", "standard_deviation")
+            elif self._forcing_type != "constant":
+                message = "Unknown forcing type '{0}'.".format(
+                    self._forcing_type)
+                raise RuntimeError(message)
+            self._forcing = np.zeros(len(self._time), dtype=self._dtype)
+
+        self._initialize_controller_time(config.getfloat("control", "delta"))
+
+        if config["control"]["control_bias"] == "calculate":
+            bias = self._calculate_control_bias(self._forcing_mean,
+                                                self._set_point)
+        else:
+            bias = config["control"]["control_bias"]
+        self._control_bias = float(bias)
+
+        Kp = config["control"]["Kp"]
+        if Kp == "calculate":
+            Kp = abs(self._calculate_dCVdPV(self._forcing_mean,
+                                            self._set_point))
+        else:
+            Kp = float(Kp)
+
+        history_length = int(config["control"]["history_length"])
+        Ki = config.getfloat("control", "Ki")
+        Kd = config.getfloat("control", "Kd")
+        integral_mode, leak = self._integral_mode_config(config)
+        print("Initializing {0} PID controllers:".format(self._num_processes))
+        print("  integral mode = {0}".format(integral_mode))
+        print("  history length = {0}".format(history_length))
+        print("  set_point = {0}".format(self._set_point))
+        print("  Kp = {0}".format(Kp))
+        print("  Ki = {0}".format(Ki))
+        print("  Kd = {0}".format(Kd))
+        self._pid = PIDBank(self._num_processes, history_length,
+                            self._set_point, Kp, Ki, Kd, integral_mode, leak,
+                            self._delta_time)
+        self._history_length = history_length
+        self._integral_mode = integral_mode
+        self._leak = leak
+        self._gains = (Kp, Ki, Kd)
+        self._initialize_schedule(config)
+        self._initialize_warm_start(config)
+        self._initialize_event_trigger(config)
+        self._initialize_termination(config)
+
+    def _external_forcing(self, random_state):
+        """Forcing of every process for one time step.
+        """
+        if self._forcing_type == "constant":
+            return self._forcing_mean * np.ones(self._num_processes,
+                                                dtype=self._dtype)
+        return random_state.normal(self._forcing_mean,
+                                   self._forcing_standard_deviation,
+                                   self._num_processes).astype(self._dtype)
+
+    def process(self, forcing, delta_time, previous_state, control_bias):
+        """Advance every process one time step, see ProcessModel.step.
+        """
+        return self._model.step(previous_state, control_bias, forcing,
+                                delta_time)
+
+    def _simulate(self, controlled):
+        """Advance the ensemble over the full time, recording the
+        ensemble mean process value, control and forcing.
+        """
+        random_state = np.random.RandomState(self._forcing_seed)
+        num_steps = len(self._time)
+        mean_value = np.zeros(num_steps, dtype=self._dtype)
+        mean_control = np.zeros(num_steps, dtype=self._dtype)
+
+        control = self._control_bias * np.ones(self._num_processes,
+                                               dtype=self._dtype)
+        forcing = self._forcing_mean * np.ones(self._num_processes,
+                                               dtype=self._dtype)
+        state = self._model.initial_state(self._initial_condition,
+                                          self._num_processes, control,
+                                          forcing, self._dtype)
+        mean_value[0] = self._initial_condition
+        mean_control[0] = self._control_bias
+        self._forcing[0] = self._forcing_mean
+        action = self._model.action
+        if controlled:
+            self._termination_reason = termination.COMPLETED
+            if self._termination:
+                self._termination.reset()
+        for t in range(1, num_steps):
+            forcing = self._external_forcing(random_state)
+            state = self.process(forcing, self._delta_time, state, control)
+            process_value = self._model.output(state)
+            stop = False
+            if controlled and t % self._control_interval == 0:
+                output = self._pid.control(process_value, self._delta_time)
+                control = (self._control_bias + action * output).astype(
+                    self._dtype, copy=False)
+                stop = self._termination and self._check_termination(
+                    t, process_value, control)
+            mean_value[t] = np.mean(process_value)
+            mean_control[t] = np.mean(control)
+            self._forcing[t] = np.mean(forcing)
+            if stop:
+                num_steps = t + 1
+                break
+        return mean_value[:num_steps], mean_control[:num_steps]
+
+    def _saturated(self, process_value, control):
+        """Any process is saturated, see ProcessModel.saturated.
+        """
+        return bool(np.any(self._model.saturated(process_value, control)))
+
+    def simulate_no_control(self):
+        """
+        """
+        self._state_no_control, _ = self._simulate(False)
+
+    def simulate_with_control(self):
+        """
+        """
+        self._state_control, self._control = self._simulate(True)
+
+    def control_from_output(self, output):
+        """
+        """
+        return self._control_bias + self._model.action * output
+
+    def enable_trace(self, capacity=None):
+        """
+        """
+        raise RuntimeError("Tracing is not supported for process models.")
+
+    def trajectories(self):
+        """
+        """
+        trajectories = super().trajectories()
+        trajectories['forcing'] = self._forcing
+        return trajectories
+
+    def restore_trajectories(self, trajectories):
+        """
+        """
+        super().restore_trajectories(trajectories)
+        self._forcing = trajectories['forcing']
+
+    def _calculate_control_bias(self, steady_state_forcing, set_point):
+        """
+        """
+        bias = self._model.steady_state_control(steady_state_forcing,
+                                                set_point)
+        print("Steady state control bias = {0:1.6e} [{1}]".format(
+            bias, self._units['control']))
+        return bias
+
+    def _calculate_set_point(self):
+        """
+        """
+        raise RuntimeError("Process models require a set point.")
+
+    def _calculate_dCVdPV(self, steady_state_forcing, set_point):
+        """
+        """
+        return self._model.dcv_dpv(steady_state_forcing, set_point)
+
+    def _linearize(self):
+        """Model linearization, with the sign of the input gain changed
+        for direct acting models since linear_screen assumes
+        control = bias - pid output.
+        """
+        a, b = self._model.linearize(self._forcing_mean, self._set_point,
+                                     self._control_bias)
+        return a, -self._model.action * b
+
+    def _calculate_time_scales(self, q_in, h_sp, a_out, h):
+        """
+        """
+        return None
+
+
+if __name__ == "__main__":
+    try:
+        print("Module has no main functionality. Please run pid-driver.py")
+        sys.exit(0)
+    except Exception as error:
+        print(str(error))
+        traceback.print_exc()
+        sys.exit(1)
@@ -73,6 +73,7 @@ import traceback
 #
 # installed dependencies
 #
+import numpy as np
 
 #
 # other modules in this package
@@ -101,16 +102,21 @@ class DrainingTankDemo(demo_base.PIDDemoBase):
     h_tp1 = h_t + Q_in(t) * dt / A_r - c1 * dt * A_out(t) * sqrt(h_t)
     """
 
-    def __init__(self, config):
+    _supports_sensitivity = True
+    _supports_warm_start = True
+    _supports_event_trigger = True
+
+    def __init__(self, config, profile=None):
         """
         """
-        super().__init__()
+        super().__init__(profile)
 
         units = {'process': 'm',
                  'control': 'm^2',
                  'forcing': 'm^3/s',
                  'time': 's', }
         self._initialize_units(units)
+        self._initialize_precision(config)
 
         # problem specific data that may be used in later
         # calculations, e.g. dCV/dPV
@@ -129,17 +135,18 @@ class DrainingTankDemo(demo_base.PIDDemoBase):
             config.getfloat("time", "delta"), config.getfloat("time", "max"))
 
         # initialize forcing
-        forcing_type = config["forcing"]["type"]
-        if forcing_type == "constant":
-            self._initialize_constant_forcing(config.getfloat("forcing",
-                                                              "mean"))
-        elif forcing_type == "normal":
-            self._initialize_normal_forcing(
-                config.getfloat("forcing", "mean"),
-                config.getfloat("forcing", "standard_deviation"))
-        else:
-            message = "Unknown forcing type '{0}'.".format(forcing_type)
-            raise RuntimeError(message)
+        with self._phase('forcing'):
+            forcing_type = config["forcing"]["type"]
+            if forcing_type == "constant":
+                self._initialize_constant_forcing(config.getfloat("forcing",
+                                                                  "mean"))
+            elif forcing_type == "normal":
+                self._initialize_normal_forcing(
+                    config.getfloat("forcing", "mean"),
+                    config.getfloat("forcing", "standard_deviation"))
+            else:
+                message = "Unknown forcing type '{0}'.".format(forcing_type)
+                raise RuntimeError(message)
 
         # initialize controller
         self._initialize_controller_time(config.getfloat("control", "delta"))
@@ -163,7 +170,12 @@ class DrainingTankDemo(demo_base.PIDDemoBase):
                              self._set_point, Kp,
                              config.getfloat("control", "Ki"),
                              config.getfloat("control", "Kd"),
-                             self._control_bias)
+                             self._control_bias,
+                             *self._integral_mode_config(config))
+        self._initialize_schedule(config)
+        self._initialize_warm_start(config)
+        self._initialize_event_trigger(config)
+        self._initialize_termination(config)
 
     def process(self, forcing, delta_time, previous_state, control_bias):
         """
@@ -183,6 +195,30 @@ class DrainingTankDemo(demo_base.PIDDemoBase):
             h_tp1 = 0.0
         return h_tp1
 
+    def _saturated(self, process_value, control):
+        """The tank is empty, or the controller asks for a negative
+        outlet area.
+        """
+        return process_value <= 0.0 or control < 0.0
+
+    def process_sensitivity(self, forcing, delta_time, previous_state,
+                            control_bias, d_previous_state, d_control_bias):
+        """Differentiate the Euler update of process:
+
+        dh(t+1) = dh(t) - c1 * dt * (dA_out * sqrt(h) + A_out * dh / (2 * sqrt(h)))
+
+        The derivative is zero while the tank is empty.
+        """
+        h_tp1 = self.process(forcing, delta_time, previous_state,
+                             control_bias)
+        if h_tp1 <= 0.0 or previous_state <= 0.0:
+            return h_tp1, np.zeros_like(d_previous_state)
+        sqrt_h = math.sqrt(previous_state)
+        d_h_tp1 = d_previous_state - self._c1 * delta_time * (
+            d_control_bias * sqrt_h +
+            control_bias * d_previous_state / (2.0 * sqrt_h))
+        return h_tp1, d_h_tp1
+
     def _calculate_control_bias(self, steady_state_forcing, set_point):
         """
         A_out = Q_in / sqrt(2*g*h)
@@ -218,6 +254,18 @@ class DrainingTankDemo(demo_base.PIDDemoBase):
                   dAdh, self._units['control'], self._units['process']))
         return dAdh
 
+    def _linearize(self):
+        """Linearize dh/dt = Q_in / A_r - c1 * A_out * sqrt(h) around the
+        set point and control bias:
+        a = d(dh/dt)/dh = -c1 * A_out / (2 * sqrt(h_sp))
+        b = d(dh/dt)/dA_out = -c1 * sqrt(h_sp)
+        """
+        h_sp = self._set_point
+        a_out = self._control_bias
+        a = -self._c1 * a_out / (2.0 * math.sqrt(h_sp))
+        b = -self._c1 * math.sqrt(h_sp)
+        return a, b
+
     def _calculate_time_scales(self, q_in, h_sp, a_out, h):
         """Estimate the time scales of the problem:
         Time to fill = A_r * (h_sp-h) / q_in
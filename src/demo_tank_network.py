@@ -0,0 +1,383 @@
+#!/usr/bin/env python
+"""Network of coupled draining tanks, one pid controller per tank.
+
+Each tank is the draining tank of demo_tank. A fraction of the
+outflow of tank i feeds the inflow of a downstream tank j, the rest
+leaves the network:
+
+A_r * dh_j/dt = Q_ext_j(t) + sum_i W_ij * Q_out_i - Q_out_j
+
+Q_out_i = A_out_i(t) * sqrt(2*g*h_i)
+
+The coupling W is stored as a sparse edge list (source, destination,
+weight). The network is advanced with array operations on the state
+vector h, and all the controllers are driven through a PIDBank in one
+native call per control step.
+
+process variable - height of fluid in each tank
+control variable - area of outflow valve of each tank
+
+Copyright (c) 2016 Benjamin J. Andre
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v.  2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+#
+# built-in modules
+#
+import math
+import sys
+import traceback
+
+#
+# installed dependencies
+#
+import numpy as np
+import matplotlib.pyplot as plt
+
+#
+# other modules in this package
+#
+import demo_base
+from pid import PIDBank
+import termination
+
+
+if sys.hexversion < 0x03050000:
+    print(70 * "*")
+    print("ERROR: {0} requires python >= 3.5.x. ".format(sys.argv[0]))
+    print("It appears that you are running python {0}".format(
+        ".".join(str(x) for x in sys.version_info[0:3])))
+    print(70 * "*")
+    sys.exit(1)
+
+
+def network_edges(num_tanks, topology, coupling, seed):
+    """Build the coupling as an edge list.
+
+    topology -- 'cascade': tank i drains into tank i+1. 'random': tank
+    i drains into a random tank with a larger index, so the network is
+    acyclic. [str]
+
+    coupling -- fraction of each outflow routed downstream. [float]
+
+    Returns (source, destination, weight) arrays, sorted by source.
+    """
+    source = np.arange(num_tanks - 1)
+    if topology == "cascade":
+        destination = source + 1
+    elif topology == "random":
+        state = np.random.RandomState(seed)
+        destination = source + 1 + np.floor(
+            state.random_sample(num_tanks - 1) *
+            (num_tanks - 1 - source)).astype(source.dtype)
+    else:
+        message = "Unknown network topology '{0}'.".format(topology)
+        raise RuntimeError(message)
+    weight = coupling * np.ones(num_tanks - 1)
+    return source, destination, weight
+
+
+class TankNetworkDemo(demo_base.PIDDemoBase):
+    """
+    h_tp1 = h_t + (Q_ext + W^T Q_out - Q_out) * dt / A_r
+    """
+
+    def __init__(self, config, profile=None):
+        """
+        """
+        super().__init__(profile)
+        self._max_error_no_control = None
+        self._max_error_control = None
+
+        units = {'process': 'm',
+                 'control': 'm^2',
+                 'forcing': 'm^3/s',
+                 'time': 's', }
+        self._initialize_units(units)
+        self._initialize_precision(config)
+
+        self._A_r = 5.0  # [m]
+        self._g = 9.81  # [m^2/s]
+        self._c1 = math.sqrt(2.0 * self._g) / self._A_r
+
+        self._num_tanks = config.getint("process", "num_tanks")
+        topology = config.get("process", "topology", fallback="cascade")
+        coupling = config.getfloat("process", "coupling", fallback=0.5)
+        self._source, self._destination, self._weight = network_edges(
+            self._num_tanks, topology, coupling, self._forcing_seed)
+        print("Tank network: {0} tanks, {1} topology, coupling {2}".format(
+            self._num_tanks, topology, coupling))
+
+        self._initial_condition = config.getfloat("process",
+                                                  "initial_condition")
+        self._set_point = config.getfloat("process", "set_point")
+
+        self._initialize_simulation_time(
+            config.getfloat("time", "delta"), config.getfloat("time", "max"))
+
+        # forcing is generated one step at a time, a full (time, tank)
+        # array does not fit in memory for large networks.
+        with self._phase('forcing'):
+            self._forcing_type = config["forcing"]["type"]
+            self._forcing_mean = config.getfloat("forcing", "mean")
+            self._forcing_standard_deviation = 0.0
+            if self._forcing_type == "normal":
+                self._forcing_standard_deviation = config.getfloat(
+                    "forcing", "standard_deviation")
+            elif self._forcing_type != "constant":
+                message = "Unknown forcing type '{0}'.".format(
+                    self._forcing_type)
+                raise RuntimeError(message)
+
+        self._initialize_controller_time(config.getfloat("control", "delta"))
+
+        steady_inflow = self._steady_state_inflow(self._forcing_mean)
+        if config["control"]["control_bias"] == "calculate":
+            bias = self._calculate_control_bias(steady_inflow,
+                                                self._set_point)
+        else:
+            bias = float(config["control"]["control_bias"])
+        self._control_bias = np.full(self._num_tanks, bias, dtype=self._dtype)
+
+        Kp = config["control"]["Kp"]
+        if Kp == "calculate":
+            Kp = np.abs(self._calculate_dCVdPV(steady_inflow,
+                                               self._set_point))
+        else:
+            Kp = float(Kp)
+
+        history_length = int(config["control"]["history_length"])
+        Ki = config.getfloat("control", "Ki")
+        Kd = config.getfloat("control", "Kd")
+        integral_mode, leak = self._integral_mode_config(config)
+        print("Initializing {0} PID controllers:".format(self._num_tanks))
+        print("  integral mode = {0}".format(integral_mode))
+        print("  history length = {0}".format(history_length))
+        print("  set_point = {0}".format(self._set_point))
+        self._pid = PIDBank(self._num_tanks, history_length, self._set_point,
+                            Kp, Ki, Kd, integral_mode, leak,
+                            self._delta_time)
+        print("  controller memory = {0} bytes".format(
+            self._pid.memory_size()))
+        self._history_length = history_length
+        self._integral_mode = integral_mode
+        self._gains = (Kp, Ki, Kd)
+        self._initialize_schedule(config)
+        self._initialize_warm_start(config)
+        self._initialize_event_trigger(config)
+        self._initialize_termination(config)
+
+    def _steady_state_inflow(self, external_inflow):
+        """Total inflow of each tank when every tank is at steady state:
+        Q_j = Q_ext + sum_i W_ij * Q_i, solved in source order since the
+        network is acyclic.
+        """
+        inflow = external_inflow * np.ones(self._num_tanks)
+        for s, d, w in zip(self._source, self._destination, self._weight):
+            inflow[d] += w * inflow[s]
+        return inflow
+
+    def _external_forcing(self, random_state):
+        """External inflow to every tank for one time step.
+        """
+        if self._forcing_type == "constant":
+            return self._forcing_mean
+        return random_state.normal(self._forcing_mean,
+                                   self._forcing_standard_deviation,
+                                   self._num_tanks).astype(self._dtype)
+
+    def process(self, forcing, delta_time, previous_state, control_bias):
+        """Advance every tank one time step.
+
+        forcing -- external inflow to each tank. [np.ndarray or float]
+        previous_state -- height of each tank. [np.ndarray]
+        control_bias -- outlet area of each tank. [np.ndarray]
+        """
+        h_t = previous_state
+        q_out = self._c1 * self._A_r * control_bias * np.sqrt(h_t)
+        # NOTE: bincount always sums in float64
+        q_in = forcing + np.bincount(self._destination,
+                                     weights=self._weight *
+                                     q_out[self._source],
+                                     minlength=self._num_tanks).astype(
+                                         h_t.dtype, copy=False)
+        h_tp1 = h_t + (q_in - q_out) * delta_time / self._A_r
+        np.maximum(h_tp1, 0.0, out=h_tp1)
+        return h_tp1
+
+    def _simulate(self, controlled):
+        """Advance the network over the full time, recording the network
+        mean height, the largest |h - sp| and the mean control.
+        """
+        random_state = np.random.RandomState(self._forcing_seed)
+        num_steps = len(self._time)
+        mean_state = np.zeros(num_steps, dtype=self._dtype)
+        max_error = np.zeros(num_steps, dtype=self._dtype)
+        mean_control = np.zeros(num_steps, dtype=self._dtype)
+
+        state = self._initial_condition * np.ones(self._num_tanks,
+                                                  dtype=self._dtype)
+        control = self._control_bias.copy()
+        mean_state[0] = self._initial_condition
+        max_error[0] = abs(self._initial_condition - self._set_point)
+        mean_control[0] = np.mean(control)
+        if controlled:
+            self._termination_reason = termination.COMPLETED
+            if self._termination:
+                self._termination.reset()
+        for t in range(1, num_steps):
+            forcing = self._external_forcing(random_state)
+            state = self.process(forcing, self._delta_time, state, control)
+            stop = False
+            if controlled and t % self._control_interval == 0:
+                control_delta = self._pid.control(state, self._delta_time)
+                np.subtract(self._control_bias, control_delta, out=control)
+                stop = self._termination and self._check_termination(
+                    t, state, control)
+            mean_state[t] = np.mean(state)
+            max_error[t] = np.max(np.abs(state - self._set_point))
+            mean_control[t] = np.mean(control)
+            if stop:
+                num_steps = t + 1
+                break
+        return (state, mean_state[:num_steps], max_error[:num_steps],
+                mean_control[:num_steps])
+
+    def _saturated(self, process_value, control):
+        """Any tank is empty or has a negative outlet area.
+        """
+        return bool(np.any(process_value <= 0.0) or np.any(control < 0.0))
+
+    def simulate_no_control(self):
+        """
+        """
+        (self._final_state_no_control, self._state_no_control,
+         self._max_error_no_control, _) = self._simulate(False)
+
+    def simulate_with_control(self):
+        """
+        """
+        (self._final_state_control, self._state_control,
+         self._max_error_control, self._control) = self._simulate(True)
+
+    def enable_trace(self, capacity=None):
+        """
+        """
+        raise RuntimeError("Tracing is not supported for tank networks.")
+
+    def metrics(self):
+        """Network metrics, see PIDDemoBase.metrics. Errors are for the
+        network mean height except max_abs_error and
+        final_max_abs_error, which are over all tanks.
+        """
+        error = self._state_control - self._set_point
+        metrics = {
+            'final_process_value': float(self._state_control[-1]),
+            'final_error': float(error[-1]),
+            'iae': float(np.sum(np.abs(error)) * self._delta_time),
+            'ise': float(np.sum(error**2) * self._delta_time),
+            'max_abs_error': float(np.max(self._max_error_control)),
+            'final_max_abs_error': float(self._max_error_control[-1]),
+            'final_control': float(self._control[-1]),
+            'final_control_delta': float(self._control[-1] -
+                                         np.mean(self._control_bias)),
+            'final_process_value_no_control':
+            float(self._state_no_control[-1]),
+        }
+        metrics.update(self._termination_metrics())
+        return metrics
+
+    def trajectories(self):
+        """
+        """
+        trajectories = super().trajectories()
+        trajectories['max_error_no_control'] = self._max_error_no_control
+        trajectories['max_error_control'] = self._max_error_control
+        return trajectories
+
+    def restore_trajectories(self, trajectories):
+        """
+        """
+        super().restore_trajectories(trajectories)
+        self._max_error_no_control = trajectories['max_error_no_control']
+        self._max_error_control = trajectories['max_error_control']
+
+    def summary(self):
+        """
+        """
+        print("Network summary, {0} tanks:".format(self._num_tanks))
+        for label, mean, max_error in [
+                ("Without control", self._state_no_control,
+                 self._max_error_no_control),
+                ("With control", self._state_control,
+                 self._max_error_control), ]:
+            print("  {0}:".format(label))
+            print("    Final mean process value = {0:1.6e} [{1}]".format(
+                mean[-1], self._units['process']))
+            print("    Final max |pv - sp| = {0:1.6e} [{1}]".format(
+                max_error[-1], self._units['process']))
+        if self._termination_reason != termination.COMPLETED:
+            print("  Terminated early: {0} at {1:1.6e} [{2}]".format(
+                self._termination_reason,
+                self._termination_metrics()['termination_time'],
+                self._units['time']))
+
+    def plot(self):
+        """
+        """
+        nrows = 3
+        ncols = 1
+        plt.figure(1)
+        plt.subplot(nrows, ncols, 1)
+        self._plot_series(self._state_control, label='controled')
+        self._plot_series(self._state_no_control, label='no control')
+        plt.axhline(self._set_point, label='set point', color='k')
+        plt.legend(loc='best', ncol=2)
+        plt.ylabel("mean process variable [{0}]".format(
+            self._units['process']))
+
+        plt.subplot(nrows, ncols, 2)
+        self._plot_series(self._max_error_control, label='controled')
+        self._plot_series(self._max_error_no_control,
+                          label='no control')
+        plt.legend(loc='best', ncol=2)
+        plt.ylabel("max |pv - sp| [{0}]".format(self._units['process']))
+
+        plt.subplot(nrows, ncols, 3)
+        self._plot_series(self._control, label='mean control variable')
+        plt.legend(loc='best', ncol=2)
+        plt.ylabel("control variable [{0}]".format(self._units['control']))
+        plt.xlabel("time [{0}]".format(self._units['time']))
+        plt.show()
+
+    def _calculate_control_bias(self, steady_state_forcing, set_point):
+        """
+        A_out = Q_in / sqrt(2*g*h)
+        """
+        return steady_state_forcing / np.sqrt(2.0 * self._g * set_point)
+
+    def _calculate_dCVdPV(self, steady_state_forcing, set_point):
+        """
+        dA/dh = (-q_in/2) * sqrt(1/2*g*h**3)
+        """
+        return ((-steady_state_forcing / 2.0) *
+                np.sqrt(1.0 / (2 * self._g * set_point**3)))
+
+
+# -------------------------------------------------------------------------------
+#
+# main
+#
+# -------------------------------------------------------------------------------
+if __name__ == "__main__":
+    try:
+        print("Module has no main functionality. Please run pid-driver.py")
+        sys.exit(0)
+    except Exception as error:
+        print(str(error))
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Event triggered control.
+
+The process is sampled at every control tick, but the controller is
+only called when the sample is informative, e.g. to save the
+bandwidth of a networked sensor or the cpu of the controller. The
+optional [event_trigger] section replaces the fixed control cadence:
+
+  [event_trigger]
+  # call when |pv - pv of the last call| exceeds this
+  process_threshold = 0.01
+  # call when |pv - sp| exceeds this
+  error_threshold = 0.05
+  # call at least this often [s]
+  max_interval = 100.0
+
+Every option is optional, at least one is required. The control is
+held between calls. The controller receives the time since its
+previous call, so the window integral weights each sample by its
+actual interval.
+
+Copyright (c) 2016 Benjamin J. Andre
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v.  2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+#
+# built-in modules
+#
+import sys
+import traceback
+
+#
+# installed dependencies
+#
+
+#
+# other modules in this package
+#
+
+if sys.hexversion < 0x03050000:
+    print(70 * "*")
+    print("ERROR: {0} requires python >= 3.5.x. ".format(sys.argv[0]))
+    print("It appears that you are running python {0}".format(
+        ".".join(str(x) for x in sys.version_info[0:3])))
+    print(70 * "*")
+    sys.exit(1)
+
+
+class EventTrigger(object):
+    """Decide at each control tick whether to call the controller.
+    """
+
+    def __init__(self, set_point, control_delta, process_threshold=None,
+                 error_threshold=None, max_interval=None):
+        """
+        Positional arguments:
+
+        set_point -- process set point. [float]
+        control_delta -- time between control ticks. [s]
+
+        Keyword arguments, None disables the criterion:
+
+        process_threshold -- bound on the change of the process value
+        since the last call. [float]
+        error_threshold -- bound on |pv - sp|. [float]
+        max_interval -- longest time between calls. [s]
+        """
+        if (process_threshold is None and error_threshold is None and
+                max_interval is None):
+            raise RuntimeError("Event trigger requires a process_threshold, "
+                               "error_threshold or max_interval.")
+        self._set_point = set_point
+        self._control_delta = control_delta
+        self._process_threshold = process_threshold
+        self._error_threshold = error_threshold
+        self._max_interval = max_interval
+        self._last_value = None
+        self._last_tick = 0
+        self._tick = 0
+        self.calls = 0
+
+    @classmethod
+    def from_config(cls, config, set_point, control_delta):
+        """Return the trigger of the [event_trigger] section, None if
+        there is no section.
+        """
+        if not config.has_section("event_trigger"):
+            return None
+
+        def option(name):
+            return config.getfloat("event_trigger", name, fallback=None)
+
+        return cls(set_point, control_delta, option("process_threshold"),
+                   option("error_threshold"), option("max_interval"))
+
+    def reset(self, process_value):
+        """Start a simulation, the process value at its start is the
+        reference for the first change.
+        """
+        self._last_value = process_value
+        self._last_tick = 0
+        self._tick = 0
+        self.calls = 0
+
+    def check(self, process_value):
+        """Sample the process at the next control tick.
+
+        Returns:
+        ticks -- number of control ticks since the previous call if the
+        controller should be called, zero otherwise. [int]
+        """
+        self._tick += 1
+        ticks = self._tick - self._last_tick
+        call = (
+            (self._process_threshold is not None and
+             abs(process_value - self._last_value) > self._process_threshold)
+            or (self._error_threshold is not None and
+                abs(process_value - self._set_point) > self._error_threshold)
+            or (self._max_interval is not None and
+                ticks * self._control_delta >= self._max_interval))
+        if not call:
+            return 0
+        self._last_value = process_value
+        self._last_tick = self._tick
+        self.calls += 1
+        return ticks
+
+
+if __name__ == "__main__":
+    try:
+        print("Module has no main functionality. Please run pid-driver.py")
+        sys.exit(0)
+    except Exception as error:
+        print(str(error))
+        traceback.print_exc()
+        sys.exit(1)
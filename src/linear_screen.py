@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""Linearized closed loop screening of PID gains.
+
+The process is linearized around the set point:
+
+  d(dPV)/dt = a * dPV + b * dCV
+
+and integrated with the same forward Euler steps as the simulation
+for one control interval, T = n * dt, with the control held constant:
+
+  y(k+1) = phi * y(k) + gamma * u(k)
+
+  phi = (1 + a*dt)^n
+  gamma = b * dt * sum_{i=0}^{n-1} (1 + a*dt)^i
+
+The discrete controller is the one in pid.c, linearized around
+perfect control. The integral is a window over the last H samples,
+and the derivative is taken against the oldest sample in the history,
+y(k-H), divided by the delta time passed to pid_control, dt_c:
+
+  C(k) = -Kp*y(k) - Ki*dt_c*sum_{j=0}^{H-1} y(k-j)
+         + (Kd/dt_c)*(y(k) - y(k-H))
+
+  u(k) = -C(k)
+
+so the closed loop is an order H+1 recurrence
+
+  y(k+1) = sum_{j=0}^{H} c_j * y(k-j)
+
+  c_0 = phi + gamma * (Kp + Ki*dt_c - Kd/dt_c)
+  c_j = gamma * Ki * dt_c,   0 < j < H
+  c_H = gamma * Kd / dt_c
+
+whose poles are the eigenvalues of the companion matrix. The open
+loop transfer function used for margins and bandwidth is
+
+  L(z) = -gamma / (z - phi) * K(z)
+
+  K(z) = Kp + Ki*dt_c*sum_{j=0}^{H-1} z^-j - (Kd/dt_c)*(1 - z^-H)
+
+All functions are vectorized over arrays of gains, so large gain grids
+can be screened before running any nonlinear simulation.
+
+Copyright (c) 2016 Benjamin J. Andre
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v.  2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+#
+# built-in modules
+#
+import sys
+import traceback
+
+#
+# installed dependencies
+#
+import numpy as np
+
+#
+# other modules in this package
+#
+
+if sys.hexversion < 0x03050000:
+    print(70 * "*")
+    print("ERROR: {0} requires python >= 3.5.x. ".format(sys.argv[0]))
+    print("It appears that you are running python {0}".format(
+        ".".join(str(x) for x in sys.version_info[0:3])))
+    print(70 * "*")
+    sys.exit(1)
+
+
+def discretize(a, b, delta_time, steps):
+    """Discretize the linear process over a control interval of 'steps'
+    forward Euler steps of length delta_time.
+
+    Returns (phi, gamma).
+    """
+    growth = 1.0 + a * delta_time
+    phi = growth**steps
+    if growth == 1.0:
+        gamma = b * delta_time * steps
+    else:
+        gamma = b * delta_time * (phi - 1.0) / (growth - 1.0)
+    return phi, gamma
+
+
+def _broadcast_gains(Kp, Ki, Kd):
+    Kp, Ki, Kd = np.broadcast_arrays(np.atleast_1d(np.asarray(Kp, float)),
+                                     np.atleast_1d(np.asarray(Ki, float)),
+                                     np.atleast_1d(np.asarray(Kd, float)))
+    return Kp.ravel(), Ki.ravel(), Kd.ravel()
+
+
+def closed_loop_poles(phi, gamma, Kp, Ki, Kd, history_length,
+                      pid_delta_time):
+    """Closed loop poles for each gain set.
+
+    Returns a complex array with shape (number of gain sets, H+1).
+    """
+    Kp, Ki, Kd = _broadcast_gains(Kp, Ki, Kd)
+    H = history_length
+    dt_c = pid_delta_time
+    num = Kp.size
+
+    coefficients = np.zeros((num, H + 1))
+    coefficients[:, 0] = phi + gamma * (Kp + Ki * dt_c - Kd / dt_c)
+    coefficients[:, 1:H] = (gamma * Ki * dt_c)[:, np.newaxis]
+    coefficients[:, H] += gamma * Kd / dt_c
+
+    companion = np.zeros((num, H + 1, H + 1))
+    companion[:, 0, :] = coefficients
+    index = np.arange(H)
+    companion[:, index + 1, index] = 1.0
+    return np.linalg.eigvals(companion)
+
+
+def pole_damping(poles, sample_period):
+    """Damping ratio of the continuous equivalent of each discrete pole,
+    s = ln(z) / T. Poles at the origin are treated as critically damped.
+    """
+    damping = np.ones(poles.shape)
+    nonzero = np.abs(poles) > 0.0
+    s = np.log(poles[nonzero].astype(complex)) / sample_period
+    magnitude = np.abs(s)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        zeta = np.where(magnitude > 0.0, -s.real / magnitude, 1.0)
+    damping[nonzero] = zeta
+    return damping
+
+
+def open_loop_response(phi, gamma, Kp, Ki, Kd, history_length,
+                       pid_delta_time, omega, sample_period):
+    """Open loop frequency response L(exp(j*omega*T)).
+
+    Returns a complex array with shape (number of gain sets, len(omega)).
+    """
+    Kp, Ki, Kd = _broadcast_gains(Kp, Ki, Kd)
+    H = history_length
+    dt_c = pid_delta_time
+    z = np.exp(1j * omega * sample_period)
+    z_inv = 1.0 / z
+
+    window = np.zeros(z.shape, dtype=complex)
+    for j in range(H):
+        window += z_inv**j
+    lag = 1.0 - z_inv**H
+
+    controller = (Kp[:, np.newaxis] +
+                  (Ki * dt_c)[:, np.newaxis] * window[np.newaxis, :] -
+                  (Kd / dt_c)[:, np.newaxis] * lag[np.newaxis, :])
+    process = -gamma / (z - phi)
+    return process[np.newaxis, :] * controller
+
+
+def _first_crossing(below):
+    """Index where 'below' first changes from False to True along axis
+    1, and whether there is such a crossing.
+    """
+    crossing = below[:, 1:] & ~below[:, :-1]
+    found = np.any(crossing, axis=1)
+    index = np.argmax(crossing, axis=1) + 1
+    return index, found
+
+
+def stability_margins(response, omega):
+    """Gain margin, phase margin [degrees] and closed loop -3 dB bandwidth
+    [rad/s] from an open loop frequency response.
+
+    Margins are infinite when there is no crossover in the frequency
+    range, the bandwidth is the highest frequency if the closed loop
+    never drops below -3 dB.
+    """
+    rows = np.arange(response.shape[0])
+    magnitude = np.abs(response)
+    phase = np.degrees(np.unwrap(np.angle(response), axis=1))
+
+    # gain crossover, |L| falls through one
+    index, found = _first_crossing(magnitude < 1.0)
+    phase_margin = np.where(found, 180.0 + phase[rows, index], np.inf)
+
+    # phase crossover, phase falls through -180
+    index, found = _first_crossing(phase <= -180.0)
+    with np.errstate(divide='ignore'):
+        gain_margin = np.where(found, 1.0 / magnitude[rows, index], np.inf)
+
+    closed = np.abs(response / (1.0 + response))
+    reference = closed[:, 0]
+    below = closed < reference[:, np.newaxis] / np.sqrt(2.0)
+    found = np.any(below, axis=1)
+    index = np.argmax(below, axis=1)
+    bandwidth = np.where(found, omega[index], omega[-1])
+    return gain_margin, phase_margin, bandwidth
+
+
+def screen(phi, gamma, Kp, Ki, Kd, history_length, pid_delta_time,
+           sample_period, min_damping=0.2, min_gain_margin=None,
+           min_phase_margin=None, num_frequencies=256):
+    """Screen gain sets with the linearized closed loop.
+
+    Returns a dict of arrays, one entry per gain set:
+
+    Kp, Ki, Kd -- gains.
+    spectral_radius -- largest pole magnitude, stable if < 1.
+    damping -- smallest damping ratio of the poles.
+    gain_margin, phase_margin [deg], bandwidth [rad/s]
+    survivor -- True if the gain set passes all criteria.
+    """
+    Kp, Ki, Kd = _broadcast_gains(Kp, Ki, Kd)
+    poles = closed_loop_poles(phi, gamma, Kp, Ki, Kd, history_length,
+                              pid_delta_time)
+    spectral_radius = np.max(np.abs(poles), axis=1)
+    damping = np.min(pole_damping(poles, sample_period), axis=1)
+
+    nyquist = np.pi / sample_period
+    omega = np.logspace(np.log10(nyquist) - 4.0, np.log10(nyquist),
+                        num_frequencies)
+    response = open_loop_response(phi, gamma, Kp, Ki, Kd, history_length,
+                                  pid_delta_time, omega, sample_period)
+    gain_margin, phase_margin, bandwidth = stability_margins(response,
+                                                             omega)
+
+    survivor = (spectral_radius < 1.0) & (damping >= min_damping)
+    if min_gain_margin is not None:
+        survivor &= gain_margin >= min_gain_margin
+    if min_phase_margin is not None:
+        survivor &= phase_margin >= min_phase_margin
+
+    result = {
+        'Kp': Kp,
+        'Ki': Ki,
+        'Kd': Kd,
+        'spectral_radius': spectral_radius,
+        'damping': damping,
+        'gain_margin': gain_margin,
+        'phase_margin': phase_margin,
+        'bandwidth': bandwidth,
+        'survivor': survivor,
+    }
+    return result
+
+
+if __name__ == "__main__":
+    try:
+        print("Module has no main functionality. Please run pid-driver.py")
+        sys.exit(0)
+    except Exception as error:
+        print(str(error))
+        traceback.print_exc()
+        sys.exit(1)
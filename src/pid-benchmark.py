@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""Benchmarks for the pid library and the demo simulations.
+
+Results are written as csv to stdout.
+
+Copyright (c) 2016 Benjamin J. Andre
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v.  2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+
+#
+# built-in modules
+#
+import argparse
+import configparser
+import contextlib
+import io
+import os
+import resource
+import sys
+import time
+import traceback
+import tracemalloc
+
+#
+# installed dependencies
+#
+
+#
+# other modules in this package
+#
+
+
+if sys.hexversion < 0x03050000:
+    print(70 * "*")
+    print("ERROR: {0} requires python >= 3.5.x. ".format(sys.argv[0]))
+    print("It appears that you are running python {0}".format(
+        ".".join(str(x) for x in sys.version_info[0:3])))
+    print(70 * "*")
+    sys.exit(1)
+
+
+# -------------------------------------------------------------------------------
+#
+# User input
+#
+# -------------------------------------------------------------------------------
+def commandline_options():
+    """Process the command line arguments.
+
+    """
+    parser = argparse.ArgumentParser(
+        description='Benchmarks for the pid library and demo simulations.')
+
+    parser.add_argument('--backtrace', action='store_true',
+                        help='show exception backtraces as extra debugging '
+                        'output')
+
+    subparsers = parser.add_subparsers(dest='benchmark')
+
+    network = subparsers.add_parser(
+        'network', help='scaling of the coupled tank network simulation')
+    network.add_argument('--max-tanks', type=int, default=100000,
+                         help='largest network, sizes increase by factors '
+                         'of 10 starting at 10')
+    network.add_argument('--steps', type=int, default=1000,
+                         help='number of time steps per simulation')
+    network.add_argument('--topology', default='cascade',
+                         help='network topology: cascade, random')
+
+    pool = subparsers.add_parser(
+        'pool', help='lifetime of many short lived controllers, new and '
+        'closed versus recycled through a PIDPool')
+    pool.add_argument('--controllers', type=int, default=1000000,
+                      help='number of short lived controllers')
+    pool.add_argument('--calls', type=int, default=10,
+                      help='control calls per controller')
+    pool.add_argument('--history-length', type=int, default=5,
+                      help='history length of each controller')
+    pool.add_argument('--leak', action='store_true',
+                      help='also run the native init without free, the '
+                      'behavior before controllers were freed')
+
+    event = subparsers.add_parser(
+        'event', help='controller calls saved by event triggered control of '
+        'the tank against the loss of performance')
+    event.add_argument('--thresholds', type=float, nargs='+',
+                       default=[0.001, 0.003, 0.01, 0.03, 0.1],
+                       help='process value change thresholds')
+    event.add_argument('--max-interval', type=float, default=100.0,
+                       help='longest time between controller calls [s]')
+    event.add_argument('--time-max', type=float, default=1000.0,
+                       help='simulated time [s]')
+    event.add_argument('--control-delta', type=float, default=1.0,
+                       help='time between control ticks [s]')
+    event.add_argument('--Ki', type=float, default=0.0,
+                       help='integral gain')
+
+    precision = subparsers.add_parser(
+        'precision', help='time, memory and accuracy of the float32 and '
+        'float64 simulation pipelines on a large tank ensemble, with the '
+        'library selected by BJAPID_PRECISION')
+    precision.add_argument('--processes', type=int, default=100000,
+                           help='number of tanks in the ensemble')
+    precision.add_argument('--steps', type=int, default=1000,
+                           help='number of time steps per simulation')
+
+    options = parser.parse_args()
+    if not options.benchmark:
+        parser.error("a benchmark is required")
+    return options
+
+
+# -------------------------------------------------------------------------------
+#
+# work functions
+#
+# -------------------------------------------------------------------------------
+def tank_config(**overrides):
+    """Return a ConfigParser equivalent to tank.cfg, with overrides given
+    as section_option=value.
+    """
+    config = configparser.ConfigParser()
+    config.read_dict({
+        'process': {'type': 'tank', 'initial_condition': '0.7',
+                    'set_point': '1.5', },
+        'forcing': {'type': 'normal', 'mean': '0.5',
+                    'standard_deviation': '0.05', },
+        'time': {'delta': '0.01', 'max': '200.0', },
+        'control': {'delta': '10.0', 'history_length': '5',
+                    'control_bias': 'calculate', 'Kp': 'calculate',
+                    'Ki': '0.0', 'Kd': '0.0', },
+    })
+    for key, value in overrides.items():
+        section, option = key.split('_', 1)
+        config.set(section, option, str(value))
+    return config
+
+
+def quietly(function, *args, **kwargs):
+    """Call function, discarding what it prints.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+
+def benchmark_network(options):
+    """Time a controlled tank network simulation for increasing numbers
+    of tanks.
+    """
+    from demo_tank_network import TankNetworkDemo
+
+    print("tanks,steps,init_seconds,simulate_seconds,tank_steps_per_second")
+    num_tanks = 10
+    while num_tanks <= options.max_tanks:
+        config = tank_config(
+            process_type='tank_network', process_num_tanks=num_tanks,
+            process_topology=options.topology,
+            time_max=options.steps * 0.01, control_delta=0.1)
+        start = time.perf_counter()
+        demo = quietly(TankNetworkDemo, config)
+        init_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        demo.simulate_with_control()
+        seconds = time.perf_counter() - start
+        print("{0},{1},{2:.6f},{3:.6f},{4:.6e}".format(
+            num_tanks, options.steps, init_seconds, seconds,
+            num_tanks * options.steps / seconds))
+        sys.stdout.flush()
+        num_tanks *= 10
+
+
+def resident_bytes():
+    """Current resident set size of the process, the peak if the
+    current size is not available.
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError):
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == 'darwin':
+            return maxrss
+        return 1024 * maxrss
+
+
+def benchmark_pool(options):
+    """Create, use and release many short lived controllers, reporting
+    the time per controller and the growth of the resident memory.
+    """
+    from pid import PID, PIDPool, bjapid
+
+    history_length = options.history_length
+
+    def new():
+        for i in range(options.controllers):
+            with PID(history_length, 1.0, 1.0, 0.1, 0.0) as pid:
+                for _ in range(options.calls):
+                    pid.control(0.5, 1.0)
+
+    def pool():
+        with PIDPool() as controllers:
+            for i in range(options.controllers):
+                with controllers.acquire(history_length, 1.0, 1.0, 0.1,
+                                         0.0) as pid:
+                    for _ in range(options.calls):
+                        pid.control(0.5, 1.0)
+
+    def leak():
+        for i in range(options.controllers):
+            pid = bjapid.pid_init(history_length, 1.0, 1.0, 0.1, 0.0)
+            for _ in range(options.calls):
+                bjapid.pid_control(pid, 0.5, 1.0)
+
+    strategies = [('new', new), ('pool', pool), ]
+    if options.leak:
+        strategies.append(('leak', leak))
+
+    print("strategy,controllers,calls,seconds,controllers_per_second,"
+          "rss_growth_bytes")
+    for name, function in strategies:
+        before = resident_bytes()
+        start = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - start
+        growth = resident_bytes() - before
+        print("{0},{1},{2},{3:.6f},{4:.6e},{5}".format(
+            name, options.controllers, options.calls, seconds,
+            options.controllers / seconds, growth))
+        sys.stdout.flush()
+
+
+def benchmark_event(options):
+    """Simulate the tank with the periodic controller and with event
+    triggered controllers for increasing process value thresholds,
+    reporting the fraction of controller calls saved and the increase
+    of iae and ise over the periodic controller.
+    """
+    from demo_tank import DrainingTankDemo
+
+    def simulate(threshold):
+        config = tank_config(time_max=options.time_max,
+                             control_delta=options.control_delta,
+                             control_Ki=options.Ki)
+        if threshold is not None:
+            config.read_dict({'event_trigger': {
+                'process_threshold': str(threshold),
+                'max_interval': str(options.max_interval), }})
+        demo = quietly(DrainingTankDemo, config)
+        start = time.perf_counter()
+        demo.simulate_with_control()
+        seconds = time.perf_counter() - start
+        # metrics include the run without control
+        quietly(demo.simulate_no_control)
+        return demo.metrics(), seconds
+
+    print("process_threshold,max_interval,controller_calls,control_ticks,"
+          "calls_saved,iae,ise,iae_loss,ise_loss,simulate_seconds")
+    periodic, seconds = simulate(None)
+    ticks = int(periodic['termination_time'] // options.control_delta)
+    rows = [('periodic', '', ticks, ticks, periodic, seconds), ]
+    for threshold in options.thresholds:
+        metrics, seconds = simulate(threshold)
+        rows.append((threshold, options.max_interval,
+                     metrics['controller_calls'], metrics['control_ticks'],
+                     metrics, seconds))
+    for threshold, max_interval, calls, ticks, metrics, seconds in rows:
+        print("{0},{1},{2},{3},{4:.4f},{5:.6e},{6:.6e},{7:.4f},{8:.4f},"
+              "{9:.6f}".format(
+                  threshold, max_interval, calls, ticks,
+                  1.0 - calls / ticks, metrics['iae'], metrics['ise'],
+                  metrics['iae'] / periodic['iae'] - 1.0,
+                  metrics['ise'] / periodic['ise'] - 1.0, seconds))
+        sys.stdout.flush()
+
+
+def benchmark_precision(options):
+    """Simulate an ensemble of tanks with float64 and float32 state,
+    forcing and control arrays, reporting the time, the peak memory
+    allocated during the controlled simulation, and the largest
+    difference of the ensemble mean trajectories to the float64
+    pipeline.
+    """
+    import numpy as np
+    from demo_model import ModelDemo
+    from pid import PRECISION
+
+    def simulate(pipeline):
+        config = tank_config(
+            process_batched='true', process_num_processes=options.processes,
+            process_precision=pipeline, time_max=options.steps * 0.01,
+            control_delta=0.1, control_Ki=0.001)
+        demo = quietly(ModelDemo, config)
+        tracemalloc.start()
+        start = time.perf_counter()
+        demo.simulate_with_control()
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        quietly(demo.simulate_no_control)
+        return demo, seconds, peak
+
+    print("library,pipeline,processes,steps,simulate_seconds,"
+          "process_steps_per_second,peak_bytes,iae,max_abs_difference")
+    reference = None
+    for pipeline in ['float64', 'float32', ]:
+        demo, seconds, peak = simulate(pipeline)
+        trajectories = demo.trajectories()
+        if reference is None:
+            reference = trajectories
+        difference = max(
+            float(np.max(np.abs(trajectories[name].astype(np.float64) -
+                                reference[name])))
+            for name in ['state_control', 'control', ])
+        print("{0},{1},{2},{3},{4:.6f},{5:.6e},{6},{7:.9e},{8:.3e}".format(
+            PRECISION, pipeline, options.processes, options.steps, seconds,
+            options.processes * options.steps / seconds, peak,
+            demo.metrics()['iae'], difference))
+        sys.stdout.flush()
+
+
+# -------------------------------------------------------------------------------
+#
+# main
+#
+# -------------------------------------------------------------------------------
+def main(options):
+    benchmarks = {
+        'network': benchmark_network,
+        'pool': benchmark_pool,
+        'event': benchmark_event,
+        'precision': benchmark_precision,
+    }
+    benchmarks[options.benchmark](options)
+    return 0
+
+
+if __name__ == "__main__":
+    options = commandline_options()
+    try:
+        status = main(options)
+        sys.exit(status)
+    except Exception as error:
+        print(str(error))
+        if options.backtrace:
+            traceback.print_exc()
+        sys.exit(1)
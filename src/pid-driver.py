@@ -28,7 +28,13 @@ import traceback
 #
 # other modules in this package
 #
-from demo_tank import DrainingTankDemo
+from demo_model import create_demo
+from pid import library_version
+from profiling import RunProfile, null_phase
+import realtime
+import replay
+import sensitivity
+from result_cache import DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE, ResultCache
 
 
 if sys.hexversion < 0x03050000:
@@ -65,6 +71,103 @@ def commandline_options():
     parser.add_argument('--write-template', action='store_true',
                         help='write a template configuration file')
 
+    parser.add_argument('--profile', nargs=1, default=None,
+                        help='record wall/cpu time per phase and call '
+                        'counts, written as json to the given file, '
+                        '"-" for stdout')
+
+    parser.add_argument('--screen', action='store_true',
+                        help='screen the configured gains with the '
+                        'linearized closed loop and only simulate if they '
+                        'are stable and sufficiently damped')
+
+    parser.add_argument('--min-damping', nargs=1, type=float, default=[0.2],
+                        help='with --screen, minimum closed loop damping '
+                        'ratio, default 0.2')
+
+    parser.add_argument('--cache-dir', nargs=1, default=[DEFAULT_CACHE_DIR],
+                        help='directory for cached simulation results, '
+                        'default {0}'.format(DEFAULT_CACHE_DIR))
+
+    parser.add_argument('--cache-size', nargs=1, type=float,
+                        default=[DEFAULT_CACHE_SIZE / 1024**2],
+                        help='maximum size of the result cache [MB], least '
+                        'recently used results are evicted')
+
+    parser.add_argument('--no-cache', action='store_true',
+                        help='always simulate, do not read or write cached '
+                        'results')
+
+    parser.add_argument('--trace', nargs=1, default=None,
+                        help='save the P, I and D contributions of each '
+                        'controller call to the given .npy file. Requires '
+                        'the library compiled with -DPID_ENABLE_TRACE')
+
+    parser.add_argument('--trace-length', nargs=1, type=int, default=None,
+                        help='with --trace, number of controller calls '
+                        'kept in the ring buffer, default all')
+
+    parser.add_argument('--save-trajectory', nargs=1, default=None,
+                        help='save the simulated trajectories as one .npy '
+                        'file per variable in the given directory')
+
+    parser.add_argument('--plot-trajectory', nargs=1, default=None,
+                        help='plot trajectories saved with '
+                        '--save-trajectory, memory mapped from the given '
+                        'directory, instead of simulating')
+
+    parser.add_argument('--realtime', action='store_true',
+                        help='run the controlled simulation paced to wall '
+                        'clock time, one controller call per control delta, '
+                        'and report jitter, compute time, slack and '
+                        'deadline misses. Implies --no-cache')
+
+    parser.add_argument('--realtime-speedup', nargs=1, type=float,
+                        default=[1.0],
+                        help='with --realtime, ratio of simulated to wall '
+                        'clock time, default 1')
+
+    parser.add_argument('--realtime-cpu', nargs=1, type=int, default=None,
+                        help='with --realtime, pin the control thread to '
+                        'this cpu, linux only')
+
+    parser.add_argument('--realtime-histogram', nargs=1, default=None,
+                        help='with --realtime, write the jitter and compute '
+                        'time histograms as csv to the given file')
+
+    parser.add_argument('--sensitivity', nargs=1, default=None,
+                        choices=['ise', 'iae'],
+                        help='compute the closed loop cost, ise or iae, and '
+                        'its gradient with respect to Kp, Ki, Kd with one '
+                        'forward sensitivity simulation instead of running '
+                        'the demo')
+
+    parser.add_argument('--check-gradient', action='store_true',
+                        help='with --sensitivity, compare the gradient to '
+                        'central finite differences')
+
+    parser.add_argument('--profile-cprofile', nargs=1, default=None,
+                        help='with --profile, also dump cProfile '
+                        'statistics to the given file')
+
+    subparsers = parser.add_subparsers(
+        dest='command', help='optional command, the default simulates the '
+        'configured demo')
+
+    replay_parser = subparsers.add_parser(
+        'replay', help='replay a recorded log of (timestamp, process_value) '
+        'through the configured controller, streaming the outputs to disk')
+    replay_parser.add_argument('--log', nargs=1, required=True,
+                               help='.npy log with shape (n, 2) or fields '
+                               'timestamp and process_value, or .csv log')
+    replay_parser.add_argument('--output', nargs=1, required=True,
+                               help='.npy file for the outputs, or '
+                               '.csv file for timestamp,output')
+    replay_parser.add_argument('--chunk-size', nargs=1, type=int,
+                               default=[replay.DEFAULT_CHUNK_SIZE],
+                               help='samples per native call for .npy logs, '
+                               'default {0}'.format(replay.DEFAULT_CHUNK_SIZE))
+
     options = parser.parse_args()
     return options
 
@@ -92,9 +195,30 @@ def write_template_config_file():
 
     section = 'process'
     template.add_section(section)
-    template.set(section, 'type', 'string')
+    template.set(section, 'type', 'string: tank, tank_network, fopdt, '
+                 'second_order, heater')
+    template.set(section, 'batched', 'bool, run tank with the batched '
+                 'process model')
+    template.set(section, 'num_processes', 'int >= 1, ensemble size, '
+                 'process models only')
+    template.set(section, 'precision', 'string: float64, float32, dtype '
+                 'of the simulation arrays, optional')
     template.set(section, 'initial_condition', 'float')
     template.set(section, 'set_point', 'float')
+    template.set(section, 'num_tanks', 'int > 1, tank_network only')
+    template.set(section, 'topology', 'string: cascade, random, '
+                 'tank_network only')
+    template.set(section, 'coupling', 'float in [0, 1], fraction of '
+                 'outflow routed downstream, tank_network only')
+    template.set(section, 'tank_area', 'float, tank only')
+    template.set(section, 'gain', 'float, fopdt and second_order only')
+    template.set(section, 'time_constant', 'float, fopdt only')
+    template.set(section, 'dead_time', 'float, fopdt only')
+    template.set(section, 'natural_frequency', 'float, second_order only')
+    template.set(section, 'damping_ratio', 'float, second_order only')
+    template.set(section, 'heat_capacity', 'float, heater only')
+    template.set(section, 'conductance', 'float, heater only')
+    template.set(section, 'max_power', 'float, heater only')
 
     section = 'forcing'
     template.add_section(section)
@@ -115,6 +239,49 @@ def write_template_config_file():
     template.set(section, 'Kp', 'float or "calculate"')
     template.set(section, 'Ki', 'float')
     template.set(section, 'Kd', 'float')
+    template.set(section, 'integral_mode',
+                 'optional string: window (default), velocity, leaky, '
+                 'fixed_rate (window for the constant time delta)')
+    template.set(section, 'leak', 'optional float in [0, 1], leaky only')
+
+    section = 'schedule'
+    template.add_section(section)
+    template.set(section, 'process_min',
+                 'float, first process value of the gain schedule')
+    template.set(section, 'process_max',
+                 'float, last process value of the gain schedule')
+    template.set(section, 'num_points', 'optional int >= 2, default 16')
+
+    section = 'warm_start'
+    template.add_section(section)
+    template.set(section, 'burn_in',
+                 'optional float, simulate under control this long from '
+                 'the steady state first')
+    template.set(section, 'snapshot',
+                 'optional path, burned in state, reused if it exists')
+
+    section = 'event_trigger'
+    template.add_section(section)
+    template.set(section, 'process_threshold',
+                 'optional float, call the controller when the process '
+                 'value changed this much since the last call')
+    template.set(section, 'error_threshold',
+                 'optional float, call the controller when |pv - sp| '
+                 'exceeds it')
+    template.set(section, 'max_interval',
+                 'optional float, longest time between controller calls')
+
+    section = 'termination'
+    template.add_section(section)
+    template.set(section, 'max_abs_error',
+                 'optional float, stop when |pv - sp| exceeds it')
+    template.set(section, 'saturation_time',
+                 'optional float, stop when saturated this long')
+    template.set(section, 'settle_tolerance',
+                 'optional float, with settle_time')
+    template.set(section, 'settle_time',
+                 'optional float, stop when |pv - sp| stays within '
+                 'settle_tolerance this long')
 
     with open('template.cfg', 'wb') as configfile:
         template.write(configfile)
@@ -184,16 +351,132 @@ def test_pid_wrapper():
 #
 # -------------------------------------------------------------------------------
 def main(options):
-    if options.config:
-        config = read_config_file(options.config[0])
+    profile = None
+    if options.profile:
+        cprofile_filename = None
+        if options.profile_cprofile:
+            cprofile_filename = options.profile_cprofile[0]
+        profile = RunProfile(cprofile_filename)
 
-    process_type = config["process"]["type"]
-    if process_type == "tank":
-        process = DrainingTankDemo(config)
-    else:
-        raise RuntimeError("Unknown ")
+    phase = null_phase
+    if profile:
+        phase = profile.phase
 
-    process.run()
+    if options.config:
+        with phase('config'):
+            config = read_config_file(options.config[0])
+
+    if options.command == 'replay':
+        with phase('initialize'):
+            controller = replay.controller_from_config(config)
+        with phase('replay'):
+            statistics = replay.replay(controller, options.log[0],
+                                       options.output[0],
+                                       options.chunk_size[0])
+        replay.report(statistics)
+        if profile:
+            profile.write(options.profile[0])
+        return 0
+
+    with phase('initialize'):
+        process = create_demo(config, profile)
+
+    if options.screen:
+        with phase('screen'):
+            screen = process.screen_gains(min_damping=options.min_damping[0])
+        print("Linearized closed loop:")
+        for name in ['spectral_radius', 'damping', 'gain_margin',
+                     'phase_margin', 'bandwidth', ]:
+            print("  {0} = {1:1.6e}".format(name, screen[name][0]))
+        if not screen['survivor'][0]:
+            print("Gains rejected by linear screening, not simulating.")
+            return 0
+
+    if options.sensitivity:
+        cost_name = options.sensitivity[0]
+
+        def cost_and_gradient(gains):
+            return process.cost_and_gradient(gains, cost_name)
+
+        with phase('sensitivity'):
+            if options.check_gradient:
+                parameters = process.parameters()
+                gains = [parameters[name] for name in ['Kp', 'Ki', 'Kd', ]]
+                cost, gradient, reference, error = \
+                    sensitivity.check_gradient(cost_and_gradient, gains)
+            else:
+                cost, gradient = cost_and_gradient(None)
+        print("Closed loop sensitivity:")
+        print("  {0} = {1:1.6e}".format(cost_name, cost))
+        for i, name in enumerate(['Kp', 'Ki', 'Kd', ]):
+            print("  d{0}/d{1} = {2:1.6e}".format(cost_name, name,
+                                                  gradient[i]))
+            if options.check_gradient:
+                print("    finite difference = {0:1.6e}".format(
+                    reference[i]))
+        if options.check_gradient:
+            print("  max relative difference = {0:1.6e}".format(error))
+        if profile:
+            profile.write(options.profile[0])
+        return 0
+
+    if options.trace:
+        trace_length = None
+        if options.trace_length:
+            trace_length = options.trace_length[0]
+        process.enable_trace(trace_length)
+
+    if options.plot_trajectory:
+        with phase('load_trajectories'):
+            process.load_trajectories(options.plot_trajectory[0])
+        with phase('summary'):
+            process.summary()
+        with phase('plot'):
+            process.plot()
+        if profile:
+            profile.write(options.profile[0])
+        return 0
+
+    if options.realtime:
+        speedup = options.realtime_speedup[0]
+        cpu = None
+        if options.realtime_cpu:
+            cpu = options.realtime_cpu[0]
+        with phase('simulate_no_control'):
+            process.simulate_no_control()
+        with phase('simulate_realtime'):
+            statistics = process.simulate_realtime(speedup, cpu)
+        realtime.report(statistics, process.control_period() / speedup)
+        if options.realtime_histogram:
+            realtime.write_histograms(options.realtime_histogram[0],
+                                      statistics)
+        with phase('summary'):
+            process.summary()
+        with phase('plot'):
+            process.plot()
+        if profile:
+            profile.write(options.profile[0])
+        return 0
+
+    cache = None
+    cache_key = None
+    if not options.no_cache and not options.trace:
+        # NOTE: a trace needs the controller to actually run.
+        cache = ResultCache(options.cache_dir[0],
+                            int(options.cache_size[0] * 1024**2))
+        cache_key = cache.key(config, process.forcing_seed(),
+                              library_version())
+
+    trajectory_directory = None
+    if options.save_trajectory:
+        trajectory_directory = options.save_trajectory[0]
+    process.run(cache, cache_key, trajectory_directory)
+
+    if options.trace:
+        process.save_trace(options.trace[0])
+
+    if profile:
+        profile.write(options.profile[0])
 
     return 0
 
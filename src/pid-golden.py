@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""Golden trajectory equivalence harness for the execution backends.
+
+Canonical scenarios, tank.cfg and heater.cfg with variations of the
+gains, history length, integral mode and ensemble size, are run
+through every backend that can execute them:
+
+  reference -- the demo simulation loops driving PID.control.
+  fixed_rate -- integral_mode = fixed_rate, for window controllers.
+  float32 -- the reference with [process] precision = float32.
+  batched -- an ensemble of uncoupled tanks run as process model
+    tank with batched = true, against the tank network reference.
+  series -- the golden process values at the control steps pushed
+    through a fresh controller in one pid_control_series call. The
+    process is not simulated, its time is controller only and is not
+    compared with the reference.
+  sensitivity -- the ise and iae of the double precision replica in
+    cost_and_gradient.
+
+The results are compared against golden trajectories and metrics
+recorded from the reference backend with --update. Trajectories are
+stored as float32 in compressed .npz files, one per scenario, since
+the native controller computes in single precision. Errors are
+measured in units of float32 epsilon times the largest magnitude of
+the golden variable and checked against a tolerance per variable.
+The simulation time of each backend is reported next to the result.
+
+The goldens are recorded with the single precision library. Run with
+BJAPID_PRECISION=double to cross validate the double precision build.
+Backends computing in another precision than the goldens, the float32
+backend and every backend of the double precision library, round
+differently at every step and are checked against tolerances scaled by
+PRECISION_TOLERANCE_SCALE.
+
+Copyright (c) 2016 Benjamin J. Andre
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v.  2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+
+#
+# built-in modules
+#
+import argparse
+import collections
+import configparser
+import contextlib
+import io
+import os
+import sys
+import time
+import traceback
+
+#
+# installed dependencies
+#
+import numpy as np
+
+#
+# other modules in this package
+#
+from demo_model import create_demo
+from pid import REAL_DTYPE, library_version
+from replay import controller_from_config
+from result_cache import normalize_config
+
+
+if sys.hexversion < 0x03050000:
+    print(70 * "*")
+    print("ERROR: {0} requires python >= 3.5.x. ".format(sys.argv[0]))
+    print("It appears that you are running python {0}".format(
+        ".".join(str(x) for x in sys.version_info[0:3])))
+    print(70 * "*")
+    sys.exit(1)
+
+_SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_GOLDEN_DIR = os.path.join(_SOURCE_DIR, 'golden')
+
+FLOAT32_EPS = float(np.finfo(np.float32).eps)
+
+# tolerance of each compared variable, in units of float32 epsilon
+# times the largest magnitude of the golden values.
+TOLERANCES = {
+    'state_control': 16.0,
+    'control': 16.0,
+    'final_process_value': 16.0,
+    'final_control': 16.0,
+    'iae': 64.0,
+    'ise': 64.0,
+}
+
+# scale of the tolerances of backends computing in another precision
+# than the goldens
+PRECISION_TOLERANCE_SCALE = 4.0
+
+# backends that time only the controller, without simulating the
+# process, have no speedup over the reference
+CONTROLLER_ONLY_BACKENDS = ('series', )
+
+TRAJECTORIES = ('state_control', 'control', )
+
+METRICS = ('final_process_value', 'final_control', 'iae', 'ise', )
+
+# name -- (base config, overrides as section_option=value, backends)
+SCENARIOS = collections.OrderedDict([
+    ('tank', ('tank.cfg', {},
+              ('reference', 'fixed_rate', 'float32', 'series',
+               'sensitivity', ))),
+    ('tank_pi', ('tank.cfg', {'control_Ki': '0.001', },
+                 ('reference', 'fixed_rate', 'float32', 'series',
+                  'sensitivity', ))),
+    ('tank_pi_h16', ('tank.cfg', {'control_Ki': '0.001',
+                                  'control_history_length': '16', },
+                     ('reference', 'fixed_rate', 'float32', 'series',
+                      'sensitivity', ))),
+    ('tank_pid', ('tank.cfg', {'control_Ki': '0.001',
+                               'control_Kd': '0.0001', },
+                  ('reference', 'fixed_rate', 'float32', 'series',
+                   'sensitivity', ))),
+    ('tank_velocity', ('tank.cfg', {'control_Ki': '0.001',
+                                    'control_integral_mode': 'velocity', },
+                       ('reference', 'float32', 'series', 'sensitivity', ))),
+    ('tank_leaky', ('tank.cfg', {'control_Ki': '0.001',
+                                 'control_integral_mode': 'leaky',
+                                 'control_leak': '0.99', },
+                    ('reference', 'float32', 'series', 'sensitivity', ))),
+    ('tank_ensemble', ('tank.cfg', {'process_type': 'tank_network',
+                                    'process_num_tanks': '16',
+                                    'process_coupling': '0.0',
+                                    'control_Ki': '0.001', },
+                       ('reference', 'batched', 'fixed_rate',
+                        'float32', ))),
+    ('tank_network', ('tank.cfg', {'process_type': 'tank_network',
+                                   'process_num_tanks': '16',
+                                   'control_Ki': '0.001', },
+                      ('reference', 'fixed_rate', 'float32', ))),
+    ('heater', ('heater.cfg', {},
+                ('reference', 'fixed_rate', 'float32', 'series', ))),
+])
+
+
+# -------------------------------------------------------------------------------
+#
+# User input
+#
+# -------------------------------------------------------------------------------
+def commandline_options():
+    """Process the command line arguments.
+
+    """
+    parser = argparse.ArgumentParser(
+        description='Compare the execution backends against golden '
+        'trajectories.')
+
+    parser.add_argument('--backtrace', action='store_true',
+                        help='show exception backtraces as extra debugging '
+                        'output')
+
+    parser.add_argument('--golden-dir', nargs=1, default=[DEFAULT_GOLDEN_DIR],
+                        help='directory of the golden .npz files')
+
+    parser.add_argument('--scenario', nargs='+', choices=list(SCENARIOS),
+                        default=list(SCENARIOS),
+                        help='scenarios to run, default all')
+
+    parser.add_argument('--backend', nargs='+', choices=list(BACKENDS),
+                        default=list(BACKENDS),
+                        help='backends to run, default all')
+
+    parser.add_argument('--update', action='store_true',
+                        help='record new goldens from the reference backend')
+
+    options = parser.parse_args()
+    return options
+
+
+def quietly(function, *args, **kwargs):
+    """Call function, discarding what it prints.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+
+def scenario_config(name):
+    """Return the ConfigParser of a scenario, its base config with the
+    overrides applied.
+    """
+    filename, overrides, _ = SCENARIOS[name]
+    config = configparser.ConfigParser()
+    config.read(os.path.join(_SOURCE_DIR, filename))
+    for key, value in overrides.items():
+        section, option = key.split('_', 1)
+        config.set(section, option, value)
+    return config
+
+
+def with_overrides(config, **overrides):
+    """Return a copy of config with overrides given as
+    section_option=value.
+    """
+    copy = configparser.ConfigParser()
+    copy.read_dict(config)
+    for key, value in overrides.items():
+        section, option = key.split('_', 1)
+        copy.set(section, option, str(value))
+    return copy
+
+
+# -------------------------------------------------------------------------------
+#
+# Backends
+#
+# -------------------------------------------------------------------------------
+def run_demo(config):
+    """Simulate without and with control. Returns the compared
+    trajectories and metrics and the time of the controlled simulation.
+    """
+    demo = quietly(create_demo, config)
+    demo.simulate_no_control()
+    start = time.perf_counter()
+    demo.simulate_with_control()
+    seconds = time.perf_counter() - start
+    trajectories = demo.trajectories()
+    metrics = demo.metrics()
+    results = {name: trajectories[name] for name in TRAJECTORIES}
+    results.update((name, metrics[name]) for name in METRICS)
+    return results, seconds
+
+
+def run_reference(config, golden):
+    return run_demo(config)
+
+
+def run_fixed_rate(config, golden):
+    return run_demo(with_overrides(config,
+                                   control_integral_mode='fixed_rate'))
+
+
+def run_float32(config, golden):
+    return run_demo(with_overrides(config, process_precision='float32'))
+
+
+def run_batched(config, golden):
+    """The uncoupled tank network as an ensemble of tank models.
+    """
+    if config.getfloat("process", "coupling") != 0.0:
+        raise RuntimeError("The batched backend requires uncoupled tanks.")
+    return run_demo(with_overrides(
+        config, process_type='tank', process_batched='true',
+        process_num_processes=config["process"]["num_tanks"]))
+
+
+def run_series(config, golden):
+    """Control computed in one native call from the golden process
+    values at the control steps, held between them as in the demos.
+    """
+    demo = quietly(create_demo, config)
+    controller = quietly(controller_from_config, config)
+    num_steps = len(golden['control'])
+    interval = demo.control_interval()
+    steps = np.arange(interval, num_steps, interval)
+    process_values = golden['state_control'][steps]
+    delta_times = config.getfloat("time", "delta") * np.ones(len(steps))
+    start = time.perf_counter()
+    outputs = controller.control_series(process_values, delta_times)
+    seconds = time.perf_counter() - start
+    controller.close()
+    held = np.diff(np.append(steps, num_steps))
+    control = np.concatenate((
+        demo.control_from_output(np.zeros(steps[0])),
+        np.repeat(demo.control_from_output(outputs.astype(np.float64)),
+                  held)))
+    return {'control': control}, seconds
+
+
+def run_sensitivity(config, golden):
+    """ise and iae of the forward sensitivity simulation.
+    """
+    demo = quietly(create_demo, config)
+    start = time.perf_counter()
+    results = {cost: demo.cost_and_gradient(cost=cost)[0]
+               for cost in ['ise', 'iae', ]}
+    seconds = time.perf_counter() - start
+    return results, seconds
+
+
+BACKENDS = collections.OrderedDict([
+    ('reference', run_reference),
+    ('fixed_rate', run_fixed_rate),
+    ('float32', run_float32),
+    ('batched', run_batched),
+    ('series', run_series),
+    ('sensitivity', run_sensitivity),
+])
+
+
+# -------------------------------------------------------------------------------
+#
+# Goldens
+#
+# -------------------------------------------------------------------------------
+def golden_filename(golden_dir, name):
+    return os.path.join(golden_dir, "{0}.npz".format(name))
+
+
+def save_golden(filename, config, results):
+    """Store the reference results, trajectories as float32.
+    """
+    for name in TRAJECTORIES + METRICS:
+        if not np.all(np.isfinite(results[name])):
+            raise RuntimeError("Refusing to store the non-finite {0} of "
+                               "'{1}'.".format(name, filename))
+    arrays = {name: np.asarray(results[name], dtype=np.float32)
+              for name in TRAJECTORIES}
+    arrays.update((name, np.float64(results[name])) for name in METRICS)
+    np.savez_compressed(filename, config=normalize_config(config),
+                        library_version=library_version(), **arrays)
+
+
+def load_golden(filename, config):
+    """Return the golden results, trajectories as float64.
+    """
+    if not os.path.isfile(filename):
+        raise RuntimeError("No golden '{0}', record it with "
+                           "--update.".format(filename))
+    with np.load(filename) as data:
+        if str(data['config']) != normalize_config(config):
+            raise RuntimeError("The scenario config differs from the golden "
+                               "'{0}', record it with --update.".format(
+                                   filename))
+        golden = {name: data[name].astype(np.float64)
+                  for name in TRAJECTORIES}
+        golden.update((name, float(data[name])) for name in METRICS)
+    return golden
+
+
+def compare(results, golden, tolerance_scale=1.0):
+    """Largest error of the results relative to their tolerance, the
+    tolerances multiplied by tolerance_scale.
+
+    Returns:
+    name, error, ratio -- variable with the largest error relative to
+    its tolerance, its error in units of float32 epsilon times the
+    golden scale and the error divided by the tolerance. [str, float,
+    float]
+    """
+    worst = (None, 0.0, 0.0)
+    for name, value in sorted(results.items()):
+        reference = np.asarray(golden[name])
+        scale = max(float(np.max(np.abs(reference))), np.finfo(np.float32).tiny)
+        difference = np.abs(np.asarray(value, dtype=np.float64) - reference)
+        error = float(np.max(difference)) / (FLOAT32_EPS * scale)
+        if not np.isfinite(error):
+            error = np.inf
+        ratio = error / (tolerance_scale * TOLERANCES[name])
+        if worst[0] is None or ratio > worst[2]:
+            worst = (name, error, ratio)
+    return worst
+
+
+# -------------------------------------------------------------------------------
+#
+# main
+#
+# -------------------------------------------------------------------------------
+def update(options):
+    """Record the goldens of the selected scenarios.
+    """
+    if REAL_DTYPE != np.float32:
+        raise RuntimeError("Record the goldens with the single precision "
+                           "library.")
+    golden_dir = options.golden_dir[0]
+    if not os.path.isdir(golden_dir):
+        os.makedirs(golden_dir)
+    for name in options.scenario:
+        config = scenario_config(name)
+        results, seconds = run_reference(config, None)
+        filename = golden_filename(golden_dir, name)
+        save_golden(filename, config, results)
+        print("{0}: {1:.3f} s, {2} bytes".format(
+            filename, seconds, os.path.getsize(filename)))
+    return 0
+
+
+def main(options):
+    if options.update:
+        return update(options)
+
+    print("library version {0}".format(library_version()))
+    print("{0:<14} {1:<12} {2:<6} {3:<18} {4:>10} {5:>10} {6:>9}".format(
+        "scenario", "backend", "status", "worst variable", "error [eps]",
+        "time [s]", "speedup"))
+    failures = 0
+    for name in options.scenario:
+        config = scenario_config(name)
+        golden = load_golden(golden_filename(options.golden_dir[0], name),
+                             config)
+        reference_seconds = None
+        for backend in SCENARIOS[name][2]:
+            if backend not in options.backend:
+                continue
+            results, seconds = BACKENDS[backend](config, golden)
+            if backend == 'reference':
+                reference_seconds = seconds
+            tolerance_scale = 1.0
+            if backend == 'float32' or REAL_DTYPE != np.float32:
+                tolerance_scale = PRECISION_TOLERANCE_SCALE
+            variable, error, ratio = compare(results, golden,
+                                             tolerance_scale)
+            status = "pass" if ratio <= 1.0 else "FAIL"
+            failures += status != "pass"
+            speedup = ""
+            if backend in CONTROLLER_ONLY_BACKENDS:
+                speedup = "ctrl only"
+            elif reference_seconds:
+                speedup = "{0:.2f}".format(reference_seconds / seconds)
+            print("{0:<14} {1:<12} {2:<6} {3:<18} {4:>10.3g} {5:>10.4f} "
+                  "{6:>9}".format(name, backend, status, variable, error,
+                                  seconds, speedup))
+            sys.stdout.flush()
+    if failures:
+        print("{0} backend results differ from the goldens".format(failures))
+        return 1
+    print("All backends agree with the goldens")
+    return 0
+
+
+if __name__ == "__main__":
+    options = commandline_options()
+    try:
+        status = main(options)
+        sys.exit(status)
+    except Exception as error:
+        print(str(error))
+        if options.backtrace:
+            traceback.print_exc()
+        sys.exit(1)
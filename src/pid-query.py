@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""Query the results store written by pid-sweep.py.
+
+Filtered top-k queries run in sqlite against the indexed parameter
+and metric columns, e.g. the ten runs with the smallest integral
+absolute error for 0.5 <= Kp <= 1.0:
+
+  pid-query.py --store results.sqlite --range Kp:0.5:1.0 --sort iae --top 10
+
+Only runs simulated over the whole horizon, termination completed,
+are returned unless --termination selects other reasons. The metrics
+of runs stopped early as diverged, saturated or settled cover only
+the time until they were stopped and would rank ahead of runs
+simulated over the whole horizon.
+
+Results are written as csv to stdout.
+
+Copyright (c) 2016 Benjamin J. Andre
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v.  2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+
+#
+# built-in modules
+#
+import argparse
+import csv
+import os
+import sys
+import traceback
+
+#
+# installed dependencies
+#
+
+#
+# other modules in this package
+#
+import results_store
+from results_store import ResultsStore
+import termination
+
+
+if sys.hexversion < 0x03050000:
+    print(70 * "*")
+    print("ERROR: {0} requires python >= 3.5.x. ".format(sys.argv[0]))
+    print("It appears that you are running python {0}".format(
+        ".".join(str(x) for x in sys.version_info[0:3])))
+    print(70 * "*")
+    sys.exit(1)
+
+
+# -------------------------------------------------------------------------------
+#
+# User input
+#
+# -------------------------------------------------------------------------------
+def commandline_options():
+    """Process the command line arguments.
+
+    """
+    parser = argparse.ArgumentParser(
+        description='Query the pid sweep results store.')
+
+    parser.add_argument('--backtrace', action='store_true',
+                        help='show exception backtraces as extra debugging '
+                        'output')
+
+    parser.add_argument('--store', nargs=1, default=['results.sqlite'],
+                        help='sqlite results store')
+
+    parser.add_argument('--campaign', nargs=1, default=None,
+                        help='only runs from this campaign')
+
+    parser.add_argument('--all', action='store_true',
+                        help='include runs rejected by linear screening '
+                        'or stopped early')
+
+    parser.add_argument('--termination', nargs=1, default=None,
+                        help='comma separated termination reasons to '
+                        'return, default is completed, one of: ' +
+                        ', '.join(termination.REASONS) + '. The metrics '
+                        'of stopped runs cover only the simulated time')
+
+    parser.add_argument('--range', action='append', default=[],
+                        help='column:min:max filter, either bound may be '
+                        'empty, may be repeated')
+
+    parser.add_argument('--equal', action='append', default=[],
+                        help='column=value filter, may be repeated')
+
+    parser.add_argument('--sort', nargs=1, default=None,
+                        help='column to sort by, e.g. iae')
+
+    parser.add_argument('--descending', action='store_true',
+                        help='sort largest first')
+
+    parser.add_argument('--top', nargs=1, type=int, default=None,
+                        help='return at most this many runs')
+
+    parser.add_argument('--columns', nargs=1, default=None,
+                        help='comma separated columns to print, default '
+                        'is the parameters and metrics')
+
+    options = parser.parse_args()
+    return options
+
+
+def parse_value(text):
+    """Return text as a float if possible, otherwise the string.
+    """
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def parse_filters(options):
+    """Return the ranges, equal and exclude dicts for
+    ResultsStore.query.
+    """
+    ranges = {}
+    for text in options.range:
+        fields = text.split(':')
+        if len(fields) != 3:
+            raise RuntimeError(
+                "Range filter must be column:min:max, received '{0}'".format(
+                    text))
+        name, minimum, maximum = fields
+        ranges[name] = (float(minimum) if minimum else None,
+                        float(maximum) if maximum else None)
+
+    equal = {}
+    for text in options.equal:
+        if '=' not in text:
+            raise RuntimeError(
+                "Equal filter must be column=value, received '{0}'".format(
+                    text))
+        name, value = text.split('=', 1)
+        equal[name] = parse_value(value)
+    if options.campaign:
+        equal['campaign'] = options.campaign[0]
+    exclude = {}
+    if not options.all:
+        equal['status'] = results_store.COMPLETED
+        reasons = [termination.COMPLETED, ]
+        if options.termination:
+            reasons = [reason.strip() for reason in
+                       options.termination[0].split(',')]
+        for reason in reasons:
+            if reason not in termination.REASONS:
+                raise RuntimeError(
+                    "Unknown termination reason '{0}', expected one of: "
+                    "{1}".format(reason, ", ".join(termination.REASONS)))
+        exclude['termination'] = [reason for reason in termination.REASONS
+                                  if reason not in reasons]
+    return ranges, equal, exclude
+
+
+# -------------------------------------------------------------------------------
+#
+# main
+#
+# -------------------------------------------------------------------------------
+def main(options):
+    if not os.path.isfile(options.store[0]):
+        raise RuntimeError("Could not find results store: {0}".format(
+            options.store[0]))
+
+    columns = None
+    if options.columns:
+        columns = [name.strip() for name in options.columns[0].split(',')]
+    else:
+        columns = [name for name, _ in (results_store.PARAMETER_COLUMNS +
+                                        results_store.METRIC_COLUMNS)]
+        columns.append('termination')
+    ranges, equal, exclude = parse_filters(options)
+
+    store = ResultsStore(options.store[0])
+    rows = store.query(columns, ranges, equal, exclude,
+                       options.sort[0] if options.sort else None,
+                       options.descending,
+                       options.top[0] if options.top else None)
+    writer = csv.writer(sys.stdout, lineterminator='\n')
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    options = commandline_options()
+    try:
+        status = main(options)
+        sys.exit(status)
+    except Exception as error:
+        print(str(error))
+        if options.backtrace:
+            traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""Resumable parameter sweep of the pid demo simulations.
+
+The config file is a regular demo config plus a [sweep] section. Each
+option in [sweep] is 'section.option' and a comma separated list of
+values or linspace(start, stop, num), e.g.:
+
+  [sweep]
+  campaign = tank-gains
+  control.Kp = 0.5, 1.0, 2.0
+  control.Ki = linspace(0.0, 0.1, 5)
+  forcing.mean = 0.45, 0.5
+
+Every combination of values is run and its parameters and metrics are
+appended to a results store. Runs already in the store are skipped,
+so an interrupted sweep is resumed by running the same command again.
+A run whose simulation raises is stored as failed with the error and
+the sweep continues.
+Query the results with pid-query.py.
+
+Large sweeps are distributed over any number of worker processes, on
+this or other hosts, through a work queue in the results store:
+
+  pid-sweep.py --config tank-sweep.cfg --store results.sqlite --enqueue
+  pid-sweep.py --store results.sqlite --worker    # once per worker
+  pid-sweep.py --store results.sqlite --status
+
+Workers claim batches of runs under a lease, the runs of a worker
+that died are claimed again when its lease expires, see work_queue.py.
+
+Copyright (c) 2016 Benjamin J. Andre
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v.  2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+
+#
+# built-in modules
+#
+import argparse
+import configparser
+import contextlib
+import io
+import itertools
+import os
+import re
+import sys
+import time
+import traceback
+
+#
+# installed dependencies
+#
+import numpy as np
+
+#
+# other modules in this package
+#
+from demo_model import create_demo, demo_class
+from pid import library_version
+from result_cache import normalize_config
+import results_store
+from results_store import ResultsStore, run_key
+import work_queue
+from work_queue import WorkQueue
+
+
+if sys.hexversion < 0x03050000:
+    print(70 * "*")
+    print("ERROR: {0} requires python >= 3.5.x. ".format(sys.argv[0]))
+    print("It appears that you are running python {0}".format(
+        ".".join(str(x) for x in sys.version_info[0:3])))
+    print(70 * "*")
+    sys.exit(1)
+
+_LINSPACE = re.compile(r'^linspace\(([^,]+),([^,]+),([^,]+)\)$')
+
+
+# -------------------------------------------------------------------------------
+#
+# User input
+#
+# -------------------------------------------------------------------------------
+def commandline_options():
+    """Process the command line arguments.
+
+    """
+    parser = argparse.ArgumentParser(
+        description='Resumable parameter sweep of the pid demos.')
+
+    parser.add_argument('--backtrace', action='store_true',
+                        help='show exception backtraces as extra debugging '
+                        'output')
+
+    parser.add_argument('--config', nargs=1,
+                        help='path to demo config file with a [sweep] '
+                        'section, required unless --worker or --status')
+
+    parser.add_argument('--store', nargs=1, default=['results.sqlite'],
+                        help='sqlite results store, created if needed')
+
+    parser.add_argument('--batch', nargs=1, type=int, default=[50],
+                        help='runs per store transaction, and per claim '
+                        'of a worker')
+
+    parser.add_argument('--screen', action='store_true',
+                        help='skip simulating gains rejected by linear '
+                        'screening, they are stored as rejected')
+
+    parser.add_argument('--min-damping', nargs=1, type=float, default=[0.2],
+                        help='smallest damping ratio accepted by --screen')
+
+    parser.add_argument('--enqueue', action='store_true',
+                        help='add the pending runs to the work queue of the '
+                        'store instead of running them')
+
+    parser.add_argument('--worker', action='store_true',
+                        help='run queued runs until the queue is empty')
+
+    parser.add_argument('--status', action='store_true',
+                        help='print the number of queued runs in each state')
+
+    parser.add_argument('--lease', nargs=1, type=float, default=[120.0],
+                        help='seconds before the runs claimed by a worker '
+                        'that stopped renewing its lease are claimed again')
+
+    parser.add_argument('--max-attempts', nargs=1, type=int, default=[3],
+                        help='fail a queued run after this many expired '
+                        'leases')
+
+    parser.add_argument('--poll', nargs=1, type=float, default=[5.0],
+                        help='seconds between checks of an idle worker for '
+                        'expired leases')
+
+    options = parser.parse_args()
+    if not (options.worker or options.status) and options.config is None:
+        parser.error('--config is required unless --worker or --status')
+    return options
+
+
+def read_config_file(filename):
+    """Read the configuration file and process
+
+    """
+    print("Reading configuration file : {0}".format(filename))
+
+    cfg_file = os.path.abspath(filename)
+    if not os.path.isfile(cfg_file):
+        raise RuntimeError("Could not find config file: {0}".format(cfg_file))
+
+    config = configparser.ConfigParser()
+    config.read(cfg_file)
+    if not config.has_section('sweep'):
+        raise RuntimeError("Sweep config must have a [sweep] section")
+    return config
+
+
+def sweep_values(text):
+    """Parse a list of values or linspace(start, stop, num) into a list
+    of strings for the config.
+    """
+    text = "".join(text.split())
+    match = _LINSPACE.match(text)
+    if match:
+        start, stop, num = match.groups()
+        return [repr(float(value)) for value in
+                np.linspace(float(start), float(stop), int(num))]
+    return [value for value in text.split(',') if value]
+
+
+def sweep_axes(config):
+    """Return the campaign name and a list of ((section, option),
+    values) for each swept option.
+    """
+    campaign = config.get('sweep', 'campaign', fallback='default')
+    axes = []
+    for name in config.options('sweep'):
+        if name == 'campaign':
+            continue
+        if '.' not in name:
+            raise RuntimeError(
+                "Sweep option '{0}' must be 'section.option'".format(name))
+        section, option = name.split('.', 1)
+        if not config.has_section(section):
+            raise RuntimeError(
+                "Sweep option '{0}' refers to a missing section".format(name))
+        axes.append(((section, option),
+                     sweep_values(config.get('sweep', name))))
+    return campaign, axes
+
+
+def run_configs(config, axes):
+    """Generate a config for each combination of the swept values.
+    """
+    base = {section: dict(config.items(section, raw=True))
+            for section in config.sections() if section != 'sweep'}
+    names = [name for name, _ in axes]
+    for values in itertools.product(*[values for _, values in axes]):
+        run = configparser.ConfigParser()
+        run.read_dict(base)
+        for (section, option), value in zip(names, values):
+            run.set(section, option, value)
+        yield run
+
+
+# -------------------------------------------------------------------------------
+#
+# work functions
+#
+# -------------------------------------------------------------------------------
+def simulate(run, options):
+    """Simulate one configuration, return (status, parameters, metrics).
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        demo = create_demo(run)
+        if options.screen:
+            screen = demo.screen_gains(min_damping=options.min_damping[0])
+            if not screen['survivor'][0]:
+                return results_store.REJECTED, demo.parameters(), {}
+        demo.simulate_no_control()
+        demo.simulate_with_control()
+    return results_store.COMPLETED, demo.parameters(), demo.metrics()
+
+
+def simulate_or_fail(key, run, options):
+    """Simulate one configuration, see simulate. A run that raises
+    is returned as failed with the error in its metrics, so one bad
+    configuration does not stop the sweep or the worker.
+    """
+    try:
+        return simulate(run, options)
+    except Exception as error:
+        message = "{0}: {1}".format(type(error).__name__, error)
+        print("  run {0} failed, {1}".format(key, message))
+        return results_store.FAILED, {}, {'error': message}
+
+
+# -------------------------------------------------------------------------------
+#
+# main
+#
+# -------------------------------------------------------------------------------
+def sweep_runs(config):
+    """Return the campaign name and a list of (key, run config) for
+    every combination of the swept values.
+    """
+    campaign, axes = sweep_axes(config)
+    version = library_version()
+    runs = []
+    for run in run_configs(config, axes):
+        key = run_key(run, demo_class(run).forcing_seed(), version)
+        runs.append((key, run))
+    return campaign, runs
+
+
+def print_status(queue, campaign=None):
+    """Print the number of queued runs in each state.
+    """
+    counts = queue.counts(campaign)
+    print("Queue: {0}".format(", ".join(
+        "{0} {1}".format(counts[state], state)
+        for state in work_queue.STATES)))
+
+
+def work(options):
+    """Claim batches of queued runs, simulate them and commit the
+    results until no runs are pending or leased.
+    """
+    queue = WorkQueue(options.store[0], lease_time=options.lease[0],
+                      max_attempts=options.max_attempts[0])
+    worker = work_queue.worker_name()
+    version = library_version()
+    print("Worker {0} on {1}".format(worker, options.store[0]))
+    count = 0
+    start = time.perf_counter()
+    try:
+        while True:
+            claimed = queue.claim(worker, options.batch[0])
+            if not claimed:
+                expires = queue.next_expiry()
+                if expires is None:
+                    break
+                # other workers hold the remaining runs, wait for them
+                # to finish or for their leases to expire.
+                time.sleep(min(options.poll[0],
+                               max(expires - time.time(), 0.0) + 0.1))
+                continue
+            count += work_batch(queue, worker, version, claimed, options)
+            print("  {0} runs, {1:.1f} s".format(
+                count, time.perf_counter() - start))
+            sys.stdout.flush()
+        print("Done, {0} runs in {1:.1f} s".format(
+            count, time.perf_counter() - start))
+        print_status(queue)
+    finally:
+        queue.close()
+    return 0
+
+
+def work_batch(queue, worker, version, claimed, options):
+    """Simulate the claimed runs, renewing the lease as needed, and
+    commit their results.
+
+    Returns:
+    number of runs completed. [int]
+    """
+    keys = [key for key, _, _ in claimed]
+    rows = []
+    renewed = time.time()
+    try:
+        for key, campaign, text in claimed:
+            run = configparser.ConfigParser()
+            run.read_string(text)
+            if run_key(run, demo_class(run).forcing_seed(), version) != key:
+                raise RuntimeError(
+                    "Run key mismatch, the worker library version {0} "
+                    "differs from the coordinator's".format(version))
+            status, parameters, metrics = simulate_or_fail(key, run, options)
+            rows.append(ResultsStore.row(key, campaign, status, parameters,
+                                         text, metrics))
+            if time.time() - renewed > 0.5 * options.lease[0]:
+                queue.renew(worker, keys[len(rows):])
+                renewed = time.time()
+    except Exception:
+        # a mismatched run keeps its lease and counts as an attempt,
+        # the rest of the batch goes back to the queue.
+        queue.release(worker, keys[len(rows) + 1:])
+        raise
+    except BaseException:
+        queue.release(worker, keys[len(rows):])
+        raise
+    finally:
+        if rows:
+            queue.complete(rows)
+    return len(rows)
+
+
+def main(options):
+    if options.worker:
+        return work(options)
+    if options.status:
+        queue = WorkQueue(options.store[0])
+        try:
+            campaign = None
+            if options.config is not None:
+                campaign, _ = sweep_axes(read_config_file(options.config[0]))
+            print_status(queue, campaign)
+        finally:
+            queue.close()
+        return 0
+
+    config = read_config_file(options.config[0])
+    campaign, runs = sweep_runs(config)
+
+    if options.enqueue:
+        store = WorkQueue(options.store[0])
+    else:
+        store = ResultsStore(options.store[0])
+    completed = store.completed(key for key, _ in runs)
+    pending = [(key, run) for key, run in runs if key not in completed]
+    print("Campaign '{0}': {1} runs, {2} already completed, {3} pending".format(
+        campaign, len(runs), len(runs) - len(pending), len(pending)))
+
+    if options.enqueue:
+        try:
+            added = store.enqueue(campaign, [(key, normalize_config(run))
+                                             for key, run in pending])
+            print("Queued {0} runs".format(added))
+            print_status(store, campaign)
+        finally:
+            store.close()
+        return 0
+
+    batch = []
+    start = time.perf_counter()
+    try:
+        for count, (key, run) in enumerate(pending, 1):
+            status, parameters, metrics = simulate_or_fail(key, run, options)
+            batch.append(ResultsStore.row(key, campaign, status, parameters,
+                                          normalize_config(run), metrics))
+            if len(batch) >= options.batch[0]:
+                store.append(batch)
+                batch = []
+                print("  {0}/{1} runs, {2:.1f} s".format(
+                    count, len(pending), time.perf_counter() - start))
+                sys.stdout.flush()
+    finally:
+        # keep the runs finished before an interruption
+        if batch:
+            store.append(batch)
+        store.close()
+    print("Done in {0:.1f} s, results in {1}".format(
+        time.perf_counter() - start, options.store[0]))
+    return 0
+
+
+if __name__ == "__main__":
+    options = commandline_options()
+    try:
+        status = main(options)
+        sys.exit(status)
+    except Exception as error:
+        print(str(error))
+        if options.backtrace:
+            traceback.print_exc()
+        sys.exit(1)
@@ -7,36 +7,100 @@
 // file, You can obtain one at http://mozilla.org/MPL/2.0/.
 //
 
-// Single precision floating point implementation of a PID,
-// proportional-integral-derivative, controller.
+// Floating point implementation of a PID,
+// proportional-integral-derivative, controller. Single precision by
+// default, double precision when the library is built with
+// -DPID_USE_DOUBLE, see pid_real in pid.h.
 #include <assert.h>
 #include <stdlib.h>
-#include <stdio.h>
 #include <stdbool.h>
 
 #include "pid.h"
 
+#ifdef PID_ENABLE_COUNTERS
+#ifndef PID_CYCLE_COUNTER
+#if defined(__x86_64__) || defined(__i386__)
+#include <x86intrin.h>
+#define PID_CYCLE_COUNTER() ((uint64_t)__rdtsc())
+#else
+#include <time.h>
+#define PID_CYCLE_COUNTER() ((uint64_t)clock())
+#endif
+#endif
+#endif
+
 struct pid_data {
-    float setpoint;
-    float Kp;
-    float Ki;
-    float Kd;
-    float integral;
+    pid_real setpoint;
+    pid_real Kp;
+    pid_real Ki;
+    pid_real Kd;
+    pid_real integral; // window or leaky integral, velocity form output
     uint8_t current;
     uint8_t history_length;
-    float *interval;
-    float *history;
+    uint8_t integral_mode;
+    uint16_t history_capacity; // allocated length of the history buffers
+    uint8_t mask; // fixed rate ring buffer index mask
+    pid_real previous_value;
+    // mode specific state, the fixed rate controller does not use the
+    // previous error and derivative or the leak, so its precomputed
+    // gains share their storage instead of growing every controller.
+    union {
+        struct {
+            pid_real previous_error;
+            pid_real previous_derivative;
+            pid_real leak;
+        };
+        struct {
+            pid_real Ki_dt; // fixed rate Ki * dt
+            pid_real Kd_dt; // fixed rate Kd / dt
+            pid_real delta_time; // fixed rate sample period
+        };
+    };
+    pid_real *interval;
+    pid_real *history;
+    struct pid_schedule *schedule; // NULL without a gain schedule
+#ifdef PID_ENABLE_COUNTERS
+    uint64_t call_count;
+    uint64_t cycle_total;
+#endif
+#ifdef PID_ENABLE_TRACE
+    pid_trace_record *trace;
+    uint32_t trace_capacity;
+    uint64_t trace_count;
+#endif
+};
+
+// gain schedule, allocated by pid_schedule_set so controllers without
+// one only pay for the pointer.
+struct pid_schedule {
+    pid_real min; // process value of the first point
+    pid_real scale; // points per unit process value
+    uint16_t length;
+    pid_real gains[]; // (length, 3) Kp, Ki, Kd
 };
 
-struct pid_data* pid_init(uint8_t const history_length, float const setpoint, 
-                          float const Kp, float const Ki, float const Kd) {
+struct pid_cascade {
+    pid_data *outer;
+    pid_data *inner;
+    pid_real inner_bias;
+    pid_real outer_scale;
+    pid_real outer_elapsed;
+    uint8_t ratio;
+    uint8_t tick;
+};
+
+// reset the scalar state of a controller as if it had just been
+// created, the history buffers are not touched.
+static void pid_reset(struct pid_data *const pid,
+                      uint8_t const history_length,
+                      uint8_t const integral_mode,
+                      pid_real const setpoint, pid_real const Kp,
+                      pid_real const Ki, pid_real const Kd) {
     // by definition gains must be non-negative
     assert(Kp >= 0.0f);
     assert(Ki >= 0.0f);
-    assert(Kp >= 0.0f);
+    assert(Kd >= 0.0f);
     
-    struct pid_data* pid;
-    pid = malloc(sizeof(struct pid_data));
     pid->setpoint = setpoint;
     pid->Kp = Kp;
     pid->Ki = Ki;
@@ -44,9 +108,50 @@ struct pid_data* pid_init(uint8_t const history_length, float const setpoint,
     pid->integral = 0.0f;
     pid->current = 0;
     pid->history_length = history_length;
-    pid->interval = malloc(pid->history_length * sizeof(float));
-    pid->history = malloc(pid->history_length * sizeof(float));
+    pid->integral_mode = integral_mode;
+    pid->mask = 0;
+    // assume perfect control before the first call
+    pid->previous_value = setpoint;
+    pid->previous_error = 0.0f;
+    pid->previous_derivative = 0.0f;
+    pid->leak = 1.0f;
+    pid_reset_counters(pid);
+}
 
+static struct pid_data* pid_alloc(uint8_t const history_length,
+                                  uint8_t const integral_mode,
+                                  pid_real const setpoint, pid_real const Kp,
+                                  pid_real const Ki, pid_real const Kd) {
+    struct pid_data* pid;
+    pid = malloc(sizeof(struct pid_data));
+    pid->history_capacity = 0;
+    pid->interval = NULL;
+    pid->history = NULL;
+    pid->schedule = NULL;
+#ifdef PID_ENABLE_TRACE
+    pid->trace = NULL;
+    pid->trace_capacity = 0;
+    pid->trace_count = 0;
+#endif
+    pid_reset(pid, history_length, integral_mode, setpoint, Kp, Ki, Kd);
+    return pid;
+}
+
+// allocate the window history buffers if their capacity is less than
+// the history length.
+static void window_alloc(struct pid_data *const pid) {
+    if (pid->history_capacity >= pid->history_length &&
+        pid->interval != NULL) {
+        return;
+    }
+    free(pid->history);
+    free(pid->interval);
+    pid->interval = malloc(pid->history_length * sizeof(pid_real));
+    pid->history = malloc(pid->history_length * sizeof(pid_real));
+    pid->history_capacity = pid->history_length;
+}
+
+static void window_reset(struct pid_data *const pid) {
     // initialize the history and calculate the initial integral
     // assuming perfect control. This should result in 
     for (uint8_t i = 0; i < pid->history_length; i++) {
@@ -54,17 +159,255 @@ struct pid_data* pid_init(uint8_t const history_length, float const setpoint,
         pid->interval[i] = 1.0;
         pid->integral += (pid->setpoint - pid->history[i]) * pid->interval[i];
     }
+}
+
+struct pid_data* pid_init(uint8_t const history_length,
+                          pid_real const setpoint, pid_real const Kp,
+                          pid_real const Ki, pid_real const Kd) {
+    struct pid_data* pid = pid_alloc(history_length, PID_INTEGRAL_WINDOW,
+                                     setpoint, Kp, Ki, Kd);
+    window_alloc(pid);
+    window_reset(pid);
     return pid;
 }
 
+struct pid_data* pid_init_velocity(pid_real const setpoint, pid_real const Kp,
+                                   pid_real const Ki, pid_real const Kd) {
+    return pid_alloc(0, PID_INTEGRAL_VELOCITY, setpoint, Kp, Ki, Kd);
+}
+
+struct pid_data* pid_init_leaky(pid_real const setpoint, pid_real const Kp,
+                                pid_real const Ki, pid_real const Kd,
+                                pid_real const leak) {
+    assert(leak >= 0.0f && leak <= 1.0f);
+    struct pid_data* pid = pid_alloc(0, PID_INTEGRAL_LEAKY,
+                                     setpoint, Kp, Ki, Kd);
+    pid->leak = leak;
+    return pid;
+}
+
+struct pid_data* pid_init_fixed_rate(uint8_t const history_length,
+                                     pid_real const setpoint, pid_real const Kp,
+                                     pid_real const Ki, pid_real const Kd,
+                                     pid_real const delta_time) {
+    assert(history_length > 0);
+    assert(delta_time > 0.0f);
+    struct pid_data* pid = pid_alloc(history_length, PID_INTEGRAL_FIXED_RATE,
+                                     setpoint, Kp, Ki, Kd);
+    // ring buffer of the next power of two, indexed with a mask
+    uint16_t size = 1;
+    while (size < history_length) {
+        size <<= 1;
+    }
+    pid->history = malloc(size * sizeof(pid_real));
+    pid->history_capacity = size;
+    pid->mask = (uint8_t)(size - 1);
+    // assume perfect control, the integral of the errors is zero
+    for (uint16_t i = 0; i < size; i++) {
+        pid->history[i] = setpoint;
+    }
+    pid->delta_time = delta_time;
+    pid->Ki_dt = Ki * delta_time;
+    pid->Kd_dt = Kd / delta_time;
+    return pid;
+}
+
+void pid_reinit(pid_data *const pid, pid_integral_mode const integral_mode,
+                uint8_t const history_length, pid_real const setpoint,
+                pid_real const Kp, pid_real const Ki, pid_real const Kd,
+                pid_real const leak) {
+    // fixed rate controllers need the sample period, use
+    // pid_init_fixed_rate
+    assert(integral_mode != PID_INTEGRAL_FIXED_RATE);
+    pid_trace_disable(pid);
+    pid_schedule_clear(pid);
+    if (integral_mode == PID_INTEGRAL_WINDOW) {
+        pid_reset(pid, history_length, integral_mode, setpoint, Kp, Ki, Kd);
+        window_alloc(pid);
+        window_reset(pid);
+    } else {
+        // keep any history buffers for a later window controller
+        pid_reset(pid, 0, integral_mode, setpoint, Kp, Ki, Kd);
+        if (integral_mode == PID_INTEGRAL_LEAKY) {
+            assert(leak >= 0.0f && leak <= 1.0f);
+            pid->leak = leak;
+        }
+    }
+}
+
 void pid_free(struct pid_data** pid) {
+    if (*pid == NULL) {
+        return;
+    }
+    pid_trace_disable(*pid);
+    pid_schedule_clear(*pid);
     free((*pid)->history);
     free((*pid)->interval);
     free(*pid);
     *pid = NULL;
 }
 
-float pid_control(pid_data *pid, float const process_value, float const delta_time) {
+char const* pid_version(void) {
+    return PID_VERSION;
+}
+
+size_t pid_real_size(void) {
+    return sizeof(pid_real);
+}
+
+size_t pid_memory_size(pid_data const *const pid) {
+    size_t bytes = sizeof(struct pid_data);
+    bytes += pid->history_capacity * sizeof(pid_real);
+    if (pid->interval != NULL) {
+        bytes += pid->history_capacity * sizeof(pid_real);
+    }
+    if (pid->schedule != NULL) {
+        bytes += sizeof(struct pid_schedule) +
+            3 * pid->schedule->length * sizeof(pid_real);
+    }
+#ifdef PID_ENABLE_TRACE
+    bytes += pid->trace_capacity * sizeof(pid_trace_record);
+#endif
+    return bytes;
+}
+
+static inline pid_real window_control(pid_data *pid, pid_real const error,
+                                      pid_real const process_value,
+                                      pid_real const delta_time,
+                                      pid_real *const derivative) {
+    uint8_t tm1 = pid->current; // time index t-1, where current time is t
+
+    // update the stored integral by subtracting out the oldest stored
+    // value and adding in the current value
+    pid_real hist_error = pid->setpoint - pid->history[tm1];
+    pid_real hist_integral = hist_error * pid->interval[tm1];
+    pid->integral -= hist_integral;
+    pid->integral += error * delta_time;
+    
+    *derivative = (process_value - pid->history[tm1]) / delta_time;
+    
+    pid_real output = pid->Kp * error + pid->Ki * pid->integral + pid->Kd * (*derivative);
+
+    // update the circular history buffers with the current values
+    // then increment the current location.
+    pid->history[tm1] = process_value;
+    pid->interval[tm1] = delta_time;
+    tm1++;
+    tm1 %= pid->history_length;
+    pid->current = tm1;
+    return output;
+}
+
+static inline pid_real velocity_control(pid_data *pid, pid_real const error,
+                                        pid_real const process_value,
+                                        pid_real const delta_time,
+                                        pid_real *const derivative) {
+    // incremental form, accumulate the change in output:
+    //
+    //   dC(t) = Kp * (e(t) - e(t-1)) + Ki * e(t) * dt + Kd * (D(t) - D(t-1))
+    //
+    // equivalent to an integral over all time, without a window.
+    *derivative = (process_value - pid->previous_value) / delta_time;
+    pid->integral += pid->Kp * (error - pid->previous_error) +
+        pid->Ki * error * delta_time +
+        pid->Kd * (*derivative - pid->previous_derivative);
+    pid->previous_value = process_value;
+    pid->previous_error = error;
+    pid->previous_derivative = *derivative;
+    return pid->integral;
+}
+
+static inline pid_real leaky_control(pid_data *pid, pid_real const error,
+                                     pid_real const process_value,
+                                     pid_real const delta_time,
+                                     pid_real *const derivative) {
+    // exponentially weighted integral, older errors decay by the leak
+    // factor each call:
+    //
+    //   I(t) = leak * I(t-1) + e(t) * dt
+    *derivative = (process_value - pid->previous_value) / delta_time;
+    pid->integral = pid->leak * pid->integral + error * delta_time;
+    pid->previous_value = process_value;
+    return pid->Kp * error + pid->Ki * pid->integral + pid->Kd * (*derivative);
+}
+
+static inline pid_real fixed_rate_control(pid_data *pid, pid_real const error,
+                                          pid_real const process_value,
+                                          pid_real *const difference) {
+    // window integral with a constant sample period. The integral is
+    // stored as the sum of the errors in the window and the gains are
+    // prescaled, Ki * dt and Kd / dt, so the update needs neither the
+    // interval buffer nor a division. The history is a power of two
+    // ring buffer, the value from history_length calls ago is at
+    // (current - history_length) & mask.
+    uint8_t const current = pid->current;
+    uint8_t const oldest = (uint8_t)(current - pid->history_length) & pid->mask;
+    pid_real const previous = pid->history[oldest];
+
+    pid->integral += error - (pid->setpoint - previous);
+    *difference = process_value - previous;
+
+    pid->history[current] = process_value;
+    pid->current = (uint8_t)(current + 1) & pid->mask;
+    return pid->Kp * error + pid->Ki_dt * pid->integral +
+        pid->Kd_dt * (*difference);
+}
+
+static inline void schedule_gains(pid_data *const pid,
+                                  pid_real const process_value) {
+    // position on the uniform grid, clamped to the table. Written so
+    // a NaN process value uses the first point.
+    struct pid_schedule const *const schedule = pid->schedule;
+    pid_real const last = (pid_real)(schedule->length - 1);
+    pid_real x = (process_value - schedule->min) * schedule->scale;
+    if (!(x > 0.0f)) {
+        x = 0.0f;
+    } else if (x > last) {
+        x = last;
+    }
+    uint16_t i = (uint16_t)x;
+    if (i == schedule->length - 1) {
+        i--;
+    }
+    pid_real const weight = x - (pid_real)i;
+    pid_real const *const low = &schedule->gains[3 * i];
+    pid_real const *const high = low + 3;
+    pid->Kp = low[0] + weight * (high[0] - low[0]);
+    pid->Ki = low[1] + weight * (high[1] - low[1]);
+    pid->Kd = low[2] + weight * (high[2] - low[2]);
+    if (pid->integral_mode == PID_INTEGRAL_FIXED_RATE) {
+        pid->Ki_dt = pid->Ki * pid->delta_time;
+        pid->Kd_dt = pid->Kd / pid->delta_time;
+    }
+}
+
+#ifdef PID_ENABLE_TRACE
+static inline void trace_record(pid_data *const pid, pid_real const error,
+                                pid_real const derivative_term,
+                                pid_real const output) {
+    pid_trace_record *record =
+        &pid->trace[pid->trace_count % pid->trace_capacity];
+    record->error = error;
+    record->proportional = pid->Kp * error;
+    record->derivative = derivative_term;
+    switch (pid->integral_mode) {
+    case PID_INTEGRAL_VELOCITY:
+        // the velocity form only stores the accumulated output
+        record->integral = output - record->proportional - record->derivative;
+        break;
+    case PID_INTEGRAL_FIXED_RATE:
+        record->integral = pid->Ki_dt * pid->integral;
+        break;
+    default:
+        record->integral = pid->Ki * pid->integral;
+        break;
+    }
+    record->output = output;
+    pid->trace_count++;
+}
+#endif
+
+pid_real pid_control(pid_data *pid, pid_real const process_value, pid_real const delta_time) {
     // calculate the PID output as:
     //
     //   e(t) = PS - PV(t)
@@ -88,58 +431,422 @@ float pid_control(pid_data *pid, float const process_value, float const delta_ti
     // Note: Calculating error as setpoint - process value, but the
     // derivative is based on the process variable instead of the
     // error.
+    //
+    // Controllers created with pid_init_velocity or pid_init_leaky
+    // replace the windowed integral, see velocity_control and
+    // leaky_control. Controllers created with pid_init_fixed_rate
+    // ignore delta_time, see fixed_rate_control.
+#ifdef PID_ENABLE_COUNTERS
+    uint64_t const start_cycle = PID_CYCLE_COUNTER();
+#endif
+    if (pid->schedule != NULL) {
+        schedule_gains(pid, process_value);
+    }
     
-    float error = pid->setpoint - process_value;
-    
-    uint8_t tm1 = pid->current; // time index t-1, where current time is t
+    pid_real error = pid->setpoint - process_value;
+    pid_real derivative;
+    pid_real output;
+    switch (pid->integral_mode) {
+    case PID_INTEGRAL_VELOCITY:
+        output = velocity_control(pid, error, process_value, delta_time,
+                                  &derivative);
+        break;
+    case PID_INTEGRAL_LEAKY:
+        output = leaky_control(pid, error, process_value, delta_time,
+                               &derivative);
+        break;
+    case PID_INTEGRAL_FIXED_RATE:
+        output = fixed_rate_control(pid, error, process_value, &derivative);
+        // scale the difference to match the other modes
+        derivative /= pid->delta_time;
+        break;
+    default:
+        output = window_control(pid, error, process_value, delta_time,
+                                &derivative);
+        break;
+    }
 
-    // update the stored integral by subtracting out the oldest stored
-    // value and adding in the current value
-    float hist_error = pid->setpoint - pid->history[tm1];
-    float hist_integral = hist_error * pid->interval[tm1];
-    pid->integral -= hist_integral;
-    pid->integral += error * delta_time;
-    
-    float derivative = (process_value - pid->history[tm1]) / delta_time;
-    
-    float output = pid->Kp * error + pid->Ki * pid->integral + pid->Kd * derivative;
+#ifdef PID_ENABLE_TRACE
+    if (pid->trace != NULL) {
+        trace_record(pid, error, pid->Kd * derivative, output);
+    }
+#endif
+#ifdef PID_ENABLE_COUNTERS
+    pid->call_count++;
+    pid->cycle_total += PID_CYCLE_COUNTER() - start_cycle;
+#endif
+    return output;
+}
 
-    // update the circular history buffers with the current values
-    // then increment the current location.
-    pid->history[tm1] = process_value;
-    pid->interval[tm1] = delta_time;
-    tm1++;
-    tm1 %= pid->history_length;
-    pid->current = tm1;
-        
-    if (false) {
-        printf("error = %f\n", error);
-        printf("hist_error = %f\n", hist_error);
-        printf("hist_integral = %f\n", hist_integral);
-        printf("integral = %f\n", pid->integral);
-        printf("derivative = %f\n", derivative);
-        printf("output = %f\n", output);
+pid_real pid_control_fixed_rate(pid_data *const pid,
+                                pid_real const process_value) {
+    assert(pid->integral_mode == PID_INTEGRAL_FIXED_RATE);
+#ifdef PID_ENABLE_COUNTERS
+    uint64_t const start_cycle = PID_CYCLE_COUNTER();
+#endif
+    if (pid->schedule != NULL) {
+        schedule_gains(pid, process_value);
+    }
+    pid_real const error = pid->setpoint - process_value;
+    pid_real difference;
+    pid_real const output = fixed_rate_control(pid, error, process_value,
+                                               &difference);
+#ifdef PID_ENABLE_TRACE
+    if (pid->trace != NULL) {
+        trace_record(pid, error, pid->Kd_dt * difference, output);
     }
+#endif
+#ifdef PID_ENABLE_COUNTERS
+    pid->call_count++;
+    pid->cycle_total += PID_CYCLE_COUNTER() - start_cycle;
+#endif
     return output;
 }
 
+void pid_control_array(pid_data *const *const pids, size_t const n,
+                       pid_real const *const process_values,
+                       pid_real const delta_time, pid_real *const outputs) {
+    for (size_t i = 0; i < n; i++) {
+        outputs[i] = pid_control(pids[i], process_values[i], delta_time);
+    }
+}
+
+void pid_control_series(pid_data *const pid,
+                        pid_real const *const process_values,
+                        pid_real const *const delta_times, size_t const n,
+                        pid_real *const outputs) {
+    for (size_t i = 0; i < n; i++) {
+        outputs[i] = pid_control(pid, process_values[i], delta_times[i]);
+    }
+}
+
+void pid_set_setpoint(pid_data *const pid, pid_real const setpoint) {
+    // the integral is stored relative to the setpoint, and the oldest
+    // term is removed using the current setpoint, so shift the stored
+    // integral to the new setpoint to keep it consistent with the
+    // history.
+    pid_real window = 0.0f;
+    if (pid->integral_mode == PID_INTEGRAL_FIXED_RATE) {
+        // the fixed rate integral is a sum of errors, dt is in Ki_dt
+        window = (pid_real)pid->history_length;
+    } else {
+        for (uint8_t i = 0; i < pid->history_length; i++) {
+            window += pid->interval[i];
+        }
+    }
+    pid->integral += (setpoint - pid->setpoint) * window;
+    pid->setpoint = setpoint;
+}
+
+void pid_prime(pid_data *const pid, pid_real const process_value,
+               pid_real const delta_time) {
+    pid_real const error = pid->setpoint - process_value;
+    switch (pid->integral_mode) {
+    case PID_INTEGRAL_VELOCITY:
+        break;
+    case PID_INTEGRAL_LEAKY:
+        // fixed point of I = leak * I + e * dt
+        pid->integral = 0.0f;
+        if (pid->leak < 1.0f) {
+            pid->integral = error * delta_time / (1.0f - pid->leak);
+        }
+        break;
+    case PID_INTEGRAL_FIXED_RATE:
+        for (uint16_t i = 0; i < pid->history_capacity; i++) {
+            pid->history[i] = process_value;
+        }
+        pid->integral = error * (pid_real)pid->history_length;
+        break;
+    default:
+        pid->integral = 0.0f;
+        for (uint8_t i = 0; i < pid->history_length; i++) {
+            pid->history[i] = process_value;
+            pid->interval[i] = delta_time;
+            pid->integral += error * delta_time;
+        }
+        break;
+    }
+    pid->previous_value = process_value;
+    if (pid->integral_mode != PID_INTEGRAL_FIXED_RATE) {
+        pid->previous_error = error;
+        pid->previous_derivative = 0.0f;
+    }
+}
+
+// index of the oldest value in the window history
+static inline uint8_t oldest_index(pid_data const *const pid) {
+    if (pid->integral_mode == PID_INTEGRAL_FIXED_RATE) {
+        return (uint8_t)(pid->current - pid->history_length) & pid->mask;
+    }
+    return pid->current;
+}
+
+size_t pid_state_length(pid_data const *const pid) {
+    size_t length = 4 + pid->history_length;
+    if (pid->integral_mode == PID_INTEGRAL_WINDOW) {
+        length += pid->history_length;
+    }
+    return length;
+}
+
+void pid_state_get(pid_data const *const pid, pid_real *const state) {
+    state[0] = pid->integral;
+    state[1] = pid->previous_value;
+    state[2] = 0.0f;
+    state[3] = 0.0f;
+    if (pid->integral_mode != PID_INTEGRAL_FIXED_RATE) {
+        state[2] = pid->previous_error;
+        state[3] = pid->previous_derivative;
+    }
+    pid_real *const history = state + 4;
+    pid_real *const interval = history + pid->history_length;
+    uint16_t const size = pid->integral_mode == PID_INTEGRAL_FIXED_RATE ?
+        pid->history_capacity : pid->history_length;
+    uint8_t const oldest = oldest_index(pid);
+    for (uint8_t i = 0; i < pid->history_length; i++) {
+        uint16_t const index = (oldest + i) % size;
+        history[i] = pid->history[index];
+        if (pid->integral_mode == PID_INTEGRAL_WINDOW) {
+            interval[i] = pid->interval[index];
+        }
+    }
+}
+
+void pid_state_set(pid_data *const pid, pid_real const *const state) {
+    pid->integral = state[0];
+    pid->previous_value = state[1];
+    if (pid->integral_mode != PID_INTEGRAL_FIXED_RATE) {
+        pid->previous_error = state[2];
+        pid->previous_derivative = state[3];
+    }
+    pid_real const *const history = state + 4;
+    pid_real const *const interval = history + pid->history_length;
+    // restore the window oldest first from the start of the ring
+    for (uint8_t i = 0; i < pid->history_length; i++) {
+        pid->history[i] = history[i];
+        if (pid->integral_mode == PID_INTEGRAL_WINDOW) {
+            pid->interval[i] = interval[i];
+        }
+    }
+    pid->current = 0;
+    if (pid->integral_mode == PID_INTEGRAL_FIXED_RATE) {
+        pid->current = pid->history_length & pid->mask;
+    }
+}
+
+bool pid_schedule_set(pid_data *const pid, uint16_t const num_points,
+                      pid_real const process_min, pid_real const process_max,
+                      pid_real const *const gains) {
+    if (num_points < 2 || !(process_max > process_min)) {
+        return false;
+    }
+    for (uint32_t i = 0; i < 3 * (uint32_t)num_points; i++) {
+        // by definition gains must be non-negative
+        if (!(gains[i] >= 0.0f)) {
+            return false;
+        }
+    }
+    if (get_schedule_length(pid) != num_points) {
+        struct pid_schedule *schedule =
+            malloc(sizeof(struct pid_schedule) +
+                   3 * num_points * sizeof(pid_real));
+        if (schedule == NULL) {
+            return false;
+        }
+        pid_schedule_clear(pid);
+        pid->schedule = schedule;
+        pid->schedule->length = num_points;
+    }
+    for (uint32_t i = 0; i < 3 * (uint32_t)num_points; i++) {
+        pid->schedule->gains[i] = gains[i];
+    }
+    pid->schedule->min = process_min;
+    pid->schedule->scale = (pid_real)(num_points - 1) /
+        (process_max - process_min);
+    return true;
+}
+
+void pid_schedule_clear(pid_data *const pid) {
+    free(pid->schedule);
+    pid->schedule = NULL;
+}
+
+struct pid_cascade* pid_cascade_init(pid_data *const outer, pid_data *const inner,
+                                     uint8_t const ratio,
+                                     pid_real const inner_bias,
+                                     pid_real const outer_scale) {
+    assert(ratio > 0);
+    struct pid_cascade *cascade;
+    cascade = malloc(sizeof(struct pid_cascade));
+    cascade->outer = outer;
+    cascade->inner = inner;
+    cascade->inner_bias = inner_bias;
+    cascade->outer_scale = outer_scale;
+    cascade->outer_elapsed = 0.0f;
+    cascade->ratio = ratio;
+    cascade->tick = 0;
+    return cascade;
+}
+
+void pid_cascade_free(struct pid_cascade** cascade) {
+    free(*cascade);
+    *cascade = NULL;
+}
+
+pid_real pid_cascade_control(struct pid_cascade *const cascade,
+                             pid_real const outer_process_value,
+                             pid_real const inner_process_value,
+                             pid_real const delta_time) {
+    cascade->outer_elapsed += delta_time;
+    if (cascade->tick == 0) {
+        pid_real outer = pid_control(cascade->outer, outer_process_value,
+                                     cascade->outer_elapsed);
+        pid_set_setpoint(cascade->inner,
+                         cascade->inner_bias + cascade->outer_scale * outer);
+        cascade->outer_elapsed = 0.0f;
+    }
+    cascade->tick++;
+    cascade->tick %= cascade->ratio;
+    return pid_control(cascade->inner, inner_process_value, delta_time);
+}
+
 // access functions for unit testing and debugging logging
 uint8_t get_history_length(pid_data const *const pid) {
     return pid->history_length;
 }
 
-float get_setpoint(pid_data const *const pid) {
+pid_real get_setpoint(pid_data const *const pid) {
     return pid->setpoint;
 }
 
-float get_Kp(pid_data const *const pid) {
+pid_real get_Kp(pid_data const *const pid) {
     return pid->Kp;
 }
 
-float get_Ki(pid_data const *const pid) {
+pid_real get_Ki(pid_data const *const pid) {
     return pid->Ki;
 }
 
-float get_Kd(pid_data const *const pid) {
+pid_real get_Kd(pid_data const *const pid) {
     return pid->Kd;
 }
+
+pid_integral_mode get_integral_mode(pid_data const *const pid) {
+    return (pid_integral_mode)pid->integral_mode;
+}
+
+pid_real get_leak(pid_data const *const pid) {
+    if (pid->integral_mode == PID_INTEGRAL_FIXED_RATE) {
+        return 1.0f;
+    }
+    return pid->leak;
+}
+
+pid_real get_delta_time(pid_data const *const pid) {
+    if (pid->integral_mode != PID_INTEGRAL_FIXED_RATE) {
+        return 0.0f;
+    }
+    return pid->delta_time;
+}
+
+uint16_t get_schedule_length(pid_data const *const pid) {
+    if (pid->schedule == NULL) {
+        return 0;
+    }
+    return pid->schedule->length;
+}
+
+// optional performance counters
+bool pid_counters_enabled(void) {
+#ifdef PID_ENABLE_COUNTERS
+    return true;
+#else
+    return false;
+#endif
+}
+
+uint64_t get_call_count(pid_data const *const pid) {
+#ifdef PID_ENABLE_COUNTERS
+    return pid->call_count;
+#else
+    (void)pid;
+    return 0;
+#endif
+}
+
+uint64_t get_cycle_total(pid_data const *const pid) {
+#ifdef PID_ENABLE_COUNTERS
+    return pid->cycle_total;
+#else
+    (void)pid;
+    return 0;
+#endif
+}
+
+void pid_reset_counters(pid_data *const pid) {
+#ifdef PID_ENABLE_COUNTERS
+    pid->call_count = 0;
+    pid->cycle_total = 0;
+#else
+    (void)pid;
+#endif
+}
+
+// optional trace of the P, I and D contributions
+bool pid_trace_enable(pid_data *const pid, uint32_t const capacity) {
+#ifdef PID_ENABLE_TRACE
+    pid_trace_disable(pid);
+    if (capacity == 0) {
+        return false;
+    }
+    pid->trace = malloc(capacity * sizeof(pid_trace_record));
+    if (pid->trace == NULL) {
+        return false;
+    }
+    pid->trace_capacity = capacity;
+    pid->trace_count = 0;
+    return true;
+#else
+    (void)pid;
+    (void)capacity;
+    return false;
+#endif
+}
+
+void pid_trace_disable(pid_data *const pid) {
+#ifdef PID_ENABLE_TRACE
+    free(pid->trace);
+    pid->trace = NULL;
+    pid->trace_capacity = 0;
+    pid->trace_count = 0;
+#else
+    (void)pid;
+#endif
+}
+
+pid_trace_record const* get_trace_buffer(pid_data const *const pid) {
+#ifdef PID_ENABLE_TRACE
+    return pid->trace;
+#else
+    (void)pid;
+    return NULL;
+#endif
+}
+
+uint32_t get_trace_capacity(pid_data const *const pid) {
+#ifdef PID_ENABLE_TRACE
+    return pid->trace_capacity;
+#else
+    (void)pid;
+    return 0;
+#endif
+}
+
+uint64_t get_trace_count(pid_data const *const pid) {
+#ifdef PID_ENABLE_TRACE
+    return pid->trace_count;
+#else
+    (void)pid;
+    return 0;
+#endif
+}
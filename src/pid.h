@@ -7,28 +7,221 @@
 // file, You can obtain one at http://mozilla.org/MPL/2.0/.
 //
 
-// Single precision floating point implementation of a PID,
-// proportional-integral-derivative, controller.
+// Floating point implementation of a PID,
+// proportional-integral-derivative, controller. Single precision by
+// default, double precision when the library is built with
+// -DPID_USE_DOUBLE, see pid_real.
 
 #ifndef PID_H_
 #define PID_H_
+#include <stdbool.h>
+#include <stddef.h>
 #include <stdint.h>
 
 
+// library version, part of the key for cached simulation results.
+#define PID_VERSION "0.2.0"
+
+// floating point type of the controller. Single precision suits
+// embedded targets with a single precision FPU, double precision is
+// for accuracy studies on hosts.
+#ifdef PID_USE_DOUBLE
+typedef double pid_real;
+#else
+typedef float pid_real;
+#endif
+
 // declare an opaque type for the public interface
 typedef struct pid_data pid_data;
+typedef struct pid_cascade pid_cascade;
 
-pid_data* pid_init(uint8_t const history_length, float const setpoint,
-                   float const Kp, float const Ki, float const Kd);
+// one step of the optional controller trace, the error and the
+// contribution of each term to the control output.
+typedef struct pid_trace_record {
+    pid_real error;
+    pid_real proportional;
+    pid_real integral;
+    pid_real derivative;
+    pid_real output;
+} pid_trace_record;
+
+// integral modes, selected by the init function.
+//
+//   PID_INTEGRAL_WINDOW: pid_init, integral of the error over the last
+//     history_length calls, stored in ring buffers of process values
+//     and delta times.
+//
+//   PID_INTEGRAL_VELOCITY: pid_init_velocity, incremental form that
+//     accumulates the change in output each call, equivalent to an
+//     integral over all time.
+//
+//   PID_INTEGRAL_LEAKY: pid_init_leaky, exponentially weighted
+//     integral, I(t) = leak * I(t-1) + e(t) * dt, with 0 <= leak <= 1.
+//
+//   PID_INTEGRAL_FIXED_RATE: pid_init_fixed_rate, the window integral
+//     for a constant sample period. Ki * dt and Kd / dt are
+//     precomputed, there is no interval buffer and the history is a
+//     power of two ring buffer. delta_time passed to pid_control is
+//     ignored, pid_control_fixed_rate skips the mode dispatch.
+//
+// The velocity and leaky modes keep O(1) state, the previous process
+// value, error and derivative, and allocate no history buffers. The
+// derivative is taken against the previous process value.
+typedef enum pid_integral_mode {
+    PID_INTEGRAL_WINDOW = 0,
+    PID_INTEGRAL_VELOCITY = 1,
+    PID_INTEGRAL_LEAKY = 2,
+    PID_INTEGRAL_FIXED_RATE = 3,
+} pid_integral_mode;
+
+pid_data* pid_init(uint8_t const history_length, pid_real const setpoint,
+                   pid_real const Kp, pid_real const Ki, pid_real const Kd);
+pid_data* pid_init_velocity(pid_real const setpoint, pid_real const Kp,
+                            pid_real const Ki, pid_real const Kd);
+pid_data* pid_init_leaky(pid_real const setpoint, pid_real const Kp,
+                         pid_real const Ki, pid_real const Kd,
+                         pid_real const leak);
+pid_data* pid_init_fixed_rate(uint8_t const history_length,
+                              pid_real const setpoint, pid_real const Kp,
+                              pid_real const Ki, pid_real const Kd,
+                              pid_real const delta_time);
 void pid_free(pid_data** pid);
 
-float pid_control(pid_data* pid, float const process_value, float const delta_time);
+// reinitialize an existing controller in place, equivalent to freeing
+// it and creating a new one with the init function of integral_mode,
+// except PID_INTEGRAL_FIXED_RATE.
+// history_length is only used by PID_INTEGRAL_WINDOW and leak only by
+// PID_INTEGRAL_LEAKY. The history buffers are kept and only
+// reallocated when history_length exceeds their capacity, so pools of
+// short lived controllers can be recycled without malloc/free. The
+// trace is disabled and the counters are reset.
+void pid_reinit(pid_data *const pid, pid_integral_mode const integral_mode,
+                uint8_t const history_length, pid_real const setpoint,
+                pid_real const Kp, pid_real const Ki, pid_real const Kd,
+                pid_real const leak);
+char const* pid_version(void);
+
+// sizeof(pid_real) the library was built with, 4 or 8.
+size_t pid_real_size(void);
+
+// bytes allocated for the controller, including the history and
+// trace buffers. Buffers kept by pid_reinit are included.
+size_t pid_memory_size(pid_data const *const pid);
+
+pid_real pid_control(pid_data* pid, pid_real const process_value, pid_real const delta_time);
+
+// fast path for controllers created with pid_init_fixed_rate.
+pid_real pid_control_fixed_rate(pid_data *const pid,
+                                pid_real const process_value);
+
+// batched interface, compute outputs[i] = pid_control(pids[i],
+// process_values[i], delta_time) for n independent controllers in a
+// single call.
+void pid_control_array(pid_data *const *const pids, size_t const n,
+                       pid_real const *const process_values,
+                       pid_real const delta_time, pid_real *const outputs);
+
+// series interface, compute outputs[i] = pid_control(pid,
+// process_values[i], delta_times[i]) for n consecutive samples of a
+// single controller in one call, e.g. to replay a recorded log.
+void pid_control_series(pid_data *const pid,
+                        pid_real const *const process_values,
+                        pid_real const *const delta_times, size_t const n,
+                        pid_real *const outputs);
+
+void pid_set_setpoint(pid_data *const pid, pid_real const setpoint);
+
+// warm start. Prime the controller as if the process had been at
+// process_value for every call of the window, each delta_time apart:
+// the window history, the integral consistent with it, and the
+// previous process value and error. The velocity form output is
+// unchanged, the leaky integral is its steady value for a leak < 1.
+// delta_time is ignored by fixed rate controllers.
+void pid_prime(pid_data *const pid, pid_real const process_value,
+               pid_real const delta_time);
+
+// controller state for snapshots, pid_state_length floats:
+//
+//   integral, previous process value, previous error, previous
+//   derivative, history_length process values of the window oldest
+//   first, and for PID_INTEGRAL_WINDOW the history_length delta
+//   times of the window oldest first. PID_INTEGRAL_FIXED_RATE does
+//   not track the previous error and derivative, they are zero.
+//
+// The integral mode, history length, setpoint, gains and schedule are
+// configuration, not state. pid_state_set restores a state from a
+// controller with the same integral mode and history length.
+size_t pid_state_length(pid_data const *const pid);
+void pid_state_get(pid_data const *const pid, pid_real *const state);
+void pid_state_set(pid_data *const pid, pid_real const *const state);
+
+// gain schedule. Kp, Ki and Kd are tabulated at num_points >= 2
+// process values evenly spaced from process_min to process_max,
+// gains is row major with shape (num_points, 3). Each call to
+// pid_control or pid_control_fixed_rate first interpolates the gains
+// linearly at the current process value, in O(1), process values
+// outside the table use its end points. The table is copied. The
+// stored integral is not rescaled when Ki changes, so the output of
+// the window, fixed rate and leaky modes follows the scheduled Ki,
+// the velocity form changes its increments only. Returns false for
+// an invalid table or if the table can not be allocated. A
+// controller without a schedule pays a single branch per call.
+bool pid_schedule_set(pid_data *const pid, uint16_t const num_points,
+                      pid_real const process_min, pid_real const process_max,
+                      pid_real const *const gains);
+void pid_schedule_clear(pid_data *const pid);
+uint16_t get_schedule_length(pid_data const *const pid);
+
+// cascade of two controllers. The outer controller runs every
+// 'ratio' calls and sets the inner setpoint:
+//
+//   inner setpoint = inner_bias + outer_scale * outer output
+//
+// use outer_scale = -1 when the inner setpoint must decrease as the
+// outer error increases. The inner controller runs every call and its
+// output is returned. The cascade does not own the controllers,
+// pid_cascade_free only frees the cascade.
+pid_cascade* pid_cascade_init(pid_data *const outer, pid_data *const inner,
+                              uint8_t const ratio, pid_real const inner_bias,
+                              pid_real const outer_scale);
+void pid_cascade_free(pid_cascade** cascade);
+pid_real pid_cascade_control(pid_cascade *const cascade,
+                             pid_real const outer_process_value,
+                             pid_real const inner_process_value,
+                             pid_real const delta_time);
 
 // access functions for unit testing and debugging logging.
 uint8_t get_history_length(pid_data const *const pid);
-float get_setpoint(pid_data const *const pid);
-float get_Kp(pid_data const *const pid);
-float get_Ki(pid_data const *const pid);
-float get_Kd(pid_data const *const pid);
+pid_real get_setpoint(pid_data const *const pid);
+pid_real get_Kp(pid_data const *const pid);
+pid_real get_Ki(pid_data const *const pid);
+pid_real get_Kd(pid_data const *const pid);
+pid_integral_mode get_integral_mode(pid_data const *const pid);
+pid_real get_leak(pid_data const *const pid);
+pid_real get_delta_time(pid_data const *const pid);
+
+// optional performance counters. Compile with -DPID_ENABLE_COUNTERS
+// to record the number of calls to pid_control and the total cycles
+// spent in them for each controller. Define PID_CYCLE_COUNTER() to
+// read a target specific cycle counter, e.g. DWT->CYCCNT on a
+// Cortex-M. When the counters are compiled out, the access functions
+// always return zero.
+bool pid_counters_enabled(void);
+uint64_t get_call_count(pid_data const *const pid);
+uint64_t get_cycle_total(pid_data const *const pid);
+void pid_reset_counters(pid_data *const pid);
+
+// optional trace ring buffer of the P, I and D contributions. Compile
+// with -DPID_ENABLE_TRACE to include it. When compiled in, a
+// controller without an enabled trace pays a single branch per call.
+// pid_trace_enable returns false if the trace is compiled out or the
+// buffer can not be allocated. Records are written at index
+// (count % capacity), so once count > capacity the oldest record is
+// at the current write index.
+bool pid_trace_enable(pid_data *const pid, uint32_t const capacity);
+void pid_trace_disable(pid_data *const pid);
+pid_trace_record const* get_trace_buffer(pid_data const *const pid);
+uint32_t get_trace_capacity(pid_data const *const pid);
+uint64_t get_trace_count(pid_data const *const pid);
 
 #endif // PID_H_
@@ -14,13 +14,30 @@ file, You can obtain one at http://mozilla.org/MPL/2.0/.
 # built-in modules
 #
 import ctypes
+import os
 import sys
 import traceback
+import weakref
+
+#
+# installed dependencies
+#
+import numpy as np
 
 #
 # other modules in this package
 #
-bjapid = ctypes.cdll.LoadLibrary('libbjapid.A.dylib')
+# BJAPID_PRECISION=double loads the double precision build of the
+# library, make dylib PRECISION=double.
+LIBRARIES = {
+    'single': 'libbjapid.A.dylib',
+    'double': 'libbjapid-double.A.dylib',
+}
+PRECISION = os.environ.get('BJAPID_PRECISION', 'single')
+if PRECISION not in LIBRARIES:
+    raise RuntimeError("Unknown BJAPID_PRECISION '{0}', expected one of: "
+                       "{1}".format(PRECISION, ", ".join(sorted(LIBRARIES))))
+bjapid = ctypes.cdll.LoadLibrary(LIBRARIES[PRECISION])
 
 if sys.hexversion < 0x03050000:
     print(70 * "*")
@@ -30,12 +47,263 @@ if sys.hexversion < 0x03050000:
     print(70 * "*")
     sys.exit(1)
 
+# floating point type of the loaded library, pid_real in pid.h
+bjapid.pid_real_size.restype = ctypes.c_size_t
+bjapid.pid_real_size.argtypes = []
+if bjapid.pid_real_size() == ctypes.sizeof(ctypes.c_double):
+    c_real = ctypes.c_double
+    REAL_DTYPE = np.dtype(np.float64)
+else:
+    c_real = ctypes.c_float
+    REAL_DTYPE = np.dtype(np.float32)
+
+# layout of pid_trace_record in pid.h
+TRACE_DTYPE = np.dtype([('error', REAL_DTYPE),
+                        ('proportional', REAL_DTYPE),
+                        ('integral', REAL_DTYPE),
+                        ('derivative', REAL_DTYPE),
+                        ('output', REAL_DTYPE), ])
+
+# integral modes, pid_integral_mode in pid.h
+INTEGRAL_MODES = ('window', 'velocity', 'leaky', 'fixed_rate', )
+
+
+def _pid_prototypes():
+    """set all the wrapper function prototypes
+    """
+    bjapid.pid_init.restype = ctypes.c_void_p
+    bjapid.pid_init.argtypes = [
+        ctypes.c_uint8, c_real, c_real, c_real, c_real, ]
+
+    bjapid.pid_init_velocity.restype = ctypes.c_void_p
+    bjapid.pid_init_velocity.argtypes = [
+        c_real, c_real, c_real, c_real, ]
+
+    bjapid.pid_init_leaky.restype = ctypes.c_void_p
+    bjapid.pid_init_leaky.argtypes = [
+        c_real, c_real, c_real, c_real, c_real, ]
+
+    bjapid.pid_free.restype = None
+    bjapid.pid_free.argtypes = [ctypes.POINTER(ctypes.c_void_p), ]
+
+    bjapid.pid_reinit.restype = None
+    bjapid.pid_reinit.argtypes = [
+        ctypes.c_void_p, ctypes.c_int, ctypes.c_uint8, c_real, c_real,
+        c_real, c_real, c_real, ]
+
+    bjapid.pid_init_fixed_rate.restype = ctypes.c_void_p
+    bjapid.pid_init_fixed_rate.argtypes = [
+        ctypes.c_uint8, c_real, c_real, c_real, c_real, c_real, ]
+
+    bjapid.pid_memory_size.restype = ctypes.c_size_t
+    bjapid.pid_memory_size.argtypes = [ctypes.c_void_p, ]
+
+    bjapid.pid_control.restype = c_real
+    bjapid.pid_control.argtypes = [
+        ctypes.c_void_p, c_real, c_real, ]
+
+    bjapid.pid_version.restype = ctypes.c_char_p
+    bjapid.pid_version.argtypes = []
+
+    bjapid.pid_control_fixed_rate.restype = c_real
+    bjapid.pid_control_fixed_rate.argtypes = [ctypes.c_void_p, c_real, ]
+
+    bjapid.pid_control_array.restype = None
+    bjapid.pid_control_array.argtypes = [
+        ctypes.c_void_p, ctypes.c_size_t,
+        ctypes.c_void_p, c_real, ctypes.c_void_p, ]
+
+    bjapid.pid_control_series.restype = None
+    bjapid.pid_control_series.argtypes = [
+        ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_size_t,
+        ctypes.c_void_p, ]
+
+    bjapid.pid_set_setpoint.restype = None
+    bjapid.pid_set_setpoint.argtypes = [ctypes.c_void_p, c_real, ]
+
+    bjapid.pid_prime.restype = None
+    bjapid.pid_prime.argtypes = [ctypes.c_void_p, c_real, c_real, ]
+
+    bjapid.pid_state_length.restype = ctypes.c_size_t
+    bjapid.pid_state_length.argtypes = [ctypes.c_void_p, ]
+
+    bjapid.pid_state_get.restype = None
+    bjapid.pid_state_get.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ]
+
+    bjapid.pid_state_set.restype = None
+    bjapid.pid_state_set.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ]
+
+    bjapid.pid_schedule_set.restype = ctypes.c_bool
+    bjapid.pid_schedule_set.argtypes = [
+        ctypes.c_void_p, ctypes.c_uint16, c_real, c_real,
+        ctypes.c_void_p, ]
+
+    bjapid.pid_schedule_clear.restype = None
+    bjapid.pid_schedule_clear.argtypes = [ctypes.c_void_p, ]
+
+    bjapid.get_schedule_length.restype = ctypes.c_uint16
+    bjapid.get_schedule_length.argtypes = [ctypes.c_void_p, ]
+
+    bjapid.pid_cascade_init.restype = ctypes.c_void_p
+    bjapid.pid_cascade_init.argtypes = [
+        ctypes.c_void_p, ctypes.c_void_p,
+        ctypes.c_uint8, c_real, c_real, ]
+
+    bjapid.pid_cascade_free.restype = None
+    bjapid.pid_cascade_free.argtypes = [ctypes.POINTER(ctypes.c_void_p), ]
+
+    bjapid.pid_cascade_control.restype = c_real
+    bjapid.pid_cascade_control.argtypes = [
+        ctypes.c_void_p, c_real, c_real, c_real, ]
+
+    bjapid.pid_counters_enabled.restype = ctypes.c_bool
+    bjapid.pid_counters_enabled.argtypes = []
+
+    bjapid.get_call_count.restype = ctypes.c_uint64
+    bjapid.get_call_count.argtypes = [ctypes.c_void_p, ]
+
+    bjapid.get_cycle_total.restype = ctypes.c_uint64
+    bjapid.get_cycle_total.argtypes = [ctypes.c_void_p, ]
+
+    bjapid.pid_reset_counters.restype = None
+    bjapid.pid_reset_counters.argtypes = [ctypes.c_void_p, ]
+
+    bjapid.pid_trace_enable.restype = ctypes.c_bool
+    bjapid.pid_trace_enable.argtypes = [ctypes.c_void_p, ctypes.c_uint32, ]
+
+    bjapid.pid_trace_disable.restype = None
+    bjapid.pid_trace_disable.argtypes = [ctypes.c_void_p, ]
+
+    bjapid.get_trace_buffer.restype = ctypes.c_void_p
+    bjapid.get_trace_buffer.argtypes = [ctypes.c_void_p, ]
+
+    bjapid.get_trace_capacity.restype = ctypes.c_uint32
+    bjapid.get_trace_capacity.argtypes = [ctypes.c_void_p, ]
+
+    bjapid.get_trace_count.restype = ctypes.c_uint64
+    bjapid.get_trace_count.argtypes = [ctypes.c_void_p, ]
+
+
+_pid_prototypes()
+
+
+def _check_integral_mode(integral_mode, leak, delta_time=None):
+    """Raise RuntimeError for an unknown integral mode, invalid leak or
+    missing fixed rate delta time.
+    """
+    if integral_mode not in INTEGRAL_MODES:
+        raise RuntimeError(
+            "Unknown integral mode '{0}', expected one of: {1}".format(
+                integral_mode, ", ".join(INTEGRAL_MODES)))
+    if integral_mode == 'leaky' and (leak is None or
+                                     not 0.0 <= leak <= 1.0):
+        raise RuntimeError(
+            "leaky integral requires 0 <= leak <= 1, "
+            "received '{0}'".format(leak))
+    if integral_mode == 'fixed_rate' and (delta_time is None or
+                                          delta_time <= 0.0):
+        raise RuntimeError(
+            "fixed rate control requires delta_time > 0, "
+            "received '{0}'".format(delta_time))
+
+
+def _pid_init(history_length, setpoint, Kp, Ki, Kd, integral_mode, leak,
+              delta_time=None):
+    """Create a native controller with the requested integral mode and
+    return the pointer.
+    """
+    _check_integral_mode(integral_mode, leak, delta_time)
+    if integral_mode == 'window':
+        pid = bjapid.pid_init(history_length, setpoint, Kp, Ki, Kd)
+    elif integral_mode == 'velocity':
+        pid = bjapid.pid_init_velocity(setpoint, Kp, Ki, Kd)
+    elif integral_mode == 'fixed_rate':
+        pid = bjapid.pid_init_fixed_rate(history_length, setpoint, Kp, Ki,
+                                         Kd, delta_time)
+    else:
+        pid = bjapid.pid_init_leaky(setpoint, Kp, Ki, Kd, leak)
+    return pid
+
+
+def _pid_reinit(pid, history_length, setpoint, Kp, Ki, Kd, integral_mode,
+                leak):
+    """Reinitialize an existing native controller in place, see
+    pid_reinit in pid.h.
+    """
+    _check_integral_mode(integral_mode, leak)
+    if integral_mode == 'fixed_rate':
+        raise RuntimeError("Fixed rate controllers can not be "
+                           "reinitialized.")
+    if leak is None:
+        leak = 1.0
+    bjapid.pid_reinit(pid, INTEGRAL_MODES.index(integral_mode),
+                      history_length, setpoint, Kp, Ki, Kd, leak)
+
+
+def _pid_schedule_set(pid, process_min, process_max, gains):
+    """Copy a gain schedule table to a native controller, see
+    pid_schedule_set in pid.h.
+    """
+    gains = np.ascontiguousarray(gains, dtype=REAL_DTYPE)
+    if gains.ndim != 2 or gains.shape[1] != 3:
+        raise RuntimeError("A gain schedule must have shape (num_points, "
+                           "3), received {0}.".format(gains.shape))
+    if not 2 <= len(gains) <= np.iinfo(np.uint16).max:
+        raise RuntimeError("A gain schedule requires 2 to {0} points, "
+                           "received {1}.".format(np.iinfo(np.uint16).max,
+                                                  len(gains)))
+    if not bjapid.pid_schedule_set(pid, len(gains), process_min,
+                                   process_max, gains.ctypes.data):
+        raise RuntimeError("Invalid gain schedule, requires process_max > "
+                           "process_min and non-negative gains.")
+
+
+def _pid_free(pid):
+    """Free a native controller given its address.
+    """
+    bjapid.pid_free(ctypes.byref(ctypes.c_void_p(pid)))
+
+
+def _pid_free_array(pids):
+    """Free every native controller in a ctypes array of pointers.
+    """
+    for i in range(len(pids)):
+        _pid_free(pids[i])
+        pids[i] = None
+
+
+def _pid_free_array_list(pids):
+    """Free and remove every native controller in a list of addresses.
+    """
+    while pids:
+        _pid_free(pids.pop())
+
+
+
+def _cascade_free(cascade):
+    bjapid.pid_cascade_free(ctypes.byref(ctypes.c_void_p(cascade)))
+
+
+def library_version():
+    """Return the version string of the native library.
+    """
+    version = bjapid.pid_version().decode('ascii')
+    if REAL_DTYPE == np.float64:
+        version += '-double'
+    return version
+
 
 class PID(object):
     """ctypes wrapper for pid controller
+
+    The native controller is freed by close(), on leaving a with
+    block, or when the object is garbage collected, whichever comes
+    first. Controllers acquired from a PIDPool are returned to the
+    pool instead of being freed.
     """
 
-    def __init__(self, history_length=5, setpoint=0.0, Kp=1.0, Ki=0.0, Kd=0.0):
+    def __init__(self, history_length=5, setpoint=0.0, Kp=1.0, Ki=0.0, Kd=0.0,
+                 integral_mode='window', leak=None, delta_time=None):
         """Create and initialize a PID controller.
 
         Create and initialize a PID controller. If no gains are
@@ -51,32 +319,51 @@ class PID(object):
         Kp, Ki, Kd -- gains for proportional, integral and derivative
         terms. [float]
 
+        integral_mode -- 'window' integral over history_length calls,
+        the history free 'velocity' form or 'leaky' integral, or the
+        'fixed_rate' window for a constant delta_time, see pid.h. [str]
+
+        leak -- decay factor of the leaky integral per call, in
+        [0, 1]. [float]
+
+        delta_time -- sample period of a fixed rate controller, the
+        delta_time passed to control is ignored. [float]
+
         """
-        self._pid_prototypes()
+        pid = _pid_init(history_length, setpoint, Kp, Ki, Kd,
+                        integral_mode, leak, delta_time)
+        self._attach(pid, _pid_free)
 
-        history_length_c = ctypes.c_uint8(history_length)
-        setpoint_c = ctypes.c_float(setpoint)
-        Kp_c = ctypes.c_float(Kp)
-        Ki_c = ctypes.c_float(Ki)
-        Kd_c = ctypes.c_float(Kd)
+    def _attach(self, pid, release):
+        self._native = ctypes.c_void_p(pid)
+        # the finalizer must not reference self
+        self._finalizer = weakref.finalize(self, release, pid)
 
-        pid = bjapid.pid_init(history_length_c, setpoint_c,
-                               Kp_c, Ki_c, Kd_c)
+    @property
+    def _pid(self):
+        if self._native is None:
+            raise RuntimeError("The controller has been closed.")
+        return self._native
 
-        self._pid = ctypes.c_void_p(pid)
-        # print("&pid = {0}".format(self._pid))
+    @property
+    def closed(self):
+        """True once the native controller has been released.
+        """
+        return self._native is None
 
-    def _pid_prototypes(self):
-        """set all the wrapper function prototypes
+    def close(self):
+        """Release the native controller. Calling close again has no
+        effect, any other use afterwards raises RuntimeError.
         """
-        bjapid.pid_init.restype = ctypes.c_void_p
-        bjapid.pid_init.argtypes = [
-            ctypes.c_uint8, ctypes.c_float,
-            ctypes.c_float, ctypes.c_float, ctypes.c_float, ]
+        self._native = None
+        self._finalizer()
+
+    def __enter__(self):
+        return self
 
-        bjapid.pid_control.restype = ctypes.c_float
-        bjapid.pid_control.argstypes = [
-            ctypes.c_void_p, ctypes.c_float, ctypes.c_float, ]
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+        return False
 
     def control(self, process_value, delta_time):
         """Compute the control output.
@@ -92,13 +379,491 @@ class PID(object):
         control output -- controller output. [float]
 
         """
-        process_value_c = ctypes.c_float(process_value)
-        delta_time_c = ctypes.c_float(delta_time)
+        process_value_c = c_real(process_value)
+        delta_time_c = c_real(delta_time)
 
         control = bjapid.pid_control(self._pid, process_value_c, delta_time_c)
 
         return control
 
+    def control_series(self, process_values, delta_times, outputs=None):
+        """Compute the control outputs of consecutive samples in a
+        single native call.
+
+        Positional arguments:
+        process_values -- process value of each sample. [np.ndarray]
+        delta_times -- time interval before each sample. [np.ndarray]
+
+        Keyword arguments:
+        outputs -- REAL_DTYPE array to write the outputs to, allocated
+        if None. [np.ndarray]
+
+        Returns:
+        control outputs -- controller outputs, REAL_DTYPE. [np.ndarray]
+
+        """
+        process_values = np.ascontiguousarray(process_values,
+                                              dtype=REAL_DTYPE)
+        delta_times = np.ascontiguousarray(delta_times, dtype=REAL_DTYPE)
+        num_samples = len(process_values)
+        if len(delta_times) != num_samples:
+            raise RuntimeError(
+                "Received {0} process values but {1} delta times.".format(
+                    num_samples, len(delta_times)))
+        if outputs is None:
+            outputs = np.empty(num_samples, dtype=REAL_DTYPE)
+        elif (outputs.dtype != REAL_DTYPE or len(outputs) < num_samples or
+              not outputs.flags['C_CONTIGUOUS']):
+            raise RuntimeError("outputs must be a contiguous {0} array "
+                               "with at least {1} values.".format(
+                                   REAL_DTYPE, num_samples))
+        bjapid.pid_control_series(self._pid, process_values.ctypes.data,
+                                  delta_times.ctypes.data, num_samples,
+                                  outputs.ctypes.data)
+        return outputs[:num_samples]
+
+    def memory_size(self):
+        """Bytes allocated by the native controller.
+        """
+        return bjapid.pid_memory_size(self._pid)
+
+    def set_setpoint(self, setpoint):
+        """Change the setpoint. The stored integral is shifted so the
+        history error is relative to the new setpoint.
+        """
+        bjapid.pid_set_setpoint(self._pid, setpoint)
+
+    def prime(self, process_value, delta_time):
+        """Warm start the controller as if the process had been at
+        process_value for the whole window, see pid_prime in pid.h.
+        """
+        bjapid.pid_prime(self._pid, process_value, delta_time)
+
+    def state(self):
+        """Return a copy of the controller state, see pid_state_get in
+        pid.h.
+
+        Returns:
+        state -- REAL_DTYPE array. [np.ndarray]
+        """
+        state = np.empty(bjapid.pid_state_length(self._pid), dtype=REAL_DTYPE)
+        bjapid.pid_state_get(self._pid, state.ctypes.data)
+        return state
+
+    def set_state(self, state):
+        """Restore a state returned by state() of a controller with the
+        same integral mode and history length.
+        """
+        state = np.ascontiguousarray(state, dtype=REAL_DTYPE)
+        length = bjapid.pid_state_length(self._pid)
+        if state.shape != (length, ):
+            raise RuntimeError(
+                "Controller state must have {0} values, received shape "
+                "{1}.".format(length, state.shape))
+        bjapid.pid_state_set(self._pid, state.ctypes.data)
+
+    def set_schedule(self, process_min, process_max, gains):
+        """Schedule the gains on the process value. The native
+        controller interpolates the gains at the process value of each
+        call, see pid_schedule_set in pid.h.
+
+        Positional arguments:
+        process_min, process_max -- process values of the first and
+        last table points, the points are evenly spaced. [float]
+        gains -- (Kp, Ki, Kd) at each point, shape (num_points, 3). [np.ndarray]
+
+        """
+        _pid_schedule_set(self._pid, process_min, process_max, gains)
+
+    def clear_schedule(self):
+        """Remove the gain schedule, the last interpolated gains are
+        kept.
+        """
+        bjapid.pid_schedule_clear(self._pid)
+
+    def schedule_length(self):
+        """Number of gain schedule points, zero without a schedule.
+        """
+        return bjapid.get_schedule_length(self._pid)
+
+    def counters(self):
+        """Return the native performance counters for this controller.
+
+        The counters are only recorded if the library was compiled
+        with PID_ENABLE_COUNTERS, otherwise calls and cycles are zero.
+
+        Returns:
+        counters -- dict with keys 'enabled', 'calls', 'cycles'. [dict]
+
+        """
+        counters = {
+            'enabled': bool(bjapid.pid_counters_enabled()),
+            'calls': bjapid.get_call_count(self._pid),
+            'cycles': bjapid.get_cycle_total(self._pid),
+        }
+        return counters
+
+    def reset_counters(self):
+        """Reset the native performance counters to zero.
+        """
+        bjapid.pid_reset_counters(self._pid)
+
+    def enable_trace(self, capacity):
+        """Start recording the P, I and D contributions of each call.
+
+        Positional arguments:
+        capacity -- number of records kept in the ring buffer. [int]
+
+        Raises RuntimeError if the library was compiled without
+        PID_ENABLE_TRACE.
+
+        """
+        if not bjapid.pid_trace_enable(self._pid, capacity):
+            raise RuntimeError("Could not enable pid trace. Compile the "
+                               "library with -DPID_ENABLE_TRACE.")
+
+    def disable_trace(self):
+        """Stop recording and free the trace buffer. Views returned by
+        trace() are invalid afterwards.
+        """
+        bjapid.pid_trace_disable(self._pid)
+
+    def trace(self):
+        """Return a view of the native trace ring buffer without copying.
+
+        The view is a numpy structured array with TRACE_DTYPE fields,
+        in storage order. It is only valid until disable_trace() or
+        close() is called.
+
+        Returns:
+        trace -- view of the ring buffer. [np.ndarray]
+        count -- total number of records written. [int]
+
+        """
+        address = bjapid.get_trace_buffer(self._pid)
+        if not address:
+            return np.zeros(0, dtype=TRACE_DTYPE), 0
+        capacity = bjapid.get_trace_capacity(self._pid)
+        count = bjapid.get_trace_count(self._pid)
+        buffer_type = ctypes.c_char * (capacity * TRACE_DTYPE.itemsize)
+        buffer = buffer_type.from_address(address)
+        trace = np.frombuffer(buffer, dtype=TRACE_DTYPE)
+        return trace, count
+
+    def trace_ordered(self):
+        """Return a chronologically ordered copy of the valid records.
+        """
+        trace, count = self.trace()
+        capacity = len(trace)
+        if count < capacity:
+            return trace[:count].copy()
+        start = count % capacity
+        return np.concatenate((trace[start:], trace[:start]))
+
+
+class PIDCascade(object):
+    """ctypes wrapper for a cascade of two pid controllers, e.g. a level
+    controller setting the setpoint of a flow controller. Both
+    measurements are processed in a single native call.
+    """
+
+    def __init__(self, outer, inner, ratio=1, inner_bias=0.0,
+                 outer_scale=1.0):
+        """Create a cascade from two existing controllers.
+
+        Positional arguments:
+
+        outer, inner -- outer and inner controllers. The cascade keeps
+        references to them, they should not be used directly. Once
+        either is closed control raises RuntimeError. [PID]
+
+        Keyword arguments:
+
+        ratio -- the outer controller runs once every ratio calls. [int]
+
+        inner_bias, outer_scale -- inner setpoint is
+        inner_bias + outer_scale * outer output. [float]
+
+        """
+        self._outer = outer
+        self._inner = inner
+        cascade = bjapid.pid_cascade_init(outer._pid, inner._pid, ratio,
+                                          inner_bias, outer_scale)
+        self._native = ctypes.c_void_p(cascade)
+        self._finalizer = weakref.finalize(self, _cascade_free, cascade)
+
+    @property
+    def _cascade(self):
+        if self._native is None:
+            raise RuntimeError("The cascade has been closed.")
+        return self._native
+
+    def close(self):
+        """Free the cascade. The outer and inner controllers are not
+        closed.
+        """
+        self._native = None
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+        return False
+
+    def control(self, outer_process_value, inner_process_value, delta_time):
+        """Compute the actuator output of the cascade.
+
+        Positional arguments:
+        outer_process_value -- current outer process value. [float]
+        inner_process_value -- current inner process value. [float]
+        delta_time -- time interval since last call. [float]
+
+        Returns:
+        control output -- inner controller output. [float]
+
+        """
+        # the native cascade points at the controllers, raise instead
+        # of using them after either was closed
+        if self._outer.closed or self._inner.closed:
+            raise RuntimeError(
+                "A controller of the cascade has been closed.")
+        return bjapid.pid_cascade_control(self._cascade, outer_process_value,
+                                          inner_process_value, delta_time)
+
+
+class PIDBank(object):
+    """Independent controllers, one per process, driven through the
+    batched pid_control_array interface so a single native call
+    computes all the control outputs. The native controllers are freed
+    as for PID.
+    """
+
+    def __init__(self, num_controllers, history_length=5, setpoint=0.0,
+                 Kp=1.0, Ki=0.0, Kd=0.0, integral_mode='window', leak=None,
+                 delta_time=None):
+        """Create and initialize num_controllers PID controllers.
+
+        Keyword arguments:
+
+        history_length -- length of history buffer to save for
+        integral term. [int]
+
+        setpoint, Kp, Ki, Kd -- setpoint and gains, scalars or arrays
+        with one value per controller. [float or np.ndarray]
+
+        integral_mode, leak, delta_time -- integral mode of all the
+        controllers, see PID. [str, float, float]
+
+        """
+        self._num = num_controllers
+        setpoint, Kp, Ki, Kd = [
+            np.broadcast_to(np.asarray(value, dtype=np.float64),
+                            (self._num, ))
+            for value in (setpoint, Kp, Ki, Kd)]
+
+        pids = (ctypes.c_void_p * self._num)()
+        # register the finalizer first so a failed init frees the
+        # controllers created so far
+        self._finalizer = weakref.finalize(self, _pid_free_array, pids)
+        for i in range(self._num):
+            pids[i] = _pid_init(history_length, setpoint[i], Kp[i], Ki[i],
+                                Kd[i], integral_mode, leak, delta_time)
+        self._native = pids
+        self._process_values = np.zeros(self._num, dtype=REAL_DTYPE)
+        self._outputs = np.zeros(self._num, dtype=REAL_DTYPE)
+
+    def __len__(self):
+        return self._num
+
+    @property
+    def _pids(self):
+        if self._native is None:
+            raise RuntimeError("The controllers have been closed.")
+        return self._native
+
+    @property
+    def closed(self):
+        """True once the native controllers have been freed.
+        """
+        return self._native is None
+
+    def close(self):
+        """Free the native controllers, see PID.close.
+        """
+        self._native = None
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+        return False
+
+    def memory_size(self):
+        """Bytes allocated by the native controllers.
+        """
+        return sum(bjapid.pid_memory_size(p) for p in self._pids)
+
+    def control(self, process_values, delta_time):
+        """Compute the control output of every controller.
+
+        Positional arguments:
+        process_values -- current process value of each controller,
+        read in place if it is a contiguous REAL_DTYPE array, converted
+        otherwise. [np.ndarray]
+        delta_time -- time interval since last control calculation. [float]
+
+        Returns:
+        control output -- controller outputs, REAL_DTYPE. The array is
+        reused by the next call. [np.ndarray]
+
+        """
+        if (not isinstance(process_values, np.ndarray) or
+                process_values.dtype != REAL_DTYPE or
+                process_values.shape != (self._num, ) or
+                not process_values.flags['C_CONTIGUOUS']):
+            self._process_values[:] = process_values
+            process_values = self._process_values
+        bjapid.pid_control_array(
+            self._pids, self._num,
+            process_values.ctypes.data, delta_time,
+            self._outputs.ctypes.data)
+        return self._outputs
+
+    def set_schedule(self, process_min, process_max, gains):
+        """Schedule the gains of every controller, see PID.set_schedule.
+
+        Positional arguments:
+        process_min, process_max -- process values of the first and
+        last table points. [float]
+        gains -- one table for all controllers, shape (num_points, 3),
+        or one per controller, shape (num_controllers, num_points,
+        3). [np.ndarray]
+
+        """
+        gains = np.asarray(gains)
+        if gains.ndim == 2:
+            gains = np.broadcast_to(gains, (self._num, ) + gains.shape)
+        if len(gains) != self._num:
+            raise RuntimeError("Received {0} gain schedules for {1} "
+                               "controllers.".format(len(gains), self._num))
+        for pid, table in zip(self._pids, gains):
+            _pid_schedule_set(pid, process_min, process_max, table)
+
+    def counters(self):
+        """Native performance counters summed over all controllers.
+        """
+        counters = {
+            'enabled': bool(bjapid.pid_counters_enabled()),
+            'calls': sum(bjapid.get_call_count(p) for p in self._pids),
+            'cycles': sum(bjapid.get_cycle_total(p) for p in self._pids),
+        }
+        return counters
+
+    def reset_counters(self):
+        """Reset the native performance counters to zero.
+        """
+        for pid in self._pids:
+            bjapid.pid_reset_counters(pid)
+
+
+class _PooledPID(PID):
+    """PID acquired from a PIDPool. close(), or garbage collection,
+    returns the native controller to the pool. A weakref finalizer per
+    acquire costs about as much as reinitializing saves, so the release
+    is done by close and __del__ instead.
+    """
+
+    def __init__(self, pid, pool):
+        self._native = ctypes.c_void_p(pid)
+        self._pool = pool
+
+    def close(self):
+        """Return the native controller to the pool, see PID.close.
+        """
+        native = self._native
+        if native is not None:
+            self._native = None
+            self._pool._release(native.value)
+
+    def __del__(self):
+        self.close()
+
+
+class PIDPool(object):
+    """Free list of native controllers for workloads creating many
+    short lived controllers, e.g. sweeps. acquire() reinitializes a
+    previously released controller in place with pid_reinit instead of
+    allocating a new one, and closing the returned PID puts the native
+    controller back on the free list instead of freeing it.
+    """
+
+    def __init__(self, max_free=None):
+        """
+        Keyword arguments:
+
+        max_free -- largest number of released controllers kept,
+        extra controllers are freed. None for no limit. [int]
+        """
+        self._max_free = max_free
+        self._free = []
+        self._closed = False
+        self._finalizer = weakref.finalize(self, _pid_free_array_list,
+                                           self._free)
+
+    def __len__(self):
+        """Number of native controllers on the free list.
+        """
+        return len(self._free)
+
+    def acquire(self, history_length=5, setpoint=0.0, Kp=1.0, Ki=0.0,
+                Kd=0.0, integral_mode='window', leak=None, delta_time=None):
+        """Return a PID initialized as PID(...) with the same arguments.
+        Fixed rate controllers are always allocated, they are recycled
+        as other modes once released.
+        """
+        if self._closed:
+            raise RuntimeError("The controller pool has been closed.")
+        if integral_mode == 'fixed_rate':
+            pid = _pid_init(history_length, setpoint, Kp, Ki, Kd,
+                            integral_mode, leak, delta_time)
+        elif self._free:
+            pid = self._free.pop()
+            try:
+                _pid_reinit(pid, history_length, setpoint, Kp, Ki, Kd,
+                            integral_mode, leak)
+            except RuntimeError:
+                self._free.append(pid)
+                raise
+        else:
+            pid = _pid_init(history_length, setpoint, Kp, Ki, Kd,
+                            integral_mode, leak)
+        return _PooledPID(pid, self)
+
+    def _release(self, pid):
+        if self._closed or (self._max_free is not None and
+                            len(self._free) >= self._max_free):
+            _pid_free(pid)
+        else:
+            self._free.append(pid)
+
+    def close(self):
+        """Free the controllers on the free list. Controllers still in
+        use are freed when they are closed.
+        """
+        self._closed = True
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+        return False
+
 
 if __name__ == "__main__":
     try:
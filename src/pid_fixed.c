@@ -0,0 +1,244 @@
+// -*- mode: c; c-default-style: "k&r"; c-basic-offset: 4; indent-tabs-mode: nil; tab-width: 4 -*-
+//
+// Copyright (c) 2016 Benjamin J. Andre
+//
+// This Source Code Form is subject to the terms of the Mozilla Public
+// License, v.  2.0. If a copy of the MPL was not distributed with this
+// file, You can obtain one at http://mozilla.org/MPL/2.0/.
+//
+
+// Fixed point, Q15 and Q31, implementations of the PID controller in
+// pid.h for targets without an FPU.
+#include <assert.h>
+#include <stdlib.h>
+
+#include "pid_fixed.h"
+
+struct pid_q15_data {
+    q15_t setpoint;
+    q15_t Kp;
+    q15_t Ki;
+    q15_t Kd;
+    int32_t integral; // exact sum of the Q15 e*dt terms in the window
+    uint8_t current;
+    uint8_t history_length;
+    uint8_t gain_shift;
+    q15_t *interval;
+    q15_t *history;
+};
+
+struct pid_q31_data {
+    q31_t setpoint;
+    q31_t Kp;
+    q31_t Ki;
+    q31_t Kd;
+    int64_t integral; // exact sum of the Q31 e*dt terms in the window
+    uint8_t current;
+    uint8_t history_length;
+    uint8_t gain_shift;
+    q31_t *interval;
+    q31_t *history;
+};
+
+static inline q15_t saturate_q15(int32_t const value) {
+    if (value > INT16_MAX) {
+        return INT16_MAX;
+    } else if (value < INT16_MIN) {
+        return INT16_MIN;
+    }
+    return (q15_t)value;
+}
+
+static inline q31_t saturate_q31(int64_t const value) {
+    if (value > INT32_MAX) {
+        return INT32_MAX;
+    } else if (value < INT32_MIN) {
+        return INT32_MIN;
+    }
+    return (q31_t)value;
+}
+
+// -----------------------------------------------------------------------------
+//
+// Q15
+//
+// -----------------------------------------------------------------------------
+struct pid_q15_data* pid_q15_init(uint8_t const history_length, q15_t const setpoint,
+                                  q15_t const Kp, q15_t const Ki, q15_t const Kd,
+                                  uint8_t const gain_shift) {
+    // by definition gains must be non-negative
+    assert(Kp >= 0);
+    assert(Ki >= 0);
+    assert(Kd >= 0);
+    assert(gain_shift <= PID_Q15_MAX_GAIN_SHIFT);
+
+    struct pid_q15_data* pid;
+    pid = malloc(sizeof(struct pid_q15_data));
+    pid->setpoint = setpoint;
+    pid->Kp = Kp;
+    pid->Ki = Ki;
+    pid->Kd = Kd;
+    pid->integral = 0;
+    pid->current = 0;
+    pid->history_length = history_length;
+    pid->gain_shift = gain_shift;
+    pid->interval = malloc(pid->history_length * sizeof(q15_t));
+    pid->history = malloc(pid->history_length * sizeof(q15_t));
+
+    // initialize the history assuming perfect control, the integral
+    // is zero.
+    for (uint8_t i = 0; i < pid->history_length; i++) {
+        pid->history[i] = pid->setpoint;
+        pid->interval[i] = INT16_MAX;
+    }
+    return pid;
+}
+
+void pid_q15_free(struct pid_q15_data** pid) {
+    free((*pid)->history);
+    free((*pid)->interval);
+    free(*pid);
+    *pid = NULL;
+}
+
+q15_t pid_q15_control(pid_q15_data* pid, q15_t const process_value,
+                      q15_t const delta_time) {
+    // see pid_control in pid.c for the algorithm. Products of two Q15
+    // values are Q30 in 32 bits and shifted back to Q15.
+    assert(delta_time > 0);
+
+    q15_t error = saturate_q15((int32_t)pid->setpoint - process_value);
+
+    uint8_t tm1 = pid->current;
+
+    // the oldest term is recomputed exactly as it was added, so the
+    // running sum does not drift.
+    q15_t hist_error = saturate_q15((int32_t)pid->setpoint - pid->history[tm1]);
+    pid->integral -= ((int32_t)hist_error * pid->interval[tm1]) >> 15;
+    pid->integral += ((int32_t)error * delta_time) >> 15;
+    q15_t integral = saturate_q15(pid->integral);
+
+    q15_t delta = saturate_q15((int32_t)process_value - pid->history[tm1]);
+    int32_t Kd_delta = ((int32_t)pid->Kd * delta) >> 15;
+    q15_t derivative = saturate_q15((Kd_delta * (1 << 15)) / delta_time);
+
+    int32_t output = (((int32_t)pid->Kp * error) >> 15) +
+        (((int32_t)pid->Ki * integral) >> 15) + derivative;
+    output *= (int32_t)1 << pid->gain_shift;
+
+    pid->history[tm1] = process_value;
+    pid->interval[tm1] = delta_time;
+    tm1++;
+    tm1 %= pid->history_length;
+    pid->current = tm1;
+
+    return saturate_q15(output);
+}
+
+// -----------------------------------------------------------------------------
+//
+// Q31
+//
+// -----------------------------------------------------------------------------
+struct pid_q31_data* pid_q31_init(uint8_t const history_length, q31_t const setpoint,
+                                  q31_t const Kp, q31_t const Ki, q31_t const Kd,
+                                  uint8_t const gain_shift) {
+    // by definition gains must be non-negative
+    assert(Kp >= 0);
+    assert(Ki >= 0);
+    assert(Kd >= 0);
+    assert(gain_shift <= PID_Q31_MAX_GAIN_SHIFT);
+
+    struct pid_q31_data* pid;
+    pid = malloc(sizeof(struct pid_q31_data));
+    pid->setpoint = setpoint;
+    pid->Kp = Kp;
+    pid->Ki = Ki;
+    pid->Kd = Kd;
+    pid->integral = 0;
+    pid->current = 0;
+    pid->history_length = history_length;
+    pid->gain_shift = gain_shift;
+    pid->interval = malloc(pid->history_length * sizeof(q31_t));
+    pid->history = malloc(pid->history_length * sizeof(q31_t));
+
+    for (uint8_t i = 0; i < pid->history_length; i++) {
+        pid->history[i] = pid->setpoint;
+        pid->interval[i] = INT32_MAX;
+    }
+    return pid;
+}
+
+void pid_q31_free(struct pid_q31_data** pid) {
+    free((*pid)->history);
+    free((*pid)->interval);
+    free(*pid);
+    *pid = NULL;
+}
+
+q31_t pid_q31_control(pid_q31_data* pid, q31_t const process_value,
+                      q31_t const delta_time) {
+    // see pid_control in pid.c for the algorithm. Products of two Q31
+    // values are Q62 in 64 bits and shifted back to Q31.
+    assert(delta_time > 0);
+
+    q31_t error = saturate_q31((int64_t)pid->setpoint - process_value);
+
+    uint8_t tm1 = pid->current;
+
+    q31_t hist_error = saturate_q31((int64_t)pid->setpoint - pid->history[tm1]);
+    pid->integral -= ((int64_t)hist_error * pid->interval[tm1]) >> 31;
+    pid->integral += ((int64_t)error * delta_time) >> 31;
+    q31_t integral = saturate_q31(pid->integral);
+
+    q31_t delta = saturate_q31((int64_t)process_value - pid->history[tm1]);
+    int64_t Kd_delta = ((int64_t)pid->Kd * delta) >> 31;
+    q31_t derivative = saturate_q31((Kd_delta * ((int64_t)1 << 31)) / delta_time);
+
+    int64_t output = (((int64_t)pid->Kp * error) >> 31) +
+        (((int64_t)pid->Ki * integral) >> 31) + derivative;
+    output *= (int64_t)1 << pid->gain_shift;
+
+    pid->history[tm1] = process_value;
+    pid->interval[tm1] = delta_time;
+    tm1++;
+    tm1 %= pid->history_length;
+    pid->current = tm1;
+
+    return saturate_q31(output);
+}
+
+// -----------------------------------------------------------------------------
+//
+// conversions
+//
+// -----------------------------------------------------------------------------
+q15_t float_to_q15(float const value) {
+    double scaled = (double)value * 32768.0;
+    scaled += (scaled < 0.0) ? -0.5 : 0.5;
+    if (scaled >= INT16_MAX) {
+        return INT16_MAX;
+    } else if (scaled <= INT16_MIN) {
+        return INT16_MIN;
+    }
+    return (q15_t)scaled;
+}
+
+float q15_to_float(q15_t const value) {
+    return (float)value / 32768.0f;
+}
+
+q31_t float_to_q31(float const value) {
+    double scaled = (double)value * 2147483648.0;
+    scaled += (scaled < 0.0) ? -0.5 : 0.5;
+    if (scaled >= INT32_MAX) {
+        return INT32_MAX;
+    } else if (scaled <= INT32_MIN) {
+        return INT32_MIN;
+    }
+    return (q31_t)scaled;
+}
+
+float q31_to_float(q31_t const value) {
+    return (float)((double)value / 2147483648.0);
+}
@@ -0,0 +1,60 @@
+// -*- mode: c; c-default-style: "k&r"; c-basic-offset: 4; indent-tabs-mode: nil; tab-width: 4 -*-
+//
+// Copyright (c) 2016 Benjamin J. Andre
+//
+// This Source Code Form is subject to the terms of the Mozilla Public
+// License, v.  2.0. If a copy of the MPL was not distributed with this
+// file, You can obtain one at http://mozilla.org/MPL/2.0/.
+//
+
+// Fixed point, Q15 and Q31, implementations of the PID controller in
+// pid.h for targets without an FPU. Same algorithm, windowed integral
+// and derivative on the process value, using only integer arithmetic.
+//
+// Values are fractions of a full scale in [-1, 1). With process
+// values scaled by S, delta time scaled by T and the output scaled by
+// S, the fixed point gains are:
+//
+//   Kp_q = Kp, Ki_q = Ki * T, Kd_q = Kd / T
+//
+// Gains are stored as a Q fraction and a common left shift, so the
+// effective gain is K_q * 2^gain_shift. Intermediate terms are
+// saturated to the Q range instead of wrapping: the error, the
+// windowed integral, the derivative term and the output.
+
+#ifndef PID_FIXED_H_
+#define PID_FIXED_H_
+#include <stdint.h>
+
+typedef int16_t q15_t;
+typedef int32_t q31_t;
+
+#define PID_Q15_MAX_GAIN_SHIFT 14
+#define PID_Q31_MAX_GAIN_SHIFT 29
+
+// declare opaque types for the public interface
+typedef struct pid_q15_data pid_q15_data;
+typedef struct pid_q31_data pid_q31_data;
+
+pid_q15_data* pid_q15_init(uint8_t const history_length, q15_t const setpoint,
+                           q15_t const Kp, q15_t const Ki, q15_t const Kd,
+                           uint8_t const gain_shift);
+void pid_q15_free(pid_q15_data** pid);
+q15_t pid_q15_control(pid_q15_data* pid, q15_t const process_value,
+                      q15_t const delta_time);
+
+pid_q31_data* pid_q31_init(uint8_t const history_length, q31_t const setpoint,
+                           q31_t const Kp, q31_t const Ki, q31_t const Kd,
+                           uint8_t const gain_shift);
+void pid_q31_free(pid_q31_data** pid);
+q31_t pid_q31_control(pid_q31_data* pid, q31_t const process_value,
+                      q31_t const delta_time);
+
+// conversion between float and fixed point, saturating. Only needed
+// on the host, e.g. for validation and setting up gains.
+q15_t float_to_q15(float const value);
+float q15_to_float(q15_t const value);
+q31_t float_to_q31(float const value);
+float q31_to_float(q31_t const value);
+
+#endif // PID_FIXED_H_
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""Registry of batched process models.
+
+A process model advances an array of independent processes one time
+step with array operations, so the same model runs a single process,
+an ensemble or a sweep at array speed. The state of n processes is an
+array with shape (n, num_states), float64 or float32, the control and
+forcing are arrays with shape (n, ) or scalars. step preserves the
+dtype of the state. Models are selected by name from
+[process] type, see MODELS, and read their parameters from the
+[process] section.
+
+Each model also provides its steady state control, the steady state
+dCV/dPV used as the default Kp, and a first order linearization for
+screening gains.
+
+The controller output is applied as control = bias + action * output,
+with action = -1 for reverse acting processes, e.g. the tank where
+opening the outlet lowers the level, and +1 for direct acting ones.
+
+Copyright (c) 2016 Benjamin J. Andre
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v.  2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+#
+# built-in modules
+#
+import abc
+import math
+import sys
+import traceback
+
+#
+# installed dependencies
+#
+import numpy as np
+
+#
+# other modules in this package
+#
+
+if sys.hexversion < 0x03050000:
+    print(70 * "*")
+    print("ERROR: {0} requires python >= 3.5.x. ".format(sys.argv[0]))
+    print("It appears that you are running python {0}".format(
+        ".".join(str(x) for x in sys.version_info[0:3])))
+    print(70 * "*")
+    sys.exit(1)
+
+
+class ProcessModel(object):
+    """Interface of a batched process model.
+    """
+
+    # number of state variables per process
+    num_states = 1
+
+    # sign applied to the controller output, see module documentation
+    action = -1.0
+
+    # units of the process, control and forcing variables
+    units = {}
+
+    def __init__(self, config):
+        """
+        Positional arguments:
+
+        config -- demo configuration, model parameters are read from
+        the process section. [ConfigParser]
+        """
+        self._delta_time = config.getfloat("time", "delta")
+
+    def initial_state(self, process_value, num_processes, control, forcing,
+                      dtype=np.float64):
+        """State of num_processes processes with the given process
+        value, holding control and forcing from before the start.
+        """
+        state = np.zeros((num_processes, self.num_states), dtype=dtype)
+        state[:, 0] = process_value
+        return state
+
+    def output(self, state):
+        """Process value of each process.
+        """
+        return state[:, 0]
+
+    def saturated(self, process_value, control):
+        """Whether each process or its control is at a limit, see
+        termination.
+        """
+        return np.zeros(np.shape(process_value), dtype=bool)
+
+    @abc.abstractmethod
+    def step(self, state, control, forcing, delta_time):
+        """Return the state after one time step.
+        """
+        return None
+
+    @abc.abstractmethod
+    def steady_state_control(self, forcing, set_point):
+        """Control holding the process at set_point under a constant
+        forcing.
+        """
+        return None
+
+    @abc.abstractmethod
+    def dcv_dpv(self, forcing, set_point):
+        """Steady state dCV/dPV at set_point, approximation for Kp.
+        """
+        return None
+
+    @abc.abstractmethod
+    def linearize(self, forcing, set_point, control):
+        """First order linearization around the steady state,
+        d(dPV)/dt = a * dPV + b * dCV. Returns (a, b).
+        """
+        return None
+
+
+class TankModel(ProcessModel):
+    """Gravity drained tank, see demo_tank:
+
+    dh/dt = Q_in / A_r - c1 * A_out * sqrt(h), c1 = sqrt(2*g) / A_r
+
+    process variable - height of fluid [m]
+    control variable - area of the outlet [m^2]
+    forcing - inflow [m^3/s]
+    """
+
+    action = -1.0
+    units = {'process': 'm', 'control': 'm^2', 'forcing': 'm^3/s',
+             'time': 's', }
+
+    def __init__(self, config):
+        super().__init__(config)
+        self._g = 9.81  # [m^2/s]
+        self._A_r = config.getfloat("process", "tank_area", fallback=5.0)
+        self._c1 = math.sqrt(2.0 * self._g) / self._A_r
+
+    def step(self, state, control, forcing, delta_time):
+        h = state[:, 0]
+        h_tp1 = (h + forcing * delta_time / self._A_r -
+                 self._c1 * delta_time * control * np.sqrt(h))
+        np.maximum(h_tp1, 0.0, out=h_tp1)
+        return h_tp1[:, np.newaxis]
+
+    def saturated(self, process_value, control):
+        # empty tank or negative outlet area
+        return (process_value <= 0.0) | (np.asarray(control) < 0.0)
+
+    def steady_state_control(self, forcing, set_point):
+        return forcing / math.sqrt(2.0 * self._g * set_point)
+
+    def dcv_dpv(self, forcing, set_point):
+        return (-forcing / 2.0) * math.sqrt(1.0 / (2 * self._g * set_point**3))
+
+    def linearize(self, forcing, set_point, control):
+        a = -self._c1 * control / (2.0 * math.sqrt(set_point))
+        b = -self._c1 * math.sqrt(set_point)
+        return a, b
+
+
+class FOPDTModel(ProcessModel):
+    """First order plus dead time:
+
+    tau * dy/dt = K * u(t - theta) + d(t) - y
+
+    The dead time is rounded to whole time steps and the delayed
+    controls are kept in the state.
+
+    process variable - y
+    control variable - u
+    forcing - load disturbance d
+    """
+
+    units = {'process': '-', 'control': '-', 'forcing': '-', 'time': 's', }
+
+    def __init__(self, config):
+        super().__init__(config)
+        self._gain = config.getfloat("process", "gain", fallback=1.0)
+        self._time_constant = config.getfloat("process", "time_constant",
+                                              fallback=10.0)
+        dead_time = config.getfloat("process", "dead_time", fallback=0.0)
+        self._delay = int(round(dead_time / self._delta_time))
+        self.num_states = 1 + self._delay
+        self.action = math.copysign(1.0, self._gain)
+
+    def initial_state(self, process_value, num_processes, control, forcing,
+                      dtype=np.float64):
+        state = super().initial_state(process_value, num_processes, control,
+                                      forcing, dtype)
+        state[:, 1:] = control
+        return state
+
+    def step(self, state, control, forcing, delta_time):
+        state_tp1 = np.empty_like(state)
+        if self._delay > 0:
+            delayed = state[:, self._delay]
+            state_tp1[:, 2:] = state[:, 1:-1]
+            state_tp1[:, 1] = control
+        else:
+            delayed = control
+        y = state[:, 0]
+        state_tp1[:, 0] = y + (self._gain * delayed + forcing - y) * \
+            delta_time / self._time_constant
+        return state_tp1
+
+    def steady_state_control(self, forcing, set_point):
+        return (set_point - forcing) / self._gain
+
+    def dcv_dpv(self, forcing, set_point):
+        return 1.0 / self._gain
+
+    def linearize(self, forcing, set_point, control):
+        # NOTE: the dead time is ignored by the first order screening
+        a = -1.0 / self._time_constant
+        b = self._gain / self._time_constant
+        return a, b
+
+
+class SecondOrderModel(ProcessModel):
+    """Second order process:
+
+    d2y/dt2 + 2 * zeta * omega * dy/dt + omega^2 * y = omega^2 * (K * u + d)
+
+    advanced with semi-implicit Euler.
+
+    process variable - y
+    control variable - u
+    forcing - load disturbance d
+    """
+
+    num_states = 2
+    units = {'process': '-', 'control': '-', 'forcing': '-', 'time': 's', }
+
+    def __init__(self, config):
+        super().__init__(config)
+        self._gain = config.getfloat("process", "gain", fallback=1.0)
+        self._omega = config.getfloat("process", "natural_frequency",
+                                      fallback=1.0)
+        self._zeta = config.getfloat("process", "damping_ratio",
+                                     fallback=0.5)
+        self.action = math.copysign(1.0, self._gain)
+
+    def step(self, state, control, forcing, delta_time):
+        y = state[:, 0]
+        v = state[:, 1]
+        acceleration = (self._omega**2 * (self._gain * control + forcing - y) -
+                        2.0 * self._zeta * self._omega * v)
+        state_tp1 = np.empty_like(state)
+        state_tp1[:, 1] = v + acceleration * delta_time
+        state_tp1[:, 0] = y + state_tp1[:, 1] * delta_time
+        return state_tp1
+
+    def steady_state_control(self, forcing, set_point):
+        return (set_point - forcing) / self._gain
+
+    def dcv_dpv(self, forcing, set_point):
+        return 1.0 / self._gain
+
+    def linearize(self, forcing, set_point, control):
+        raise RuntimeError("The second order model can not be screened with "
+                           "a first order linearization")
+
+
+class HeaterModel(ProcessModel):
+    """Electrically heated room with losses to the ambient:
+
+    C * dT/dt = P_max * clip(u, 0, 1) - UA * (T - T_ambient)
+
+    process variable - temperature [C]
+    control variable - heater power as a fraction of P_max, saturated
+    forcing - ambient temperature [C]
+    """
+
+    action = 1.0
+    units = {'process': 'C', 'control': '-', 'forcing': 'C', 'time': 's', }
+
+    def __init__(self, config):
+        super().__init__(config)
+        self._heat_capacity = config.getfloat("process", "heat_capacity",
+                                              fallback=1.0e5)
+        self._conductance = config.getfloat("process", "conductance",
+                                            fallback=50.0)
+        self._max_power = config.getfloat("process", "max_power",
+                                          fallback=2000.0)
+
+    def step(self, state, control, forcing, delta_time):
+        T = state[:, 0]
+        power = self._max_power * np.clip(control, 0.0, 1.0)
+        T_tp1 = T + (power - self._conductance * (T - forcing)) * \
+            delta_time / self._heat_capacity
+        return T_tp1[:, np.newaxis]
+
+    def saturated(self, process_value, control):
+        # heater off or at full power
+        control = np.asarray(control)
+        return (control <= 0.0) | (control >= 1.0)
+
+    def steady_state_control(self, forcing, set_point):
+        return self._conductance * (set_point - forcing) / self._max_power
+
+    def dcv_dpv(self, forcing, set_point):
+        return self._conductance / self._max_power
+
+    def linearize(self, forcing, set_point, control):
+        a = -self._conductance / self._heat_capacity
+        b = self._max_power / self._heat_capacity
+        return a, b
+
+
+MODELS = {
+    'tank': TankModel,
+    'fopdt': FOPDTModel,
+    'second_order': SecondOrderModel,
+    'heater': HeaterModel,
+}
+
+
+def create_model(config):
+    """Return the model selected by [process] type.
+    """
+    process_type = config["process"]["type"]
+    if process_type not in MODELS:
+        raise RuntimeError(
+            "Unknown process model '{0}', expected one of: {1}".format(
+                process_type, ", ".join(sorted(MODELS))))
+    return MODELS[process_type](config)
+
+
+if __name__ == "__main__":
+    try:
+        print("Module has no main functionality. Please run pid-driver.py")
+        sys.exit(0)
+    except Exception as error:
+        print(str(error))
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""Phase timing and call counting for pid demo runs.
+
+Copyright (c) 2016 Benjamin J. Andre
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v.  2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+#
+# built-in modules
+#
+import collections
+import contextlib
+import cProfile
+import json
+import sys
+import time
+import traceback
+
+#
+# installed dependencies
+#
+
+#
+# other modules in this package
+#
+
+if sys.hexversion < 0x03050000:
+    print(70 * "*")
+    print("ERROR: {0} requires python >= 3.5.x. ".format(sys.argv[0]))
+    print("It appears that you are running python {0}".format(
+        ".".join(str(x) for x in sys.version_info[0:3])))
+    print(70 * "*")
+    sys.exit(1)
+
+
+@contextlib.contextmanager
+def null_phase(name=None):
+    """Context manager that does nothing, used when profiling is off.
+    """
+    yield
+
+
+class RunProfile(object):
+    """Record wall and cpu time per phase of a run, counts of calls to
+    selected methods and, optionally, cProfile statistics.
+
+    """
+
+    def __init__(self, cprofile_filename=None):
+        """Create an empty profile.
+
+        Keyword arguments:
+
+        cprofile_filename -- if not None, collect cProfile statistics
+        while the profile is active and dump them to this file. [str]
+
+        """
+        self._phases = collections.OrderedDict()
+        self._stack = []
+        self._calls = collections.OrderedDict()
+        self._native = collections.OrderedDict()
+        self._cprofile_filename = cprofile_filename
+        self._cprofile = None
+        if self._cprofile_filename:
+            self._cprofile = cProfile.Profile()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Time the enclosed block as phase 'name'.
+
+        Nested phases are recorded as 'outer/inner'. Repeated phases
+        with the same name are accumulated.
+        """
+        self._stack.append(name)
+        key = "/".join(self._stack)
+        if key not in self._phases:
+            self._phases[key] = {'wall': 0.0, 'cpu': 0.0, 'count': 0}
+        if self._cprofile and len(self._stack) == 1:
+            self._cprofile.enable()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            if self._cprofile and len(self._stack) == 1:
+                self._cprofile.disable()
+            self._stack.pop()
+            self._phases[key]['wall'] += wall
+            self._phases[key]['cpu'] += cpu
+            self._phases[key]['count'] += 1
+
+    def count_calls(self, obj, method_name, label=None):
+        """Replace obj.method_name with a wrapper that counts the calls
+        and the wall time spent in them.
+
+        Only the instance is modified, so other instances of the class
+        are not affected and there is no cost when profiling is off.
+        """
+        if label is None:
+            label = "{0}.{1}".format(type(obj).__name__, method_name)
+        record = {'calls': 0, 'wall': 0.0}
+        self._calls[label] = record
+        method = getattr(obj, method_name)
+
+        def counted(*args, **kwargs):
+            start = time.perf_counter()
+            result = method(*args, **kwargs)
+            record['wall'] += time.perf_counter() - start
+            record['calls'] += 1
+            return result
+
+        setattr(obj, method_name, counted)
+
+    def record_native_counters(self, label, counters):
+        """Save the native library counters, e.g. from PID.counters().
+        """
+        self._native[label] = dict(counters)
+
+    def as_dict(self):
+        """Return the profile as a json serializable dictionary.
+        """
+        calls = collections.OrderedDict()
+        for label, record in self._calls.items():
+            per_call = None
+            if record['calls'] > 0:
+                per_call = record['wall'] / record['calls']
+            calls[label] = {'calls': record['calls'],
+                            'wall': record['wall'],
+                            'wall_per_call': per_call, }
+        profile = collections.OrderedDict()
+        profile['phases'] = self._phases
+        profile['calls'] = calls
+        profile['native'] = self._native
+        top_level = [p for k, p in self._phases.items() if '/' not in k]
+        profile['total'] = {
+            'wall': sum(p['wall'] for p in top_level),
+            'cpu': sum(p['cpu'] for p in top_level), }
+        if self._cprofile_filename:
+            profile['cprofile'] = self._cprofile_filename
+        return profile
+
+    def write(self, filename):
+        """Write the profile as json to filename, '-' for stdout, and
+        dump the cProfile statistics if requested.
+        """
+        if self._cprofile:
+            self._cprofile.dump_stats(self._cprofile_filename)
+
+        text = json.dumps(self.as_dict(), indent=2)
+        if filename == '-':
+            print(text)
+        else:
+            with open(filename, 'w') as profile_file:
+                profile_file.write(text)
+                profile_file.write('\n')
+
+
+if __name__ == "__main__":
+    try:
+        print("Module has no main functionality. Please run pid-driver.py")
+        sys.exit(0)
+    except Exception as error:
+        print(str(error))
+        traceback.print_exc()
+        sys.exit(1)
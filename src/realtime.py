@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""Wall clock paced execution of the closed loop.
+
+PacedController wraps a PID or PIDBank so that each control call is
+released on a fixed grid of absolute monotonic deadlines,
+
+  release(k) = start + k * period,  deadline(k) = release(k) + period,
+
+instead of sleeping a period after the previous call, so errors do
+not accumulate. Each call records its release lateness (jitter),
+compute time and slack before the deadline. The work between calls,
+e.g. simulating the process, counts against the slack of the
+following call, as it would on a loaded target.
+
+Copyright (c) 2016 Benjamin J. Andre
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v.  2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+#
+# built-in modules
+#
+import os
+import sys
+import threading
+import time
+import traceback
+
+#
+# installed dependencies
+#
+import numpy as np
+
+#
+# other modules in this package
+#
+
+if sys.hexversion < 0x03050000:
+    print(70 * "*")
+    print("ERROR: {0} requires python >= 3.5.x. ".format(sys.argv[0]))
+    print("It appears that you are running python {0}".format(
+        ".".join(str(x) for x in sys.version_info[0:3])))
+    print(70 * "*")
+    sys.exit(1)
+
+# sleep until this long before a release, then spin, so the release
+# time does not depend on the scheduler wake up latency. [s]
+SPIN_TIME = 0.0005
+
+# histogram bin edges, 1 us to ~1 s in powers of two. [us]
+HISTOGRAM_EDGES = np.concatenate([[0.0], 2.0**np.arange(0, 21)])
+
+
+class PacedController(object):
+    """Proxy for a controller releasing control calls on a wall clock
+    grid. Other attributes are forwarded to the wrapped controller.
+    """
+
+    def __init__(self, controller, period):
+        """
+        Positional arguments:
+
+        controller -- object with a control method, e.g. PID. [PID]
+
+        period -- wall clock time between control calls. [s]
+        """
+        self._controller = controller
+        self._period = period
+        self._start = None
+        self._tick = 0
+        self._lateness = []
+        self._compute = []
+        self._slack = []
+
+    def __getattr__(self, name):
+        return getattr(self._controller, name)
+
+    def _wait(self, release):
+        remaining = release - time.perf_counter()
+        if remaining > SPIN_TIME:
+            time.sleep(remaining - SPIN_TIME)
+        while time.perf_counter() < release:
+            pass
+
+    def control(self, *args):
+        """Wait for the next release time, then call the wrapped
+        controller's control with args.
+        """
+        if self._start is None:
+            self._start = time.perf_counter()
+        release = self._start + self._tick * self._period
+        self._wait(release)
+
+        start = time.perf_counter()
+        output = self._controller.control(*args)
+        end = time.perf_counter()
+
+        self._lateness.append(start - release)
+        self._compute.append(end - start)
+        self._slack.append(release + self._period - end)
+        self._tick += 1
+        return output
+
+    def statistics(self):
+        """Per tick timing as a dict of arrays in seconds: lateness
+        (release jitter), compute and slack, and the boolean array
+        miss, true when the call ended after its deadline.
+        """
+        slack = np.array(self._slack)
+        statistics = {
+            'lateness': np.array(self._lateness),
+            'compute': np.array(self._compute),
+            'slack': slack,
+            'miss': slack < 0.0,
+        }
+        return statistics
+
+
+def run_on_thread(function, cpu=None):
+    """Run function on a dedicated thread and wait for it, re-raising
+    any exception in the caller.
+
+    Keyword arguments:
+
+    cpu -- if not None, pin the thread to this cpu, linux only. [int]
+    """
+    errors = []
+
+    def target():
+        try:
+            if cpu is not None:
+                if not hasattr(os, 'sched_setaffinity'):
+                    raise RuntimeError(
+                        "Pinning to a cpu is not supported on this platform")
+                # affinity of the calling thread
+                os.sched_setaffinity(0, [cpu])
+            function()
+        except BaseException as error:
+            errors.append(error)
+
+    thread = threading.Thread(target=target, name='realtime')
+    thread.start()
+    thread.join()
+    if errors:
+        raise errors[0]
+
+
+def histogram(values):
+    """Counts of |values| in HISTOGRAM_EDGES bins.
+
+    Positional arguments:
+    values -- times. [s]
+    """
+    counts, _ = np.histogram(1.0e6 * np.abs(values), bins=HISTOGRAM_EDGES)
+    # values beyond the last edge are counted in the last bin
+    counts[-1] += np.sum(1.0e6 * np.abs(values) > HISTOGRAM_EDGES[-1])
+    return counts
+
+
+def report(statistics, period):
+    """Print a summary of the paced run with jitter and compute time
+    histograms.
+    """
+    ticks = len(statistics['slack'])
+    print("Realtime summary:")
+    print("  period = {0:1.6e} [s], ticks = {1}".format(period, ticks))
+    if ticks == 0:
+        return
+    print("  deadline misses = {0} ({1:.3f} %)".format(
+        int(np.sum(statistics['miss'])),
+        100.0 * np.mean(statistics['miss'])))
+    print("  utilization = {0:.3f} %".format(
+        100.0 * np.mean(statistics['compute']) / period))
+    print("  {0:>10} {1:>12} {2:>12} {3:>12} {4:>12} [us]".format(
+        '', 'min', 'p50', 'p99', 'max'))
+    for name in ['lateness', 'compute', 'slack', ]:
+        values = 1.0e6 * statistics[name]
+        print("  {0:>10} {1:12.3f} {2:12.3f} {3:12.3f} {4:12.3f}".format(
+            name, np.min(values), np.percentile(values, 50),
+            np.percentile(values, 99), np.max(values)))
+
+    for name in ['lateness', 'compute', ]:
+        counts = histogram(statistics[name])
+        print("  {0} histogram [us]:".format(name))
+        for lower, upper, count in zip(HISTOGRAM_EDGES[:-1],
+                                       HISTOGRAM_EDGES[1:], counts):
+            if count > 0:
+                print("    [{0:>9.0f}, {1:>9.0f}) {2:>9d} {3}".format(
+                    lower, upper, count,
+                    '#' * int(50 * count / ticks + 0.5)))
+
+
+def write_histograms(filename, statistics):
+    """Write the lateness and compute time histograms as csv.
+    """
+    with open(filename, 'w') as histogram_file:
+        histogram_file.write("quantity,lower_us,upper_us,count\n")
+        for name in ['lateness', 'compute', ]:
+            counts = histogram(statistics[name])
+            for lower, upper, count in zip(HISTOGRAM_EDGES[:-1],
+                                           HISTOGRAM_EDGES[1:], counts):
+                histogram_file.write("{0},{1:.0f},{2:.0f},{3}\n".format(
+                    name, lower, upper, count))
+
+
+if __name__ == "__main__":
+    try:
+        print("Module has no main functionality. Please run pid-driver.py")
+        sys.exit(0)
+    except Exception as error:
+        print(str(error))
+        traceback.print_exc()
+        sys.exit(1)
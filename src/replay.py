@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""Replay recorded process values through a controller.
+
+A log is a sequence of (timestamp, process_value) samples, either a
+.npy file with shape (n, 2) or fields 'timestamp' and
+'process_value', or a .csv file with the timestamp and process value
+in the first two columns, or in columns of those names if there is a
+header line. The delta time of each sample is the difference to the
+previous timestamp, the first sample uses the first interval.
+
+The log is processed in chunks, each chunk in a single native
+pid_control_series call, and the controller outputs are streamed to
+the output file, so memory use does not depend on the size of the
+log. A .npy output holds the outputs, one per sample, in the
+precision of the library, float32 unless it is the double precision
+build, a .csv output the timestamp and output of each sample. The
+outputs are the raw controller outputs, before any control bias.
+
+Copyright (c) 2016 Benjamin J. Andre
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v.  2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+#
+# built-in modules
+#
+import contextlib
+import io
+import os
+import sys
+import time
+import traceback
+
+#
+# installed dependencies
+#
+import numpy as np
+
+#
+# other modules in this package
+#
+from pid import PID, REAL_DTYPE
+
+if sys.hexversion < 0x03050000:
+    print(70 * "*")
+    print("ERROR: {0} requires python >= 3.5.x. ".format(sys.argv[0]))
+    print("It appears that you are running python {0}".format(
+        ".".join(str(x) for x in sys.version_info[0:3])))
+    print(70 * "*")
+    sys.exit(1)
+
+# samples per chunk
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# bytes of a csv log read per chunk
+_CSV_BLOCK_BYTES = 16 << 20
+
+LOG_COLUMNS = ('timestamp', 'process_value', )
+
+
+def controller_from_config(config):
+    """Create the controller described by the control section, with
+    the set point of the process section. Kp = calculate uses the Kp
+    the demo for the process would calculate.
+    """
+    Kp = config["control"]["Kp"]
+    if Kp == "calculate":
+        # NOTE: imported here, demo_model imports the whole package
+        from demo_model import create_demo
+        with contextlib.redirect_stdout(io.StringIO()):
+            demo = create_demo(config)
+        Kp = demo.parameters()['Kp']
+    integral_mode = config.get("control", "integral_mode", fallback="window")
+    leak = config.getfloat("control", "leak", fallback=None)
+    # a fixed rate controller assumes the simulation time step, as in
+    # the demos
+    delta_time = config.getfloat("time", "delta", fallback=None)
+    controller = PID(int(config["control"]["history_length"]),
+                     config.getfloat("process", "set_point"), float(Kp),
+                     config.getfloat("control", "Ki"),
+                     config.getfloat("control", "Kd"), integral_mode, leak,
+                     delta_time)
+    return controller
+
+
+def _log_format(filename):
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in ['.npy', '.csv', ]:
+        raise RuntimeError("Unknown log format '{0}', expected .npy or "
+                           ".csv.".format(filename))
+    return extension
+
+
+def _npy_header(log):
+    """Read the header of an open .npy file, return shape, fortran
+    order and dtype.
+    """
+    version = np.lib.format.read_magic(log)
+    if version == (1, 0):
+        return np.lib.format.read_array_header_1_0(log)
+    return np.lib.format.read_array_header_2_0(log)
+
+
+def _npy_columns(log, filename):
+    """Return the timestamp and process value columns of a .npy log
+    array or chunk.
+    """
+    if log.dtype.names:
+        for name in LOG_COLUMNS:
+            if name not in log.dtype.names:
+                raise RuntimeError("Log '{0}' has no field '{1}'.".format(
+                    filename, name))
+        return log['timestamp'], log['process_value']
+    if log.ndim != 2 or log.shape[1] < 2:
+        raise RuntimeError("Log '{0}' must have shape (n, 2), received "
+                           "{1}.".format(filename, log.shape))
+    return log[:, 0], log[:, 1]
+
+
+def _npy_chunks(filename, chunk_size):
+    """Yield the columns of consecutive chunks of a .npy log. C ordered
+    logs are read with plain file reads, so the resident memory is
+    bounded by the chunk size, Fortran ordered logs are memory mapped.
+    """
+    with open(filename, 'rb') as log:
+        shape, fortran_order, dtype = _npy_header(log)
+        if fortran_order:
+            columns = _npy_columns(np.load(filename, mmap_mode='r'),
+                                   filename)
+            for start in range(0, shape[0], chunk_size):
+                yield tuple(np.asarray(column[start:start + chunk_size])
+                            for column in columns)
+            return
+        _npy_columns(np.empty((0, ) + shape[1:], dtype=dtype), filename)
+        row = int(np.prod(shape[1:]))
+        remaining = shape[0]
+        while remaining > 0:
+            count = min(chunk_size, remaining)
+            chunk = np.fromfile(log, dtype=dtype, count=count * row)
+            if len(chunk) != count * row:
+                raise RuntimeError("Log '{0}' is truncated.".format(
+                    filename))
+            remaining -= count
+            yield _npy_columns(chunk.reshape((count, ) + shape[1:]),
+                               filename)
+
+
+def _csv_header(line):
+    """Return the column indices of the timestamp and process value and
+    whether line is a header.
+    """
+    fields = [field.strip().lower() for field in line.split(',')]
+    try:
+        [float(field) for field in fields]
+        return (0, 1), False
+    except ValueError:
+        pass
+    if all(name in fields for name in LOG_COLUMNS):
+        return tuple(fields.index(name) for name in LOG_COLUMNS), True
+    return (0, 1), True
+
+
+def _csv_blocks(filename):
+    """Yield blocks of complete lines of a csv log, as text.
+    """
+    with open(filename, 'rb') as log:
+        remainder = b''
+        while True:
+            block = log.read(_CSV_BLOCK_BYTES)
+            if not block:
+                break
+            block = remainder + block
+            end = block.rfind(b'\n') + 1
+            remainder = block[end:]
+            if end:
+                yield block[:end].decode('ascii')
+        if remainder.strip():
+            yield remainder.decode('ascii')
+
+
+def _csv_chunks(filename):
+    columns = None
+    num_columns = None
+    for text in _csv_blocks(filename):
+        if columns is None:
+            first, _, rest = text.partition('\n')
+            columns, header = _csv_header(first)
+            num_columns = first.count(',') + 1
+            if header:
+                text = rest
+        text = text.replace('\r', '').replace('\n', ',').strip(', ')
+        if not text:
+            continue
+        values = np.fromstring(text, sep=',')
+        if len(values) % num_columns:
+            raise RuntimeError("Log '{0}' has lines with other than {1} "
+                               "columns.".format(filename, num_columns))
+        values = values.reshape(-1, num_columns)
+        yield values[:, columns[0]], values[:, columns[1]]
+
+
+def log_length(filename):
+    """Number of samples in a log, a csv log is scanned for line ends.
+    """
+    if _log_format(filename) == '.npy':
+        with open(filename, 'rb') as log:
+            return _npy_header(log)[0][0]
+    num_lines = 0
+    header = None
+    last = b'\n'
+    with open(filename, 'rb') as log:
+        while True:
+            block = log.read(_CSV_BLOCK_BYTES)
+            if not block:
+                break
+            if header is None:
+                first = block.partition(b'\n')[0].decode('ascii')
+                header = _csv_header(first)[1]
+            num_lines += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        num_lines += 1
+    if header:
+        num_lines -= 1
+    return num_lines
+
+
+def read_log(filename, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield (timestamps, process_values) of consecutive chunks of a
+    log. Chunks of a csv log hold about _CSV_BLOCK_BYTES of text
+    instead of chunk_size samples.
+    """
+    if _log_format(filename) == '.npy':
+        chunks = _npy_chunks(filename, chunk_size)
+    else:
+        chunks = _csv_chunks(filename)
+    for chunk in chunks:
+        yield chunk
+
+
+# shortest format that round trips an output
+_OUTPUT_FORMAT = '%.17g' if REAL_DTYPE == np.float64 else '%.9g'
+
+
+class _NpyWriter(object):
+    """Stream REAL_DTYPE outputs to a .npy file of known length.
+    """
+
+    def __init__(self, filename, num_samples):
+        self._file = open(filename, 'wb')
+        header = {'descr': np.lib.format.dtype_to_descr(REAL_DTYPE),
+                  'fortran_order': False, 'shape': (num_samples, ), }
+        np.lib.format.write_array_header_1_0(self._file, header)
+
+    def write(self, timestamps, outputs):
+        outputs.tofile(self._file)
+
+    def close(self):
+        self._file.close()
+
+
+class _CsvWriter(object):
+    """Stream timestamps and outputs to a .csv file.
+    """
+
+    def __init__(self, filename):
+        self._file = open(filename, 'w')
+        self._file.write("timestamp,output\n")
+
+    def write(self, timestamps, outputs):
+        np.savetxt(self._file, np.column_stack((timestamps, outputs)),
+                   fmt=['%.17g', _OUTPUT_FORMAT], delimiter=',')
+
+    def close(self):
+        self._file.close()
+
+
+def replay(controller, log_filename, output_filename,
+           chunk_size=DEFAULT_CHUNK_SIZE):
+    """Feed a log through controller, streaming the outputs.
+
+    Positional arguments:
+    controller -- controller with a control_series method. [PID]
+    log_filename -- .npy or .csv log of (timestamp, process_value). [str]
+    output_filename -- .npy or .csv output file. [str]
+
+    Keyword arguments:
+    chunk_size -- samples per native call for .npy logs. [int]
+
+    Returns:
+    statistics -- dict with samples, seconds, native_seconds, and
+    the minimum and maximum output. [dict]
+    """
+    num_samples = log_length(log_filename)
+    if num_samples < 2:
+        raise RuntimeError("Log '{0}' must have at least two "
+                           "samples.".format(log_filename))
+    if _log_format(output_filename) == '.npy':
+        writer = _NpyWriter(output_filename, num_samples)
+    else:
+        writer = _CsvWriter(output_filename)
+
+    start = time.perf_counter()
+    native_seconds = 0.0
+    samples = 0
+    output_min = np.inf
+    output_max = -np.inf
+    previous = None
+    try:
+        for timestamps, process_values in read_log(log_filename,
+                                                   chunk_size):
+            if len(timestamps) == 0:
+                continue
+            delta_times = np.empty(len(timestamps))
+            np.subtract(timestamps[1:], timestamps[:-1],
+                        out=delta_times[1:])
+            if previous is None:
+                if len(timestamps) < 2:
+                    raise RuntimeError("Log '{0}' must have at least two "
+                                       "samples.".format(log_filename))
+                delta_times[0] = delta_times[1]
+            else:
+                delta_times[0] = timestamps[0] - previous
+            valid = delta_times > 0.0
+            if not np.all(valid):
+                if previous is None:
+                    # the first delta time is a copy of the second
+                    valid[0] = True
+                index = samples + int(np.argmin(valid))
+                raise RuntimeError("Timestamps must increase, sample {0} "
+                                   "is not after the previous "
+                                   "one.".format(index))
+            previous = timestamps[-1]
+
+            native_start = time.perf_counter()
+            outputs = controller.control_series(process_values, delta_times)
+            native_seconds += time.perf_counter() - native_start
+            writer.write(timestamps, outputs)
+            samples += len(outputs)
+            output_min = min(output_min, float(np.min(outputs)))
+            output_max = max(output_max, float(np.max(outputs)))
+        if samples != num_samples:
+            raise RuntimeError("Log '{0}' changed while replaying.".format(
+                log_filename))
+    finally:
+        writer.close()
+
+    statistics = {
+        'samples': samples,
+        'seconds': time.perf_counter() - start,
+        'native_seconds': native_seconds,
+        'output_min': output_min,
+        'output_max': output_max,
+    }
+    return statistics
+
+
+def report(statistics):
+    """Print a summary of a replay.
+    """
+    print("Replay summary:")
+    print("  samples = {0}".format(statistics['samples']))
+    print("  total time = {0:1.6e} [s], {1:1.6e} samples/s".format(
+        statistics['seconds'],
+        statistics['samples'] / statistics['seconds']))
+    if statistics['native_seconds'] > 0.0:
+        print("  controller time = {0:1.6e} [s], {1:1.6e} samples/s".format(
+            statistics['native_seconds'],
+            statistics['samples'] / statistics['native_seconds']))
+    print("  output range = [{0:1.6e}, {1:1.6e}]".format(
+        statistics['output_min'], statistics['output_max']))
+
+
+if __name__ == "__main__":
+    try:
+        print("Module has no main functionality. Please run pid-driver.py")
+        sys.exit(0)
+    except Exception as error:
+        print(str(error))
+        traceback.print_exc()
+        sys.exit(1)
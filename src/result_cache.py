@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""Content addressed on-disk cache of simulation results.
+
+Results are keyed by a hash of the normalized configuration, the
+forcing seed, the native library version, the simulation sources and
+the contents of a warm start snapshot, and stored as compressed .npz
+files. Hashing the sources invalidates results of older code even
+when the library version is not bumped. The total size of the cache
+is bounded with least recently used eviction.
+
+Copyright (c) 2016 Benjamin J. Andre
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v.  2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+#
+# built-in modules
+#
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import traceback
+
+#
+# installed dependencies
+#
+import numpy as np
+
+#
+# other modules in this package
+#
+
+if sys.hexversion < 0x03050000:
+    print(70 * "*")
+    print("ERROR: {0} requires python >= 3.5.x. ".format(sys.argv[0]))
+    print("It appears that you are running python {0}".format(
+        ".".join(str(x) for x in sys.version_info[0:3])))
+    print(70 * "*")
+    sys.exit(1)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'bjapid')
+DEFAULT_CACHE_SIZE = 512 * 1024 * 1024  # [bytes]
+
+_METRICS = '__metrics_json__'
+
+_SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# sources of the controller and the simulations, part of the key
+SIMULATION_SOURCES = (
+    'pid.h',
+    'pid.c',
+    'pid.py',
+    'demo_base.py',
+    'demo_tank.py',
+    'demo_tank_network.py',
+    'demo_model.py',
+    'process_models.py',
+    'termination.py',
+    'event_trigger.py',
+)
+
+_source_hash = None
+
+
+def source_hash():
+    """Return the sha256 of the simulation sources, computed once per
+    process. Missing sources, e.g. the C files of an installed library,
+    are hashed by name.
+    """
+    global _source_hash
+    if _source_hash is None:
+        digest = hashlib.sha256()
+        for name in SIMULATION_SOURCES:
+            digest.update(name.encode('utf-8'))
+            filename = os.path.join(_SOURCE_DIR, name)
+            if os.path.isfile(filename):
+                with open(filename, 'rb') as source:
+                    digest.update(source.read())
+        _source_hash = digest.hexdigest()
+    return _source_hash
+
+
+def snapshot_hash(config):
+    """Return the sha256 of the warm start snapshot of config, the
+    burned in state the simulations start from, or None without one.
+    """
+    if not config.has_section('warm_start'):
+        return None
+    snapshot = config.get('warm_start', 'snapshot', fallback=None)
+    if not snapshot or not os.path.isfile(snapshot):
+        return None
+    with open(snapshot, 'rb') as snapshot_file:
+        return hashlib.sha256(snapshot_file.read()).hexdigest()
+
+
+def normalize_config(config):
+    """Return a canonical text representation of a ConfigParser.
+
+    Sections and options are sorted and values stripped so that
+    formatting and ordering differences in the .cfg file do not
+    change the key.
+    """
+    lines = []
+    for section in sorted(config.sections()):
+        lines.append("[{0}]".format(section.strip()))
+        for option in sorted(config.options(section)):
+            value = config.get(section, option, raw=True)
+            lines.append("{0}={1}".format(option.strip().lower(),
+                                          " ".join(value.split())))
+    return "\n".join(lines)
+
+
+class ResultCache(object):
+    """Size bounded, least recently used cache of simulation results.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR,
+                 max_bytes=DEFAULT_CACHE_SIZE):
+        """
+        Keyword arguments:
+
+        cache_dir -- directory for the cached files. [str]
+
+        max_bytes -- evict the least recently used entries when the
+        cache is larger than this. [int]
+
+        """
+        self._cache_dir = os.path.abspath(cache_dir)
+        self._max_bytes = max_bytes
+        os.makedirs(self._cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(config, forcing_seed, library_version):
+        """Compute the content address for a configuration. Compute it
+        after the demo is initialized, a warm start snapshot is written
+        then.
+        """
+        content = ("{0}\nseed={1}\nlibrary={2}\nsources={3}\n"
+                   "snapshot={4}\n").format(
+                       normalize_config(config), forcing_seed,
+                       library_version, source_hash(), snapshot_hash(config))
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def _filename(self, key):
+        return os.path.join(self._cache_dir, "{0}.npz".format(key))
+
+    def load(self, key):
+        """Return (trajectories, metrics) for key, or None on a miss.
+
+        A hit marks the entry as most recently used.
+        """
+        filename = self._filename(key)
+        if not os.path.isfile(filename):
+            return None
+        try:
+            with np.load(filename, allow_pickle=False) as data:
+                trajectories = {name: data[name] for name in data.files
+                                if name != _METRICS}
+                metrics = json.loads(str(data[_METRICS]))
+        except (OSError, ValueError, KeyError):
+            # corrupt or truncated entry, treat as a miss
+            os.remove(filename)
+            return None
+        os.utime(filename, None)
+        return trajectories, metrics
+
+    def store(self, key, trajectories, metrics):
+        """Save the trajectories, dict of arrays, and metrics, json
+        serializable dict, under key then enforce the size bound.
+        """
+        arrays = dict(trajectories)
+        arrays[_METRICS] = np.array(json.dumps(metrics))
+        handle, tmp_filename = tempfile.mkstemp(dir=self._cache_dir,
+                                                suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as tmp_file:
+                np.savez_compressed(tmp_file, **arrays)
+            os.replace(tmp_filename, self._filename(key))
+        except BaseException:
+            if os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in
+        max_bytes.
+        """
+        entries = []
+        total = 0
+        for name in os.listdir(self._cache_dir):
+            if not name.endswith('.npz'):
+                continue
+            filename = os.path.join(self._cache_dir, name)
+            stat = os.stat(filename)
+            entries.append((stat.st_mtime, stat.st_size, filename))
+            total += stat.st_size
+        entries.sort()
+        for _, size, filename in entries:
+            if total <= self._max_bytes:
+                break
+            os.remove(filename)
+            total -= size
+
+
+if __name__ == "__main__":
+    try:
+        print("Module has no main functionality. Please run pid-driver.py")
+        sys.exit(0)
+    except Exception as error:
+        print(str(error))
+        traceback.print_exc()
+        sys.exit(1)
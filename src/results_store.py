@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""SQLite store of sweep results.
+
+One row per run with the run key, the controller and forcing
+parameters, the main metrics and the termination reason as indexed
+columns and the full configuration and metrics as json. The metrics
+of runs stopped early by termination.Termination cover only the
+simulated time, filter or rank on the termination column before
+comparing them. Rows are appended in bulk
+transactions, so an interrupted sweep loses at most one batch and
+resumes by skipping the keys already stored.
+
+Copyright (c) 2016 Benjamin J. Andre
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v.  2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+#
+# built-in modules
+#
+import hashlib
+import json
+import sqlite3
+import sys
+import time
+import traceback
+
+#
+# installed dependencies
+#
+
+#
+# other modules in this package
+#
+from result_cache import normalize_config
+import termination
+
+if sys.hexversion < 0x03050000:
+    print(70 * "*")
+    print("ERROR: {0} requires python >= 3.5.x. ".format(sys.argv[0]))
+    print("It appears that you are running python {0}".format(
+        ".".join(str(x) for x in sys.version_info[0:3])))
+    print(70 * "*")
+    sys.exit(1)
+
+# run status
+COMPLETED = 'completed'
+REJECTED = 'rejected'  # gains rejected by linear screening, not simulated
+FAILED = 'failed'  # the simulation raised, metrics hold the error
+
+# indexed columns, name and sqlite type
+PARAMETER_COLUMNS = [
+    ('Kp', 'REAL'),
+    ('Ki', 'REAL'),
+    ('Kd', 'REAL'),
+    ('history_length', 'INTEGER'),
+    ('integral_mode', 'TEXT'),
+    ('forcing_mean', 'REAL'),
+    ('forcing_standard_deviation', 'REAL'),
+]
+METRIC_COLUMNS = [
+    ('iae', 'REAL'),
+    ('ise', 'REAL'),
+    ('max_abs_error', 'REAL'),
+    ('final_error', 'REAL'),
+    ('final_process_value', 'REAL'),
+]
+COLUMNS = (['key', 'campaign', 'status', 'termination', 'created', ] +
+           [name for name, _ in PARAMETER_COLUMNS + METRIC_COLUMNS] +
+           ['config', 'metrics', ])
+
+# keys per 'IN (...)' query, below the sqlite host parameter limit
+_KEY_CHUNK = 500
+
+
+def run_key(config, forcing_seed, library_version):
+    """Key of a run, a hash of the normalized configuration, the
+    forcing seed and the native library version. Unlike
+    result_cache.ResultCache.key it does not hash the simulation
+    sources, editing them does not turn the stored runs of a campaign
+    back into pending runs.
+    """
+    content = "{0}\nseed={1}\nlibrary={2}\n".format(
+        normalize_config(config), forcing_seed, library_version)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class ResultsStore(object):
+    """Append only store of run parameters and metrics.
+    """
+
+    # write ahead log, readers are not blocked by a running sweep
+    _JOURNAL_MODE = 'WAL'
+
+    def __init__(self, filename, timeout=5.0):
+        """Open or create the store.
+
+        Positional arguments:
+
+        filename -- sqlite database file. [str]
+
+        Keyword arguments:
+
+        timeout -- wait this long for a lock held by another
+        connection. [s]
+        """
+        self._filename = filename
+        self._connection = sqlite3.connect(filename, timeout=timeout)
+        self._set_journal_mode()
+        self._create()
+
+    def _set_journal_mode(self):
+        # only a new store is switched to _JOURNAL_MODE, an existing
+        # store keeps its mode, e.g. the rollback journal of a work
+        # queue shared between hosts.
+        exists = self._connection.execute(
+            "SELECT COUNT(*) FROM sqlite_master "
+            "WHERE type = 'table' AND name = 'runs'").fetchone()[0]
+        if not exists:
+            self._connection.execute(
+                'PRAGMA journal_mode={0}'.format(self._JOURNAL_MODE))
+
+    def _create(self):
+        columns = (
+            ['key TEXT PRIMARY KEY', 'campaign TEXT', 'status TEXT',
+             'termination TEXT', 'created REAL', ] +
+            ['{0} {1}'.format(name, kind)
+             for name, kind in PARAMETER_COLUMNS + METRIC_COLUMNS] +
+            ['config TEXT', 'metrics TEXT', ])
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS runs ({0})'.format(
+                    ', '.join(columns)))
+            self._add_termination()
+            indexes = {
+                'runs_gains': 'Kp, Ki, Kd',
+                'runs_forcing': 'forcing_mean, forcing_standard_deviation',
+                'runs_iae': 'iae',
+                'runs_ise': 'ise',
+                'runs_max_abs_error': 'max_abs_error',
+                'runs_termination': 'termination',
+            }
+            for name, columns in sorted(indexes.items()):
+                self._connection.execute(
+                    'CREATE INDEX IF NOT EXISTS {0} ON runs ({1})'.format(
+                        name, columns))
+
+    def _add_termination(self):
+        # stores created before the termination column, fill it from
+        # the metrics json. Runs without a reason in their metrics were
+        # simulated over the whole horizon.
+        existing = [row[1] for row in
+                    self._connection.execute('PRAGMA table_info(runs)')]
+        if 'termination' in existing:
+            return
+        self._connection.execute(
+            'ALTER TABLE runs ADD COLUMN termination TEXT')
+        rows = self._connection.execute(
+            'SELECT key, metrics FROM runs WHERE status = ?',
+            (COMPLETED, )).fetchall()
+        self._connection.executemany(
+            'UPDATE runs SET termination = ? WHERE key = ?',
+            [(json.loads(metrics).get('termination', termination.COMPLETED),
+              key) for key, metrics in rows])
+
+    def close(self):
+        self._connection.close()
+
+    def completed(self, keys):
+        """Return the subset of keys already in the store.
+        """
+        keys = list(keys)
+        found = set()
+        for start in range(0, len(keys), _KEY_CHUNK):
+            chunk = keys[start:start + _KEY_CHUNK]
+            query = 'SELECT key FROM runs WHERE key IN ({0})'.format(
+                ', '.join('?' * len(chunk)))
+            found.update(row[0] for row in
+                         self._connection.execute(query, chunk))
+        return found
+
+    @staticmethod
+    def row(key, campaign, status, parameters, config, metrics):
+        """Build a row for append.
+
+        Positional arguments:
+
+        key -- unique run key, see run_key. [str]
+
+        campaign -- name of the sweep. [str]
+
+        status -- COMPLETED, REJECTED or FAILED. [str]
+
+        parameters -- dict with the PARAMETER_COLUMNS. [dict]
+
+        config -- normalized configuration text. [str]
+
+        metrics -- json serializable dict, empty for rejected runs
+        and the 'error' of failed runs. Its 'termination' reason is stored in the termination
+        column. [dict]
+        """
+        row = [key, campaign, status, metrics.get('termination'),
+               time.time(), ]
+        row += [parameters.get(name) for name, _ in PARAMETER_COLUMNS]
+        row += [metrics.get(name) for name, _ in METRIC_COLUMNS]
+        row += [config, json.dumps(metrics, sort_keys=True), ]
+        return row
+
+    def append(self, rows):
+        """Insert rows, from row(), in a single transaction. Rows whose
+        key is already stored are ignored.
+        """
+        with self._connection:
+            self._insert(rows)
+
+    def _insert(self, rows):
+        # insert within the caller's transaction
+        statement = 'INSERT OR IGNORE INTO runs ({0}) VALUES ({1})'.format(
+            ', '.join(COLUMNS), ', '.join('?' * len(COLUMNS)))
+        self._connection.executemany(statement, rows)
+
+    def query(self, columns=None, ranges=None, equal=None, exclude=None,
+              sort=None, descending=False, limit=None):
+        """Iterate over the rows matching the filters, without loading
+        them all into memory.
+
+        Keyword arguments:
+
+        columns -- columns to return, defaults to parameters and
+        metrics. [list]
+
+        ranges -- dict of column: (minimum, maximum), either bound may
+        be None. [dict]
+
+        equal -- dict of column: value. [dict]
+
+        exclude -- dict of column: list of values the column must not
+        take, rows where the column is NULL are excluded too. [dict]
+
+        sort -- column to order by. [str]
+
+        descending -- sort largest first. [bool]
+
+        limit -- return at most this many rows. [int]
+
+        Returns:
+        iterator over tuples in the order of columns. [iterator]
+        """
+        if columns is None:
+            columns = [name for name, _ in PARAMETER_COLUMNS + METRIC_COLUMNS]
+        for name in (list(columns) + list((ranges or {}).keys()) +
+                     list((equal or {}).keys()) +
+                     list((exclude or {}).keys()) + ([sort] if sort else [])):
+            self._check_column(name)
+
+        clauses = []
+        values = []
+        for name, (minimum, maximum) in sorted((ranges or {}).items()):
+            if minimum is not None:
+                clauses.append('{0} >= ?'.format(name))
+                values.append(minimum)
+            if maximum is not None:
+                clauses.append('{0} <= ?'.format(name))
+                values.append(maximum)
+        for name, value in sorted((equal or {}).items()):
+            clauses.append('{0} = ?'.format(name))
+            values.append(value)
+        for name, excluded in sorted((exclude or {}).items()):
+            clauses.append('{0} NOT IN ({1})'.format(
+                name, ', '.join('?' * len(excluded))))
+            values.extend(excluded)
+
+        query = 'SELECT {0} FROM runs'.format(', '.join(columns))
+        if clauses:
+            query += ' WHERE {0}'.format(' AND '.join(clauses))
+        if sort:
+            query += ' ORDER BY {0} {1}'.format(
+                sort, 'DESC' if descending else 'ASC')
+        if limit is not None:
+            query += ' LIMIT ?'
+            values.append(int(limit))
+        return self._connection.execute(query, values)
+
+    @staticmethod
+    def _check_column(name):
+        # column names are interpolated into the sql, only allow known
+        # names.
+        if name not in COLUMNS:
+            raise RuntimeError(
+                "Unknown results column '{0}', expected one of: {1}".format(
+                    name, ", ".join(COLUMNS)))
+
+
+if __name__ == "__main__":
+    try:
+        print("Module has no main functionality. Please run pid-sweep.py "
+              "or pid-query.py")
+        sys.exit(0)
+    except Exception as error:
+        print(str(error))
+        traceback.print_exc()
+        sys.exit(1)
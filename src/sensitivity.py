@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Forward sensitivity of the closed loop with respect to the gains.
+
+PIDSensitivity is a double precision replica of pid_control in pid.c
+that carries, next to every value it stores, the derivative of that
+value with respect to the gains (Kp, Ki, Kd). Combined with the
+derivative of the process update, see
+PIDDemoBase.simulate_sensitivity, a single simulation gives the cost
+and its gradient, instead of the six simulations of central finite
+differences.
+
+Copyright (c) 2016 Benjamin J. Andre
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v.  2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+#
+# built-in modules
+#
+import sys
+import traceback
+
+#
+# installed dependencies
+#
+import numpy as np
+
+#
+# other modules in this package
+#
+
+if sys.hexversion < 0x03050000:
+    print(70 * "*")
+    print("ERROR: {0} requires python >= 3.5.x. ".format(sys.argv[0]))
+    print("It appears that you are running python {0}".format(
+        ".".join(str(x) for x in sys.version_info[0:3])))
+    print(70 * "*")
+    sys.exit(1)
+
+NUM_GAINS = 3
+
+
+class PIDSensitivity(object):
+    """Double precision pid controller propagating derivatives with
+    respect to (Kp, Ki, Kd). Matches pid_control for each integral
+    mode, including the windowed integral and the derivative against
+    the oldest stored process value.
+    """
+
+    def __init__(self, history_length, setpoint, Kp, Ki, Kd,
+                 integral_mode='window', leak=None):
+        """
+        Keyword arguments, see pid.PID.
+        """
+        self._setpoint = setpoint
+        self._gains = np.array([Kp, Ki, Kd], dtype=np.float64)
+        self._integral_mode = integral_mode
+        self._leak = leak
+        self._integral = 0.0
+        self._d_integral = np.zeros(NUM_GAINS)
+        if integral_mode in ['window', 'fixed_rate', ]:
+            # same initial history as pid_init, perfect control
+            length = history_length
+            self._interval = np.ones(length)
+        else:
+            length = 1
+            self._interval = None
+        self._current = 0
+        self._history = setpoint * np.ones(length)
+        self._d_history = np.zeros((length, NUM_GAINS))
+
+    def control(self, process_value, d_process_value, delta_time):
+        """Compute the control output and its derivative.
+
+        Positional arguments:
+        process_value -- current process value. [float]
+        d_process_value -- its derivative with respect to the gains. [np.ndarray]
+        delta_time -- time interval since last control calculation. [float]
+
+        Returns:
+        output, d_output -- control output and its derivative with
+        respect to the gains. [float, np.ndarray]
+        """
+        error = self._setpoint - process_value
+        d_error = -d_process_value
+        current = self._current
+        previous = self._history[current]
+        d_previous = self._d_history[current]
+
+        if self._interval is not None:
+            interval = self._interval[current]
+            self._integral += (error * delta_time -
+                               (self._setpoint - previous) * interval)
+            self._d_integral += d_error * delta_time + d_previous * interval
+            self._interval[current] = delta_time
+        elif self._integral_mode == 'leaky':
+            self._integral = self._leak * self._integral + error * delta_time
+            self._d_integral = (self._leak * self._d_integral +
+                                d_error * delta_time)
+        else:
+            # the velocity form accumulates to an integral over all time
+            self._integral += error * delta_time
+            self._d_integral += d_error * delta_time
+
+        derivative = (process_value - previous) / delta_time
+        d_derivative = (d_process_value - d_previous) / delta_time
+
+        terms = np.array([error, self._integral, derivative])
+        Kp, Ki, Kd = self._gains
+        output = np.dot(self._gains, terms)
+        d_output = terms + Kp * d_error + Ki * self._d_integral + \
+            Kd * d_derivative
+
+        self._history[current] = process_value
+        self._d_history[current] = d_process_value
+        self._current = (current + 1) % len(self._history)
+        return output, d_output
+
+
+def finite_difference_gradient(function, gains, step=1.0e-6):
+    """Central finite difference gradient of function(gains).
+
+    Positional arguments:
+    function -- scalar function of the gains. [callable]
+    gains -- point to differentiate at. [np.ndarray]
+
+    Keyword arguments:
+    step -- relative step, scaled by max(|gain|, 1). [float]
+    """
+    gains = np.asarray(gains, dtype=np.float64)
+    gradient = np.zeros(len(gains))
+    for i in range(len(gains)):
+        h = step * max(abs(gains[i]), 1.0)
+        plus = gains.copy()
+        minus = gains.copy()
+        plus[i] += h
+        minus[i] -= h
+        gradient[i] = (function(plus) - function(minus)) / (2.0 * h)
+    return gradient
+
+
+def check_gradient(cost_and_gradient, gains, step=1.0e-6):
+    """Compare an analytic gradient against central finite differences.
+
+    Returns:
+    cost, gradient, finite difference gradient and the largest
+    relative difference. [float, np.ndarray, np.ndarray, float]
+    """
+    cost, gradient = cost_and_gradient(gains)
+    reference = finite_difference_gradient(
+        lambda x: cost_and_gradient(x)[0], gains, step)
+    scale = np.maximum(np.abs(reference), 1.0e-12 * max(abs(cost), 1.0))
+    error = float(np.max(np.abs(gradient - reference) / scale))
+    return cost, gradient, reference, error
+
+
+if __name__ == "__main__":
+    try:
+        print("Module has no main functionality. Please run pid-driver.py")
+        sys.exit(0)
+    except Exception as error:
+        print(str(error))
+        traceback.print_exc()
+        sys.exit(1)
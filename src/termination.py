@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Early termination of controlled simulations.
+
+Most gain sets of a sweep either diverge, e.g. the tank drains to the
+h = 0 clamp and stays there, or settle long before the end of the
+simulation. The criteria of the optional [termination] section stop
+the controlled simulation early:
+
+  [termination]
+  # stop when |pv - sp| exceeds this bound, or is not finite
+  max_abs_error = 10.0
+  # stop when the process stays saturated for this long [s]
+  saturation_time = 50.0
+  # stop when |pv - sp| stays within settle_tolerance for settle_time [s]
+  settle_tolerance = 0.01
+  settle_time = 50.0
+
+Every option is optional. The criteria are checked only at control
+ticks, so the cost per time step is unchanged and excursions between
+ticks are not seen. For arrays of processes the largest error is
+compared and the process is saturated if any process is saturated.
+The metrics of a terminated simulation are computed from the
+trajectories up to the termination.
+
+Copyright (c) 2016 Benjamin J. Andre
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v.  2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+#
+# built-in modules
+#
+import sys
+import traceback
+
+#
+# installed dependencies
+#
+import numpy as np
+
+#
+# other modules in this package
+#
+
+if sys.hexversion < 0x03050000:
+    print(70 * "*")
+    print("ERROR: {0} requires python >= 3.5.x. ".format(sys.argv[0]))
+    print("It appears that you are running python {0}".format(
+        ".".join(str(x) for x in sys.version_info[0:3])))
+    print(70 * "*")
+    sys.exit(1)
+
+# termination reasons
+COMPLETED = 'completed'  # ran to the maximum time
+DIVERGED = 'diverged'
+SATURATED = 'saturated'
+SETTLED = 'settled'
+
+REASONS = (COMPLETED, DIVERGED, SATURATED, SETTLED, )
+
+
+class Termination(object):
+    """Stop criteria of a controlled simulation, checked at control
+    ticks.
+    """
+
+    def __init__(self, set_point, delta_time, max_abs_error=None,
+                 saturation_time=None, settle_tolerance=None,
+                 settle_time=None):
+        """
+        Positional arguments:
+
+        set_point -- process set point. [float]
+        delta_time -- simulation time step. [s]
+
+        Keyword arguments, None disables the criterion:
+
+        max_abs_error -- divergence bound on |pv - sp|. [float]
+        saturation_time -- saturation dwell limit. [s]
+        settle_tolerance -- settling band on |pv - sp|. [float]
+        settle_time -- time within the settling band. [s]
+        """
+        if (settle_tolerance is None) != (settle_time is None):
+            raise RuntimeError("Termination requires both settle_tolerance "
+                               "and settle_time.")
+        self._set_point = set_point
+        self._delta_time = delta_time
+        self._max_abs_error = max_abs_error
+        self._saturation_time = saturation_time
+        self._settle_tolerance = settle_tolerance
+        self._settle_time = settle_time
+        self._saturated_since = None
+        self._settled_since = None
+
+    @classmethod
+    def from_config(cls, config, set_point, delta_time):
+        """Return the criteria of the [termination] section, None if
+        there is no section.
+        """
+        if not config.has_section("termination"):
+            return None
+
+        def option(name):
+            return config.getfloat("termination", name, fallback=None)
+
+        return cls(set_point, delta_time, option("max_abs_error"),
+                   option("saturation_time"), option("settle_tolerance"),
+                   option("settle_time"))
+
+    def reset(self):
+        """Forget the dwell times of a previous simulation.
+        """
+        self._saturated_since = None
+        self._settled_since = None
+
+    def check(self, step, process_value, saturated=False):
+        """Check the criteria at a control tick.
+
+        Positional arguments:
+
+        step -- time step of the tick. [int]
+        process_value -- process value, or values. [float or np.ndarray]
+
+        Keyword arguments:
+
+        saturated -- the process or control is at a limit. [bool]
+
+        Returns:
+        reason -- termination reason, None to continue. [str]
+        """
+        error = float(np.max(np.abs(process_value - self._set_point)))
+        if not np.isfinite(error):
+            return DIVERGED
+        if self._max_abs_error is not None and error > self._max_abs_error:
+            return DIVERGED
+
+        if self._saturation_time is not None:
+            if not saturated:
+                self._saturated_since = None
+            elif self._saturated_since is None:
+                self._saturated_since = step
+            elif ((step - self._saturated_since) * self._delta_time >=
+                  self._saturation_time):
+                return SATURATED
+
+        if self._settle_time is not None:
+            if error > self._settle_tolerance:
+                self._settled_since = None
+            elif self._settled_since is None:
+                self._settled_since = step
+            elif ((step - self._settled_since) * self._delta_time >=
+                  self._settle_time):
+                return SETTLED
+        return None
+
+
+if __name__ == "__main__":
+    try:
+        print("Module has no main functionality. Please run pid-driver.py")
+        sys.exit(0)
+    except Exception as error:
+        print(str(error))
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,192 @@
+// -*- mode: c; c-default-style: "k&r"; c-basic-offset: 4; indent-tabs-mode: nil; tab-width: 4 -*-
+
+//
+// Copyright (c) 2016 Benjamin J. Andre
+//
+// This Source Code Form is subject to the terms of the Mozilla Public
+// License, v.  2.0. If a copy of the MPL was not distributed with this
+// file, You can obtain one at http://mozilla.org/MPL/2.0/.
+//
+
+#include <inttypes.h>
+#include <limits.h>
+
+#include <stdarg.h>
+#include <stddef.h>
+#include <setjmp.h>
+
+#include <stdio.h>
+#include <math.h>
+
+#include <cmocka.h>
+
+#include "pid.h"
+#include "pid_fixed.h"
+
+// scaling between the float and fixed point controllers for the
+// validation tests: process values and output are fractions of
+// value_scale, delta time is a fraction of time_scale and all gains
+// share gain_shift.
+float const value_scale = 2.0f;
+float const time_scale = 16.0f;
+uint8_t const gain_shift = 2;
+
+// largest allowed |float - fixed| output error as a fraction of full
+// scale over the validation run.
+float const q15_tolerance = 2.0e-3f;
+float const q31_tolerance = 1.0e-6f;
+
+static float fixed_gain(float const gain) {
+    return gain / (float)(1 << gain_shift);
+}
+
+// deterministic pseudo random process values in [0.75, 1.25), so the
+// output stays within full scale.
+static float next_process_value(uint32_t *seed) {
+    *seed = *seed * 1664525u + 1013904223u;
+    return 0.75f + 0.5f * (float)(*seed >> 8) / (float)(1u << 24);
+}
+
+static void test_pid_q15_init(void **state) {
+    pid_q15_data* pid;
+    pid = pid_q15_init(5, float_to_q15(0.5f), float_to_q15(0.5f),
+                       float_to_q15(0.25f), float_to_q15(0.0f), 0);
+    assert_non_null(pid);
+    pid_q15_free(&pid);
+    assert_null(pid);
+}
+
+static void test_pid_q31_init(void **state) {
+    pid_q31_data* pid;
+    pid = pid_q31_init(5, float_to_q31(0.5f), float_to_q31(0.5f),
+                       float_to_q31(0.25f), float_to_q31(0.0f), 0);
+    assert_non_null(pid);
+    pid_q31_free(&pid);
+    assert_null(pid);
+}
+
+static void test_pid_q31_perfect_control(void **state) {
+    pid_q31_data* pid;
+    q31_t setpoint = float_to_q31(0.5f);
+    pid = pid_q31_init(5, setpoint, float_to_q31(0.5f),
+                       float_to_q31(0.25f), float_to_q31(0.75f), 1);
+    q31_t control = pid_q31_control(pid, setpoint, float_to_q31(0.1f));
+    assert_int_equal(0, control);
+    pid_q31_free(&pid);
+}
+
+static void test_pid_q15_proportional_only(void **state) {
+    // Kp = 0.75 * 2^1, e = 0.25
+    pid_q15_data* pid;
+    pid = pid_q15_init(5, float_to_q15(0.5f), float_to_q15(0.75f),
+                       0, 0, 1);
+    q15_t control = pid_q15_control(pid, float_to_q15(0.25f),
+                                    float_to_q15(0.1f));
+    assert_int_equal(float_to_q15(0.375f), control);
+    pid_q15_free(&pid);
+}
+
+static void test_pid_q31_proportional_only(void **state) {
+    pid_q31_data* pid;
+    pid = pid_q31_init(5, float_to_q31(0.5f), float_to_q31(0.75f),
+                       0, 0, 1);
+    q31_t control = pid_q31_control(pid, float_to_q31(0.25f),
+                                    float_to_q31(0.1f));
+    assert_int_equal(float_to_q31(0.375f), control);
+    pid_q31_free(&pid);
+}
+
+static void test_pid_q15_saturation(void **state) {
+    // error and output saturate instead of wrapping around
+    pid_q15_data* pid;
+    pid = pid_q15_init(5, float_to_q15(0.9f), float_to_q15(0.75f),
+                       0, 0, 4);
+    q15_t control = pid_q15_control(pid, float_to_q15(-0.9f),
+                                    float_to_q15(0.1f));
+    assert_int_equal(INT16_MAX, control);
+    pid_q15_free(&pid);
+}
+
+static void test_pid_q31_saturation(void **state) {
+    pid_q31_data* pid;
+    pid = pid_q31_init(5, float_to_q31(-0.9f), float_to_q31(0.75f),
+                       0, 0, 4);
+    q31_t control = pid_q31_control(pid, float_to_q31(0.9f),
+                                    float_to_q31(0.1f));
+    assert_int_equal(INT32_MIN, control);
+    pid_q31_free(&pid);
+}
+
+static void test_pid_q31_derivative_saturation(void **state) {
+    // a large derivative over a tiny delta time saturates
+    pid_q31_data* pid;
+    pid = pid_q31_init(5, float_to_q31(0.5f), 0, 0, float_to_q31(0.5f), 0);
+    q31_t control = pid_q31_control(pid, float_to_q31(0.75f), 1);
+    assert_int_equal(INT32_MAX, control);
+    pid_q31_free(&pid);
+}
+
+static void test_pid_fixed_matches_float(void **state) {
+    // run the float and both fixed point controllers on the same
+    // sequence of process values and delta times, the outputs agree
+    // within the error bounds.
+    uint8_t hist_size = 5;
+    float setpoint = 1.0f;
+    float Kp = 1.5f;
+    float Ki = 0.1f;
+    float Kd = 0.5f;
+    pid_data* pid = pid_init(hist_size, setpoint, Kp, Ki, Kd);
+
+    float Kp_q = fixed_gain(Kp);
+    float Ki_q = fixed_gain(Ki * time_scale);
+    float Kd_q = fixed_gain(Kd / time_scale);
+    pid_q15_data* pid_q15 = pid_q15_init(
+        hist_size, float_to_q15(setpoint / value_scale), float_to_q15(Kp_q),
+        float_to_q15(Ki_q), float_to_q15(Kd_q), gain_shift);
+    pid_q31_data* pid_q31 = pid_q31_init(
+        hist_size, float_to_q31(setpoint / value_scale), float_to_q31(Kp_q),
+        float_to_q31(Ki_q), float_to_q31(Kd_q), gain_shift);
+
+    uint32_t seed = 770405u;
+    float max_error_q15 = 0.0f;
+    float max_error_q31 = 0.0f;
+    for (int i = 0; i < 10000; i++) {
+        float value = next_process_value(&seed);
+        float delta_time = (i % 2 == 0) ? 2.0f : 3.0f;
+        float control = pid_control(pid, value, delta_time) / value_scale;
+
+        q15_t control_q15 = pid_q15_control(
+            pid_q15, float_to_q15(value / value_scale),
+            float_to_q15(delta_time / time_scale));
+        q31_t control_q31 = pid_q31_control(
+            pid_q31, float_to_q31(value / value_scale),
+            float_to_q31(delta_time / time_scale));
+
+        float error_q15 = fabsf(control - q15_to_float(control_q15));
+        float error_q31 = fabsf(control - q31_to_float(control_q31));
+        max_error_q15 = (error_q15 > max_error_q15) ? error_q15 : max_error_q15;
+        max_error_q31 = (error_q31 > max_error_q31) ? error_q31 : max_error_q31;
+    }
+    assert_true(max_error_q15 < q15_tolerance);
+    assert_true(max_error_q31 < q31_tolerance);
+
+    pid_free(&pid);
+    pid_q15_free(&pid_q15);
+    pid_q31_free(&pid_q31);
+}
+
+int main(int argc, char** argv) {
+
+    const struct CMUnitTest tests[] = {
+        cmocka_unit_test(test_pid_q15_init),
+        cmocka_unit_test(test_pid_q31_init),
+        cmocka_unit_test(test_pid_q31_perfect_control),
+        cmocka_unit_test(test_pid_q15_proportional_only),
+        cmocka_unit_test(test_pid_q31_proportional_only),
+        cmocka_unit_test(test_pid_q15_saturation),
+        cmocka_unit_test(test_pid_q31_saturation),
+        cmocka_unit_test(test_pid_q31_derivative_saturation),
+        cmocka_unit_test(test_pid_fixed_matches_float),
+    };
+    return cmocka_run_group_tests(tests, NULL, NULL);
+}
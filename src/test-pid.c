@@ -16,21 +16,22 @@
 #include <setjmp.h>
 
 #include <stdio.h>
+#include <string.h>
 #include <math.h>
 
 #include <cmocka.h>
 
 #include "pid.h"
 
-float const epsilon = 1.0e-8f;
+pid_real const epsilon = 1.0e-8f;
 
 static void test_pid_init(void **state) {
     pid_data* pid;
     uint8_t hist_size = 5;
-    float setpoint = 100.0f;
-    float Kp = 1.0;
-    float Ki = 1.0;
-    float Kd = 1.0;
+    pid_real setpoint = 100.0f;
+    pid_real Kp = 1.0;
+    pid_real Ki = 1.0;
+    pid_real Kd = 1.0;
     pid = pid_init(hist_size, setpoint, Kp, Ki, Kd);
     assert_non_null(pid);
 }
@@ -38,29 +39,36 @@ static void test_pid_init(void **state) {
 static void test_pid_free(void **state) {
     pid_data* pid;
     uint8_t hist_size = 5;
-    float setpoint = 100.0f;
-    float Kp = 1.0;
-    float Ki = 1.0;
-    float Kd = 1.0;
+    pid_real setpoint = 100.0f;
+    pid_real Kp = 1.0;
+    pid_real Ki = 1.0;
+    pid_real Kd = 1.0;
     pid = pid_init(hist_size, setpoint, Kp, Ki, Kd);
     pid_free(&pid);
     assert_null(pid);
+    // freeing a freed controller is a no-op
+    pid_free(&pid);
+    assert_null(pid);
+}
+
+static void test_pid_version(void **state) {
+    assert_string_equal(PID_VERSION, pid_version());
 }
 
 static void test_pid_init_values(void **state) {
     pid_data* pid;
     uint8_t hist_size = 5;
-    float setpoint = 100.0f;
-    float Kp = 1.0f;
-    float Ki = 2.0f;
-    float Kd = 3.0f;
+    pid_real setpoint = 100.0f;
+    pid_real Kp = 1.0f;
+    pid_real Ki = 2.0f;
+    pid_real Kd = 3.0f;
 
     pid = pid_init(hist_size, setpoint, Kp, Ki, Kd);
     
     uint8_t received_hist = get_history_length(pid);
     assert_int_equal(hist_size, received_hist);
     
-    float received = 0.0f;
+    pid_real received = 0.0f;
     received = get_setpoint(pid);
     assert_true(fabs(setpoint - received) < epsilon);
     
@@ -82,15 +90,15 @@ static void test_pid_perfect_control(void **state) {
     // setpoint. The control output should be zero.
     pid_data* pid;
     uint8_t hist_size = 5;
-    float setpoint = 100.0f;
-    float Kp = 1.0f;
-    float Ki = 2.0f;
-    float Kd = 3.0f;
+    pid_real setpoint = 100.0f;
+    pid_real Kp = 1.0f;
+    pid_real Ki = 2.0f;
+    pid_real Kd = 3.0f;
     pid = pid_init(hist_size, setpoint, Kp, Ki, Kd);
 
-    float value = setpoint;
-    float delta_time = 1.0f;
-    float control = pid_control(pid, value, delta_time);
+    pid_real value = setpoint;
+    pid_real delta_time = 1.0f;
+    pid_real control = pid_control(pid, value, delta_time);
     assert_true(fabs(control) < epsilon);
 }
 
@@ -99,16 +107,16 @@ static void test_pid_proportional_positive_only(void **state) {
     // test proportional control only
     pid_data* pid;
     uint8_t hist_size = 5;
-    float setpoint = 100.0f;
-    float Kp = 1.5f;
-    float Ki = 0.0f;
-    float Kd = 0.0f;
+    pid_real setpoint = 100.0f;
+    pid_real Kp = 1.5f;
+    pid_real Ki = 0.0f;
+    pid_real Kd = 0.0f;
     pid = pid_init(hist_size, setpoint, Kp, Ki, Kd);
 
-    float value = 90.0f;
-    float delta_time = 1.0f;
-    float control = pid_control(pid, value, delta_time);
-    float expected = 15.0f;
+    pid_real value = 90.0f;
+    pid_real delta_time = 1.0f;
+    pid_real control = pid_control(pid, value, delta_time);
+    pid_real expected = 15.0f;
     assert_true(fabs(control - expected) < epsilon);
 }
 
@@ -116,16 +124,16 @@ static void test_pid_proportional_negative_only(void **state) {
     // test proportional control only
     pid_data* pid;
     uint8_t hist_size = 5;
-    float setpoint = 100.0f;
-    float Kp = 1.5f;
-    float Ki = 0.0f;
-    float Kd = 0.0f;
+    pid_real setpoint = 100.0f;
+    pid_real Kp = 1.5f;
+    pid_real Ki = 0.0f;
+    pid_real Kd = 0.0f;
     pid = pid_init(hist_size, setpoint, Kp, Ki, Kd);
 
-    float value = 110.0f;
-    float delta_time = 1.0f;
-    float control = pid_control(pid, value, delta_time);
-    float expected = -15.0f;
+    pid_real value = 110.0f;
+    pid_real delta_time = 1.0f;
+    pid_real control = pid_control(pid, value, delta_time);
+    pid_real expected = -15.0f;
     assert_true(fabs(control - expected) < epsilon);
 }
 
@@ -134,16 +142,16 @@ static void test_pid_derivative_positive_only(void **state) {
     // test derivative control only
     pid_data* pid;
     uint8_t hist_size = 5;
-    float setpoint = 100.0f;
-    float Kp = 0.0f;
-    float Ki = 0.0f;
-    float Kd = 1.5f;
+    pid_real setpoint = 100.0f;
+    pid_real Kp = 0.0f;
+    pid_real Ki = 0.0f;
+    pid_real Kd = 1.5f;
     pid = pid_init(hist_size, setpoint, Kp, Ki, Kd);
 
-    float value = 110.0f;
-    float delta_time = 2.0f;
-    float control = pid_control(pid, value, delta_time);
-    float expected = 7.5f;
+    pid_real value = 110.0f;
+    pid_real delta_time = 2.0f;
+    pid_real control = pid_control(pid, value, delta_time);
+    pid_real expected = 7.5f;
     assert_true(fabs(control - expected) < epsilon);
 }
 
@@ -151,32 +159,511 @@ static void test_pid_derivative_negative_only(void **state) {
     // test derivative control only
     pid_data* pid;
     uint8_t hist_size = 5;
-    float setpoint = 100.0f;
-    float Kp = 0.0f;
-    float Ki = 0.0f;
-    float Kd = 1.5f;
+    pid_real setpoint = 100.0f;
+    pid_real Kp = 0.0f;
+    pid_real Ki = 0.0f;
+    pid_real Kd = 1.5f;
     pid = pid_init(hist_size, setpoint, Kp, Ki, Kd);
 
-    float value = 90.0f;
-    float delta_time = 2.0f;
-    float control = pid_control(pid, value, delta_time);
-    float expected = -7.5f;
+    pid_real value = 90.0f;
+    pid_real delta_time = 2.0f;
+    pid_real control = pid_control(pid, value, delta_time);
+    pid_real expected = -7.5f;
     assert_true(fabs(control - expected) < epsilon);
 }
 
+static void test_pid_control_array(void **state) {
+    // batched calls give the same result as individual calls
+    pid_data* pids[2];
+    pid_data* reference[2];
+    uint8_t hist_size = 5;
+    pid_real setpoint = 100.0f;
+    pid_real Kp[2] = {1.5f, 0.5f};
+    pid_real Ki = 0.25f;
+    pid_real Kd = 1.0f;
+    for (int i = 0; i < 2; i++) {
+        pids[i] = pid_init(hist_size, setpoint, Kp[i], Ki, Kd);
+        reference[i] = pid_init(hist_size, setpoint, Kp[i], Ki, Kd);
+    }
+
+    pid_real values[2] = {90.0f, 110.0f};
+    pid_real delta_time = 2.0f;
+    pid_real outputs[2] = {0.0f, 0.0f};
+    pid_control_array(pids, 2, values, delta_time, outputs);
+    for (int i = 0; i < 2; i++) {
+        pid_real expected = pid_control(reference[i], values[i], delta_time);
+        assert_true(fabs(outputs[i] - expected) < epsilon);
+        pid_free(&pids[i]);
+        pid_free(&reference[i]);
+    }
+}
+
+static void test_pid_set_setpoint(void **state) {
+    // after changing the setpoint, the integral is the error of the
+    // stored history relative to the new setpoint.
+    uint8_t hist_size = 3;
+    pid_real Kp = 1.5f;
+    pid_real Ki = 0.5f;
+    pid_real Kd = 0.0f;
+    pid_data* pid = pid_init(hist_size, 100.0f, Kp, Ki, Kd);
+    pid_real delta_time = 1.0f;
+    for (int i = 0; i < hist_size; i++) {
+        pid_control(pid, 95.0f, delta_time);
+    }
+    pid_set_setpoint(pid, 90.0f);
+    assert_true(fabs(get_setpoint(pid) - 90.0f) < epsilon);
+
+    pid_real control = pid_control(pid, 92.0f, delta_time);
+    pid_real expected = Kp * (90.0f - 92.0f) +
+        Ki * ((90.0f - 95.0f) * 2.0f + (90.0f - 92.0f));
+    assert_true(fabs(control - expected) < 1.0e-5f);
+    pid_free(&pid);
+}
+
+static void test_pid_cascade(void **state) {
+    // the cascade matches two separate controllers with the outer
+    // output feeding the inner setpoint every 'ratio' calls.
+    uint8_t hist_size = 5;
+    uint8_t ratio = 2;
+    pid_real inner_bias = 10.0f;
+    pid_real outer_scale = -1.0f;
+    pid_data* outer = pid_init(hist_size, 1.5f, 2.0f, 0.1f, 0.0f);
+    pid_data* inner = pid_init(hist_size, inner_bias, 0.5f, 0.2f, 0.0f);
+    pid_cascade* cascade = pid_cascade_init(outer, inner, ratio,
+                                            inner_bias, outer_scale);
+
+    pid_data* ref_outer = pid_init(hist_size, 1.5f, 2.0f, 0.1f, 0.0f);
+    pid_data* ref_inner = pid_init(hist_size, inner_bias, 0.5f, 0.2f, 0.0f);
+
+    pid_real delta_time = 0.5f;
+    for (int i = 0; i < 6; i++) {
+        pid_real level = 1.0f + 0.1f * i;
+        pid_real flow = 9.0f + 0.3f * i;
+        pid_real control = pid_cascade_control(cascade, level, flow,
+                                               delta_time);
+        if (i % ratio == 0) {
+            pid_real outer_delta_time =
+                (i == 0) ? delta_time : ratio * delta_time;
+            pid_real out = pid_control(ref_outer, level, outer_delta_time);
+            pid_set_setpoint(ref_inner, inner_bias + outer_scale * out);
+        }
+        pid_real expected = pid_control(ref_inner, flow, delta_time);
+        assert_true(fabs(control - expected) < epsilon);
+    }
+
+    pid_cascade_free(&cascade);
+    assert_null(cascade);
+    pid_free(&outer);
+    pid_free(&inner);
+    pid_free(&ref_outer);
+    pid_free(&ref_inner);
+}
+
+static void test_pid_counters(void **state) {
+    // call counts are only recorded when compiled with
+    // PID_ENABLE_COUNTERS, otherwise they are always zero.
+    pid_data* pid;
+    uint8_t hist_size = 5;
+    pid_real setpoint = 100.0f;
+    pid_real Kp = 1.5f;
+    pid_real Ki = 0.0f;
+    pid_real Kd = 0.0f;
+    pid = pid_init(hist_size, setpoint, Kp, Ki, Kd);
+
+    pid_real value = 90.0f;
+    pid_real delta_time = 1.0f;
+    for (int i = 0; i < 3; i++) {
+        pid_control(pid, value, delta_time);
+    }
+    uint64_t expected = pid_counters_enabled() ? 3 : 0;
+    assert_int_equal(expected, get_call_count(pid));
+
+    pid_reset_counters(pid);
+    assert_int_equal(0, get_call_count(pid));
+    assert_int_equal(0, get_cycle_total(pid));
+    pid_free(&pid);
+}
+
+static void test_pid_trace(void **state) {
+    // the trace records the contribution of each term. It is only
+    // available when compiled with PID_ENABLE_TRACE.
+    pid_data* pid;
+    uint8_t hist_size = 5;
+    pid_real setpoint = 100.0f;
+    pid_real Kp = 1.5f;
+    pid_real Ki = 0.0f;
+    pid_real Kd = 1.5f;
+    pid = pid_init(hist_size, setpoint, Kp, Ki, Kd);
+
+    uint32_t capacity = 2;
+    bool enabled = pid_trace_enable(pid, capacity);
+    if (!enabled) {
+        assert_null(get_trace_buffer(pid));
+        assert_int_equal(0, get_trace_count(pid));
+        pid_free(&pid);
+        return;
+    }
+    assert_int_equal(capacity, get_trace_capacity(pid));
+
+    pid_real value = 90.0f;
+    pid_real delta_time = 2.0f;
+    for (int i = 0; i < 3; i++) {
+        pid_control(pid, value, delta_time);
+    }
+    assert_int_equal(3, get_trace_count(pid));
+
+    // third call overwrote the first record. The derivative is
+    // still relative to the initial history at the setpoint.
+    pid_trace_record const *trace = get_trace_buffer(pid);
+    assert_true(fabs(trace[0].error - 10.0f) < epsilon);
+    assert_true(fabs(trace[0].proportional - 15.0f) < epsilon);
+    assert_true(fabs(trace[0].derivative - (-7.5f)) < epsilon);
+    assert_true(fabs(trace[0].output - 7.5f) < epsilon);
+
+    pid_trace_disable(pid);
+    assert_null(get_trace_buffer(pid));
+    pid_free(&pid);
+}
+
 //printf("setpoint = %f  value = %f  control = %f  expected = %f\n", setpoint, value, control, expected);
 
+static void test_pid_velocity(void **state) {
+    // the velocity form matches the positional form with an integral
+    // over all time and the derivative against the previous value.
+    pid_real setpoint = 1.0f;
+    pid_real Kp = 1.5f;
+    pid_real Ki = 0.1f;
+    pid_real Kd = 0.5f;
+    pid_data* pid = pid_init_velocity(setpoint, Kp, Ki, Kd);
+    assert_int_equal(PID_INTEGRAL_VELOCITY, get_integral_mode(pid));
+    assert_int_equal(0, get_history_length(pid));
+
+    pid_real values[] = {0.8f, 0.9f, 1.2f, 1.1f, 0.95f};
+    pid_real delta_times[] = {1.0f, 2.0f, 0.5f, 1.0f, 1.5f};
+    pid_real integral = 0.0f;
+    pid_real previous = setpoint;
+    for (int i = 0; i < 5; i++) {
+        pid_real control = pid_control(pid, values[i], delta_times[i]);
+        pid_real error = setpoint - values[i];
+        integral += error * delta_times[i];
+        pid_real derivative = (values[i] - previous) / delta_times[i];
+        previous = values[i];
+        pid_real expected = Kp * error + Ki * integral + Kd * derivative;
+        assert_true(fabs(control - expected) < 1.0e-5f);
+    }
+    pid_free(&pid);
+    assert_null(pid);
+}
+
+static void test_pid_leaky(void **state) {
+    pid_real setpoint = 1.0f;
+    pid_real Kp = 0.5f;
+    pid_real Ki = 2.0f;
+    pid_real Kd = 0.25f;
+    pid_real leak = 0.5f;
+    pid_data* pid = pid_init_leaky(setpoint, Kp, Ki, Kd, leak);
+    assert_int_equal(PID_INTEGRAL_LEAKY, get_integral_mode(pid));
+    assert_true(fabs(get_leak(pid) - leak) < epsilon);
+
+    // I = 0.25 * 2
+    pid_real control = pid_control(pid, 0.75f, 2.0f);
+    pid_real expected = Kp * 0.25f + Ki * 0.5f + Kd * (0.75f - 1.0f) / 2.0f;
+    assert_true(fabs(control - expected) < 1.0e-6f);
+
+    // I = 0.5 * 0.5 + (-0.25) * 1
+    control = pid_control(pid, 1.25f, 1.0f);
+    expected = Kp * -0.25f + Ki * 0.0f + Kd * (1.25f - 0.75f);
+    assert_true(fabs(control - expected) < 1.0e-6f);
+    pid_free(&pid);
+}
+
+static void test_pid_memory_size(void **state) {
+    // history free controllers do not allocate ring buffers
+    pid_data* window = pid_init(64, 1.0f, 1.0f, 0.1f, 0.0f);
+    pid_data* velocity = pid_init_velocity(1.0f, 1.0f, 0.1f, 0.0f);
+    pid_data* leaky = pid_init_leaky(1.0f, 1.0f, 0.1f, 0.0f, 0.9f);
+    assert_int_equal(pid_memory_size(velocity),
+                     pid_memory_size(window) - 2 * 64 * sizeof(pid_real));
+    assert_int_equal(pid_memory_size(velocity), pid_memory_size(leaky));
+    // the fixed rate gains and the gain schedule do not grow them
+    size_t bound = 12 * sizeof(pid_real) + 3 * sizeof(pid_real *);
+#ifdef PID_ENABLE_COUNTERS
+    bound += 2 * sizeof(uint64_t);
+#endif
+#ifdef PID_ENABLE_TRACE
+    bound += sizeof(pid_trace_record *) + 2 * sizeof(uint64_t);
+#endif
+    assert_true(pid_memory_size(velocity) <= bound);
+    pid_free(&window);
+    pid_free(&velocity);
+    pid_free(&leaky);
+}
+
+static void test_pid_reinit(void **state) {
+    // a reinitialized controller matches a new one, reusing the
+    // history buffers when they are large enough
+    pid_real values[] = {0.8f, 0.9f, 1.2f, 1.1f, 0.95f, 1.05f, 0.7f};
+    pid_data* pid = pid_init(8, 2.0f, 1.0f, 0.5f, 0.25f);
+    size_t capacity = pid_memory_size(pid);
+    for (int i = 0; i < 7; i++) {
+        pid_control(pid, values[i] + 1.0f, 0.5f);
+    }
+
+    pid_reinit(pid, PID_INTEGRAL_WINDOW, 4, 1.0f, 1.5f, 0.1f, 0.5f, 0.0f);
+    assert_int_equal(capacity, pid_memory_size(pid));
+    assert_int_equal(4, get_history_length(pid));
+    pid_data* reference = pid_init(4, 1.0f, 1.5f, 0.1f, 0.5f);
+    for (int i = 0; i < 7; i++) {
+        assert_true(fabs(pid_control(pid, values[i], 1.0f) -
+                         pid_control(reference, values[i], 1.0f)) < epsilon);
+    }
+    pid_free(&reference);
+
+    pid_reinit(pid, PID_INTEGRAL_LEAKY, 0, 1.0f, 0.5f, 2.0f, 0.25f, 0.5f);
+    assert_int_equal(PID_INTEGRAL_LEAKY, get_integral_mode(pid));
+    assert_int_equal(capacity, pid_memory_size(pid));
+    reference = pid_init_leaky(1.0f, 0.5f, 2.0f, 0.25f, 0.5f);
+    for (int i = 0; i < 7; i++) {
+        assert_true(fabs(pid_control(pid, values[i], 1.0f) -
+                         pid_control(reference, values[i], 1.0f)) < epsilon);
+    }
+    pid_free(&reference);
+
+    // a longer window grows the buffers
+    pid_reinit(pid, PID_INTEGRAL_WINDOW, 16, 1.0f, 1.0f, 0.1f, 0.0f, 0.0f);
+    assert_int_equal(capacity + 2 * 8 * sizeof(pid_real), pid_memory_size(pid));
+    reference = pid_init(16, 1.0f, 1.0f, 0.1f, 0.0f);
+    for (int i = 0; i < 7; i++) {
+        assert_true(fabs(pid_control(pid, values[i], 1.0f) -
+                         pid_control(reference, values[i], 1.0f)) < epsilon);
+    }
+    pid_free(&reference);
+    pid_free(&pid);
+}
+
+static void test_pid_control_series(void **state) {
+    // the series interface matches consecutive calls to pid_control
+    pid_real values[] = {0.8f, 0.9f, 1.2f, 1.1f, 0.95f, 1.05f, 0.7f};
+    pid_real delta_times[] = {1.0f, 2.0f, 0.5f, 1.0f, 1.5f, 0.25f, 1.0f};
+    pid_real outputs[7];
+    pid_data* pid = pid_init(3, 1.0f, 1.5f, 0.1f, 0.5f);
+    pid_data* reference = pid_init(3, 1.0f, 1.5f, 0.1f, 0.5f);
+    pid_control_series(pid, values, delta_times, 7, outputs);
+    for (int i = 0; i < 7; i++) {
+        pid_real expected = pid_control(reference, values[i], delta_times[i]);
+        assert_true(fabs(outputs[i] - expected) < epsilon);
+    }
+    pid_free(&pid);
+    pid_free(&reference);
+}
+
+static void test_pid_fixed_rate(void **state) {
+    // the fixed rate controller matches the window controller called
+    // with a constant delta time, for power of two and other history
+    // lengths, before and after a setpoint change. The setpoint is
+    // changed once the window is full, before that the window
+    // controller still holds its initial intervals of 1.
+    pid_real values[] = {0.8f, 0.9f, 1.2f, 1.1f, 0.95f, 1.05f, 0.7f, 1.3f};
+    uint8_t history_lengths[] = {1, 4, 5, 255};
+    pid_real delta_time = 0.25f;
+    for (int h = 0; h < 4; h++) {
+        pid_data* pid = pid_init_fixed_rate(history_lengths[h], 1.0f, 1.5f,
+                                            0.1f, 0.5f, delta_time);
+        pid_data* fast = pid_init_fixed_rate(history_lengths[h], 1.0f, 1.5f,
+                                             0.1f, 0.5f, delta_time);
+        pid_data* reference = pid_init(history_lengths[h], 1.0f, 1.5f,
+                                       0.1f, 0.5f);
+        assert_int_equal(PID_INTEGRAL_FIXED_RATE, get_integral_mode(pid));
+        assert_int_equal(history_lengths[h], get_history_length(pid));
+        assert_true(fabs(get_delta_time(pid) - delta_time) < epsilon);
+        for (int i = 0; i < 600; i++) {
+            if (i == 300) {
+                pid_set_setpoint(pid, 1.25f);
+                pid_set_setpoint(fast, 1.25f);
+                pid_set_setpoint(reference, 1.25f);
+            }
+            pid_real value = values[i % 8];
+            pid_real expected = pid_control(reference, value, delta_time);
+            // delta_time is ignored
+            pid_real control = pid_control(pid, value, 2.0f * delta_time);
+            assert_true(fabs(control - expected) < 1.0e-5f);
+            assert_true(fabs(pid_control_fixed_rate(fast, value) - control) <
+                        epsilon);
+        }
+        assert_true(pid_memory_size(pid) < pid_memory_size(reference));
+        pid_free(&pid);
+        pid_free(&fast);
+        pid_free(&reference);
+    }
+}
+
+static void test_pid_schedule(void **state) {
+    // gains interpolated at the process value, clamped to the table
+    pid_real gains[] = {1.0f, 0.0f, 0.0f,
+                     2.0f, 0.5f, 0.0f,
+                     4.0f, 1.0f, 0.2f};
+    pid_real bad[] = {1.0f, 0.0f, 0.0f,
+                   1.0f, -0.5f, 0.0f};
+    pid_data* pid = pid_init(3, 1.0f, 1.5f, 0.1f, 0.5f);
+    size_t const bytes = pid_memory_size(pid);
+    assert_false(pid_schedule_set(pid, 1, 0.0f, 2.0f, gains));
+    assert_false(pid_schedule_set(pid, 3, 2.0f, 2.0f, gains));
+    assert_false(pid_schedule_set(pid, 2, 0.0f, 2.0f, bad));
+    assert_int_equal(0, get_schedule_length(pid));
+
+    assert_true(pid_schedule_set(pid, 2, 0.0f, 2.0f, gains));
+    size_t const two_points = pid_memory_size(pid);
+    assert_true(two_points > bytes + 6 * sizeof(pid_real));
+    assert_true(pid_schedule_set(pid, 3, 0.0f, 2.0f, gains));
+    assert_int_equal(3, get_schedule_length(pid));
+    assert_int_equal(two_points + 3 * sizeof(pid_real), pid_memory_size(pid));
+    pid_real values[] = {0.5f, 1.5f, -1.0f, 5.0f, 2.0f};
+    pid_real Kp[] = {1.5f, 3.0f, 1.0f, 4.0f, 4.0f};
+    pid_real Ki[] = {0.25f, 0.75f, 0.0f, 1.0f, 1.0f};
+    pid_real Kd[] = {0.0f, 0.1f, 0.0f, 0.2f, 0.2f};
+    for (int i = 0; i < 5; i++) {
+        pid_control(pid, values[i], 1.0f);
+        assert_true(fabs(get_Kp(pid) - Kp[i]) < epsilon);
+        assert_true(fabs(get_Ki(pid) - Ki[i]) < epsilon);
+        assert_true(fabs(get_Kd(pid) - Kd[i]) < epsilon);
+    }
+
+    // a constant table matches the unscheduled controller, for the
+    // window and fixed rate modes
+    pid_real constant[] = {1.5f, 0.1f, 0.5f,
+                        1.5f, 0.1f, 0.5f};
+    pid_data* scheduled = pid_init(3, 1.0f, 0.0f, 0.0f, 0.0f);
+    pid_data* fixed_rate = pid_init_fixed_rate(3, 1.0f, 0.0f, 0.0f, 0.0f,
+                                               0.5f);
+    pid_data* reference = pid_init(3, 1.0f, 1.5f, 0.1f, 0.5f);
+    assert_true(pid_schedule_set(scheduled, 2, 0.0f, 2.0f, constant));
+    assert_true(pid_schedule_set(fixed_rate, 2, 0.0f, 2.0f, constant));
+    for (int i = 0; i < 20; i++) {
+        pid_real value = 0.5f + 0.05f * (pid_real)(i % 7);
+        pid_real expected = pid_control(reference, value, 0.5f);
+        assert_true(fabs(pid_control(scheduled, value, 0.5f) - expected) <
+                    epsilon);
+        // after the first window the fixed rate intervals match
+        pid_real control = pid_control_fixed_rate(fixed_rate, value);
+        if (i >= 3) {
+            assert_true(fabs(control - expected) < 1.0e-5f);
+        }
+    }
+
+    // reinit removes the schedule
+    pid_reinit(pid, PID_INTEGRAL_WINDOW, 3, 1.0f, 1.5f, 0.1f, 0.5f, 1.0f);
+    assert_int_equal(0, get_schedule_length(pid));
+    assert_int_equal(bytes, pid_memory_size(pid));
+    pid_control(pid, 5.0f, 1.0f);
+    assert_true(fabs(get_Kp(pid) - 1.5f) < epsilon);
+    pid_free(&pid);
+    pid_free(&scheduled);
+    pid_free(&fixed_rate);
+    pid_free(&reference);
+}
+
+static void test_pid_prime(void **state) {
+    // primed at a constant process value, the output is the steady
+    // output for that value from the first call, for every mode.
+    pid_real const value = 0.8f;
+    pid_real const error = 1.0f - value;
+    pid_data* window = pid_init(3, 1.0f, 1.5f, 0.1f, 0.5f);
+    pid_data* fixed_rate = pid_init_fixed_rate(3, 1.0f, 1.5f, 0.1f, 0.5f,
+                                               0.5f);
+    pid_data* leaky = pid_init_leaky(1.0f, 1.5f, 0.1f, 0.5f, 0.5f);
+    pid_data* velocity = pid_init_velocity(1.0f, 1.5f, 0.1f, 0.5f);
+    pid_prime(window, value, 0.5f);
+    pid_prime(fixed_rate, value, 0.5f);
+    pid_prime(leaky, value, 0.5f);
+    pid_prime(velocity, value, 0.5f);
+    pid_real const steady = 1.5f * error + 0.1f * 3.0f * error * 0.5f;
+    pid_real const steady_leaky = 1.5f * error + 0.1f * error * 0.5f / 0.5f;
+    for (int i = 0; i < 5; i++) {
+        assert_true(fabs(pid_control(window, value, 0.5f) - steady) <
+                    epsilon);
+        assert_true(fabs(pid_control_fixed_rate(fixed_rate, value) -
+                         steady) < epsilon);
+        assert_true(fabs(pid_control(leaky, value, 0.5f) - steady_leaky) <
+                    epsilon);
+        // no proportional or derivative kick, only the integral
+        // increment
+        assert_true(fabs(pid_control(velocity, value, 0.5f) -
+                         0.1f * error * 0.5f * (pid_real)(i + 1)) < epsilon);
+    }
+    pid_free(&window);
+    pid_free(&fixed_rate);
+    pid_free(&leaky);
+    pid_free(&velocity);
+}
+
+static void test_pid_state(void **state) {
+    // a state copied to a new controller continues identically, for
+    // every mode and any position of the history ring.
+    pid_real values[] = {0.5f, 0.9f, 1.3f, 0.7f, 1.1f, 0.6f, 1.4f};
+    pid_real buffer[16];
+    for (int mode = 0; mode < 4; mode++) {
+        pid_data* pids[2];
+        for (int j = 0; j < 2; j++) {
+            switch (mode) {
+            case PID_INTEGRAL_VELOCITY:
+                pids[j] = pid_init_velocity(1.0f, 1.5f, 0.1f, 0.5f);
+                break;
+            case PID_INTEGRAL_LEAKY:
+                pids[j] = pid_init_leaky(1.0f, 1.5f, 0.1f, 0.5f, 0.9f);
+                break;
+            case PID_INTEGRAL_FIXED_RATE:
+                pids[j] = pid_init_fixed_rate(5, 1.0f, 1.5f, 0.1f, 0.5f,
+                                              0.5f);
+                break;
+            default:
+                pids[j] = pid_init(5, 1.0f, 1.5f, 0.1f, 0.5f);
+                break;
+            }
+        }
+        size_t const expected = mode == PID_INTEGRAL_WINDOW ? 14 :
+            (mode == PID_INTEGRAL_FIXED_RATE ? 9 : 4);
+        assert_int_equal(expected, pid_state_length(pids[0]));
+        for (int i = 0; i < 7; i++) {
+            pid_control(pids[0], values[i], 0.25f * (pid_real)(i + 1));
+        }
+        pid_state_get(pids[0], buffer);
+        pid_state_set(pids[1], buffer);
+        for (int i = 0; i < 10; i++) {
+            pid_real value = values[(3 * i) % 7];
+            assert_true(fabs(pid_control(pids[0], value, 0.5f) -
+                             pid_control(pids[1], value, 0.5f)) < epsilon);
+        }
+        pid_free(&pids[0]);
+        pid_free(&pids[1]);
+    }
+}
+
 int main(int argc, char** argv) {
 
     const struct CMUnitTest tests[] = {
         cmocka_unit_test(test_pid_init),
         cmocka_unit_test(test_pid_free),
+        cmocka_unit_test(test_pid_version),
         cmocka_unit_test(test_pid_init_values),
         cmocka_unit_test(test_pid_perfect_control),
         cmocka_unit_test(test_pid_proportional_positive_only),
         cmocka_unit_test(test_pid_proportional_negative_only),
         cmocka_unit_test(test_pid_derivative_positive_only),
         cmocka_unit_test(test_pid_derivative_negative_only),
+        cmocka_unit_test(test_pid_control_array),
+        cmocka_unit_test(test_pid_set_setpoint),
+        cmocka_unit_test(test_pid_cascade),
+        cmocka_unit_test(test_pid_counters),
+        cmocka_unit_test(test_pid_trace),
+        cmocka_unit_test(test_pid_velocity),
+        cmocka_unit_test(test_pid_leaky),
+        cmocka_unit_test(test_pid_memory_size),
+        cmocka_unit_test(test_pid_reinit),
+        cmocka_unit_test(test_pid_control_series),
+        cmocka_unit_test(test_pid_fixed_rate),
+        cmocka_unit_test(test_pid_schedule),
+        cmocka_unit_test(test_pid_prime),
+        cmocka_unit_test(test_pid_state),
     };
     return cmocka_run_group_tests(tests, NULL, NULL);
 }
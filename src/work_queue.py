@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""Work queue of sweep runs shared by any number of workers.
+
+The queue is a table in the sqlite results store. A coordinator
+enqueues the configuration of every pending run. Workers, on the
+same or other hosts, claim batches of runs with a lease, simulate
+them and commit the results and the completion of the runs in one
+transaction. A worker renews its lease while it works through a
+batch. The runs of a worker that crashed or was killed are claimed by
+the next worker after the lease expires, runs whose lease expired
+max_attempts times are marked failed.
+
+Run keys identify a configuration, so a run finished by two workers,
+e.g. a slow worker whose lease was reclaimed, stores one result.
+
+Workers on other hosts need the store on a shared filesystem with
+working posix locks, and clocks synchronized to well within the lease
+time. sqlite in write ahead log mode requires all connections to be on
+the same host, the queue switches the store to the rollback journal.
+
+Copyright (c) 2016 Benjamin J. Andre
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v.  2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+#
+# built-in modules
+#
+import contextlib
+import os
+import socket
+import sys
+import time
+import traceback
+
+#
+# installed dependencies
+#
+
+#
+# other modules in this package
+#
+import results_store
+from results_store import ResultsStore
+
+if sys.hexversion < 0x03050000:
+    print(70 * "*")
+    print("ERROR: {0} requires python >= 3.5.x. ".format(sys.argv[0]))
+    print("It appears that you are running python {0}".format(
+        ".".join(str(x) for x in sys.version_info[0:3])))
+    print(70 * "*")
+    sys.exit(1)
+
+# queue states
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'  # lease expired max_attempts times, or run failed
+
+STATES = (PENDING, LEASED, DONE, FAILED, )
+
+# many workers contend for the store, wait for locks rather than fail
+_LOCK_TIMEOUT = 600.0
+
+
+def worker_name():
+    """Unique name of this worker process, host:pid.
+    """
+    return "{0}:{1}".format(socket.gethostname(), os.getpid())
+
+
+class WorkQueue(ResultsStore):
+    """Results store with a queue of runs claimed under leases.
+    """
+
+    # the write ahead log index is shared memory, hosts sharing the
+    # store over a network filesystem need the rollback journal.
+    _JOURNAL_MODE = 'DELETE'
+
+    def __init__(self, filename, lease_time=120.0, max_attempts=3):
+        """Open or create the store and its queue.
+
+        Positional arguments:
+
+        filename -- sqlite database file. [str]
+
+        Keyword arguments:
+
+        lease_time -- a claimed run is reclaimed if its lease is not
+        renewed or completed within this time. [s]
+
+        max_attempts -- a run is failed after this many expired
+        leases. [int]
+        """
+        self._lease_time = lease_time
+        self._max_attempts = max_attempts
+        super().__init__(filename, timeout=_LOCK_TIMEOUT)
+
+    def _set_journal_mode(self):
+        # also switch an existing results store, its workers may run
+        # on other hosts
+        self._connection.execute(
+            'PRAGMA journal_mode={0}'.format(self._JOURNAL_MODE))
+
+    def _create(self):
+        super()._create()
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS queue ('
+                'key TEXT PRIMARY KEY, campaign TEXT, config TEXT, '
+                'state TEXT, worker TEXT, expires REAL, attempts INTEGER)')
+            self._connection.execute(
+                'CREATE INDEX IF NOT EXISTS queue_state '
+                'ON queue (state, expires)')
+
+    @contextlib.contextmanager
+    def _exclusive(self):
+        """Write transaction that takes the lock up front, so that
+        concurrent claims wait for each other instead of failing on
+        the upgrade from a read lock.
+        """
+        self._connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield self._connection
+        except BaseException:
+            self._connection.rollback()
+            raise
+        self._connection.commit()
+
+    def enqueue(self, campaign, runs):
+        """Add runs to the queue. Runs already queued are unchanged.
+
+        Positional arguments:
+
+        campaign -- name of the sweep. [str]
+
+        runs -- (key, normalized configuration text) pairs. [list]
+
+        Returns:
+        number of runs added. [int]
+        """
+        rows = [(key, campaign, config, PENDING, None, None, 0)
+                for key, config in runs]
+        with self._exclusive() as connection:
+            before = connection.total_changes
+            connection.executemany(
+                'INSERT OR IGNORE INTO queue (key, campaign, config, state, '
+                'worker, expires, attempts) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                rows)
+            return connection.total_changes - before
+
+    def claim(self, worker, count):
+        """Lease up to count pending runs, or runs with an expired
+        lease, to worker. Runs whose lease expired max_attempts times
+        are failed instead.
+
+        Returns:
+        list of (key, campaign, config text). [list]
+        """
+        now = time.time()
+        with self._exclusive() as connection:
+            connection.execute(
+                'UPDATE queue SET state = ?, worker = NULL '
+                'WHERE state = ? AND expires < ? AND attempts >= ?',
+                (FAILED, LEASED, now, self._max_attempts))
+            claimed = connection.execute(
+                'SELECT key, campaign, config FROM queue '
+                'WHERE state = ? OR (state = ? AND expires < ?) '
+                'ORDER BY rowid LIMIT ?',
+                (PENDING, LEASED, now, int(count))).fetchall()
+            connection.executemany(
+                'UPDATE queue SET state = ?, worker = ?, expires = ?, '
+                'attempts = attempts + 1 WHERE key = ?',
+                [(LEASED, worker, now + self._lease_time, key)
+                 for key, _, _ in claimed])
+        return claimed
+
+    def renew(self, worker, keys):
+        """Extend the lease of the runs still leased to worker.
+
+        Returns:
+        number of runs still leased to worker. [int]
+        """
+        keys = list(keys)
+        expires = time.time() + self._lease_time
+        with self._exclusive() as connection:
+            before = connection.total_changes
+            connection.executemany(
+                'UPDATE queue SET expires = ? '
+                'WHERE key = ? AND state = ? AND worker = ?',
+                [(expires, key, LEASED, worker) for key in keys])
+            return connection.total_changes - before
+
+    def complete(self, rows):
+        """Store result rows, see ResultsStore.row, and mark their runs
+        done, or failed for rows with status results_store.FAILED, in
+        one transaction. The results of a run whose lease was reclaimed
+        are accepted, the runs are deterministic.
+        """
+        key = results_store.COLUMNS.index('key')
+        status = results_store.COLUMNS.index('status')
+        with self._exclusive() as connection:
+            self._insert(rows)
+            connection.executemany(
+                'UPDATE queue SET state = ?, worker = NULL WHERE key = ?',
+                [(FAILED if row[status] == results_store.FAILED else DONE,
+                  row[key]) for row in rows])
+
+    def release(self, worker, keys):
+        """Return runs leased to worker to the queue without using up
+        an attempt, e.g. on an interrupted worker.
+        """
+        with self._exclusive() as connection:
+            connection.executemany(
+                'UPDATE queue SET state = ?, worker = NULL, '
+                'attempts = attempts - 1 '
+                'WHERE key = ? AND state = ? AND worker = ?',
+                [(PENDING, key, LEASED, worker) for key in keys])
+
+    def counts(self, campaign=None):
+        """Return a dict of state: number of runs, for one campaign or
+        the whole queue. Expired leases are counted as leased until
+        they are reclaimed.
+        """
+        query = 'SELECT state, COUNT(*) FROM queue'
+        values = []
+        if campaign is not None:
+            query += ' WHERE campaign = ?'
+            values.append(campaign)
+        query += ' GROUP BY state'
+        counts = dict((state, 0) for state in STATES)
+        counts.update(self._connection.execute(query, values).fetchall())
+        return counts
+
+    def next_expiry(self):
+        """Return the earliest lease expiry, None without leased runs.
+        """
+        return self._connection.execute(
+            'SELECT MIN(expires) FROM queue WHERE state = ?',
+            (LEASED, )).fetchone()[0]
+
+
+if __name__ == "__main__":
+    try:
+        print("Module has no main functionality. Please run pid-sweep.py")
+        sys.exit(0)
+    except Exception as error:
+        print(str(error))
+        traceback.print_exc()
+        sys.exit(1)